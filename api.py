@@ -1,13 +1,84 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from clients.trading212 import Trading212Client
-from clients.yfinance import YFinanceClient
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+import asyncio
+import json
 import os
-import glob
-import pandas as pd
-from typing import List
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import TYPE_CHECKING, List, Optional
+from utils import profiling
+from utils.events import bus
+from utils.jobs import MARKET_DATA, T212_DATA, Job, JobManager
+from utils.lazy import LazyObject, loaded, warm_up
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, HTTP_SECONDS, registry as metrics_registry
+from utils.serialize import ARROW_MEDIA_TYPE, FORMATS, frame_arrow, frame_columns_json, frame_records
 
-app = FastAPI(title="Trading Data Scraper API")
+# pandas, pyarrow, yahooquery and the clients are imported on first use or
+# by the warm-up, so the API answers before they have loaded
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Modules the warm-up imports in the background once the API is up
+WARM_UP_MODULES = ("pandas", "pyarrow", "utils.data_transform", "utils.catalog",
+                   "utils.resample", "utils.screener", "clients.trading212", "clients.yfinance")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # AUTO_REFRESH=1 keeps market data fresh for as long as the API is up
+    if os.environ.get("AUTO_REFRESH", "").lower() in ("1", "true", "yes"):
+        scheduler.start()
+    if os.environ.get("WARM_UP", "1").lower() not in ("0", "false", "no"):
+        warm_up(WARM_UP_MODULES, (frame_cache, analytics))
+    yield
+    # a singleton never used needs no shutdown, building it would import its modules
+    if loaded(scheduler):
+        scheduler.stop()
+    if loaded(screener):
+        screener.close()
+
+app = FastAPI(title="Trading Data Scraper API", lifespan=lifespan)
+# endpoints can be profiled per request, see utils/profiling.py
+app.router.route_class = profiling.ProfiledRoute
+
+def _make_frame_cache():
+    from utils.cache import FrameCache
+    return FrameCache()
+
+def _make_scheduler():
+    from utils.scheduler import RefreshScheduler
+    return RefreshScheduler(jobs, on_written=lambda *files: _invalidate_written(*files))
+
+def _make_analytics():
+    from utils.analytics import PortfolioAnalytics
+    from utils.storage import load_frame
+    return PortfolioAnalytics(
+        load_bars=lambda path: frame_cache.get(path, lambda: load_frame(path, columns=["Date", "Close"]), variant="close")
+    )
+
+def _make_screener():
+    from utils.screener import Screener
+    return Screener()
+
+# Parsed data files, shared by every request in this process
+frame_cache = LazyObject(_make_frame_cache)
+
+# Background scrapes, at most two run at once and only one at a time writes
+# the Trading212 files or the market data
+jobs = JobManager(max_workers=2)
+
+# Market-hours aware background refresh, started on demand or by AUTO_REFRESH
+scheduler = LazyObject(_make_scheduler)
+
+# Portfolio analytics, kept up to date incrementally as the ledger grows
+analytics = LazyObject(_make_analytics)
+
+# Indicators of every stored symbol, computed on a process pool and cached per symbol
+screener = LazyObject(_make_screener)
 
 # Allow CORS for local frontend development
 app.add_middleware(
@@ -16,43 +87,147 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", profiling.PROFILE_HEADER],
 )
 
+# Compress large responses, the SSE stream is left alone by the middleware
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """Time every request by route, and profile it when it asks to be."""
+    holder = profiling.start_request(request.headers)
+    start = time.perf_counter()
+    response = await call_next(request)
+    # the route template keeps the label set small, /jobs/{job_id} not every id
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    HTTP_SECONDS.observe(time.perf_counter() - start, method=request.method, route=route,
+                         status=response.status_code)
+    if holder is not None:
+        # writing the stats is blocking file I/O, keep it off the event loop
+        path = await run_in_threadpool(profiling.dump, holder, route)
+        if path:
+            response.headers[profiling.PROFILE_HEADER] = path
+    return response
+
 @app.get("/")
 def read_root():
     return {"status": "ok", "message": "Trading Scraper API is running"}
 
-@app.post("/connect")
+@app.get("/metrics")
+def get_metrics():
+    """
+    Prometheus metrics: upstream call timings, statuses, retries and 429s,
+    transform/storage/serialization stage timings with rows and bytes, and
+    API request timings by route.
+    """
+    return Response(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+# Seconds between keep-alive comments on the event stream
+EVENT_HEARTBEAT = 15
+
+@app.get("/events")
+async def stream_events(request: Request):
+    """
+    Server-Sent Events stream of scrape progress: job, ticker, rows written,
+    T212 report status and error events. A client reconnecting with the
+    Last-Event-ID header gets the events it missed replayed first.
+    """
+    last_id = request.headers.get("last-event-id")
+    queue = bus.subscribe(int(last_id) if last_id and last_id.isdigit() else None)
+
+    async def event_stream():
+        try:
+            # the first event tells the client the backend is up
+            yield f"event: status\ndata: {json.dumps({'status': 'ok'})}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENT_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            bus.unsubscribe(queue)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+def _invalidate_written(*files: Optional[str]) -> None:
+    """Drop cached frames for files a scrape has just written."""
+    # nothing can be cached before the cache exists
+    if not loaded(frame_cache):
+        return
+    for path in files:
+        if path:
+            frame_cache.invalidate(path)
+
+def _invalidate_summary(summary: dict) -> None:
+    """Drop cached frames for every file written by a YFinance scrape."""
+    _invalidate_written(*(r.get("file") for r in summary.get("results", [])))
+
+def _check_t212_keys() -> None:
+    """Raise a 400 straight away if the Trading212 keys are missing."""
+    import config
+    key_id, secret_key = config.get_api_keys("Trading212")
+    if not key_id or not secret_key:
+        raise HTTPException(status_code=400, detail="API Keys missing")
+
+def _check_tickers_file(filename: str = "tickers.csv") -> None:
+    """Raise a 400 straight away if the tickers file is missing or empty."""
+    if not os.path.exists(filename):
+        raise HTTPException(status_code=400, detail=f"{filename} not found.")
+    if os.path.getsize(filename) == 0:
+        raise HTTPException(status_code=400, detail=f"{filename} is empty.")
+
+def _job_response(job: Job) -> dict:
+    """Response body for an endpoint that started (or attached to) a job."""
+    return {"status": "accepted", "job": job.to_dict()}
+
+def _run_t212(cancel_event: threading.Event) -> dict:
+    from clients.trading212 import Trading212Client
+    client = Trading212Client(is_demo=False)
+    cash = client.fetch_account_cash()
+    report_file = client.download_historic_data(cancel_event)
+    _invalidate_written(report_file)
+    return {"cash": cash, "report": report_file}
+
+def _run_yfinance(cancel_event: threading.Event) -> dict:
+    from clients.yfinance import YFinanceClient
+    client = YFinanceClient()
+    summary = client.get_tickers(cancel_event=cancel_event)
+    _invalidate_summary(summary)
+    return {"message": "YFinance scrape completed", "summary": summary}
+
+def _run_connect(cancel_event: threading.Event) -> dict:
+    # 1. Trading212
+    t212 = _run_t212(cancel_event)
+    cash_data = t212["cash"]
+    if cancel_event.is_set():
+        return {"cash_data": cash_data, "report": t212["report"]}
+
+    # 2. YFinance
+    yfinance = _run_yfinance(cancel_event)
+
+    return {
+        "balance": cash_data.get('total') if cash_data else 0, # Adjust based on actual T212 response structure
+        "cash_data": cash_data,
+        "report": t212["report"],
+        "summary": yfinance["summary"],
+        "message": "Connected and synced successfully"
+    }
+
+@app.post("/connect", status_code=202)
 def connect_session():
     """
-    Simulates a session connection:
+    Simulates a session connection as a background job:
     1. Runs T212 Scrape to get Cash and Report
     2. Runs YFinance Scrape to update market data
-    3. Returns aggregated data (Balance, Status)
+    3. The job result holds the aggregated data (Balance, Status)
     """
-    try:
-        # 1. Trading212
-        t212_client = Trading212Client(is_demo=False)
-        cash_data = t212_client.fetch_account_cash()
-        
-        # Extract total value if available, else use free cash or just 0
-        # cash_data example: {'free': 100, 'total': 1000, ...} 
-        # We need to see actual structure, but for now we return the whole object
-        
-        report_file = t212_client.download_historic_data()
-        
-        # 2. YFinance
-        yf_client = YFinanceClient()
-        yf_client.get_tickers()
-        
-        return {
-            "status": "connected",
-            "balance": cash_data.get('total') if cash_data else 0, # Adjust based on actual T212 response structure
-            "cash_data": cash_data,
-            "message": "Connected and synced successfully"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Connection failed: {str(e)}")
+    _check_t212_keys()
+    # runs both scrapes inline, so it waits for either one already running
+    return _job_response(jobs.submit("connect", _run_connect, resources=(T212_DATA, MARKET_DATA)))
 
 @app.post("/disconnect")
 def disconnect_session():
@@ -61,72 +236,400 @@ def disconnect_session():
     """
     return {"status": "disconnected", "message": "Session ended"}
 
-@app.post("/scrape/t212")
+@app.post("/scrape/t212", status_code=202)
 def scrape_t212():
-    try:
-        # Check for API keys first
-        import config
-        key_id, secret_key = config.get_api_keys("Trading212")
-        if not key_id or not secret_key:
-             raise ValueError("API Keys missing")
-
-        client = Trading212Client(is_demo=False)
-        cash = client.fetch_account_cash()
-        report_file = client.download_historic_data()
-        
-        return {"status": "success", "cash": cash, "report": report_file}
-    except ValueError as e:
-        # Catch missing keys or other value errors
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    """Start a Trading212 scrape, or attach to the one already running."""
+    _check_t212_keys()
+    return _job_response(jobs.submit("t212", _run_t212, resources=(T212_DATA,)))
 
-@app.post("/scrape/yfinance")
+@app.post("/scrape/yfinance", status_code=202)
 def scrape_yfinance():
+    """Start a YFinance scrape, or attach to the one already running."""
+    _check_tickers_file()
+    return _job_response(jobs.submit("yfinance", _run_yfinance, resources=(MARKET_DATA,)))
+
+@app.get("/jobs")
+def list_jobs():
+    """Recent background jobs, newest first."""
+    return {"jobs": [job.to_dict() for job in jobs.list()]}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Status and, once finished, the result of a background job."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """Ask a background job to stop at its next checkpoint."""
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/scheduler")
+def scheduler_status():
+    """
+    Background refresh state, request budget and last cycle, plus the
+    freshness of every symbol in the order the next cycle would fetch it.
+    """
     try:
-        client = YFinanceClient()
-        client.get_tickers()
-        return {"status": "success", "message": "YFinance scrape completed"}
+        plan = scheduler.plan()
     except ValueError as e:
-        # Catch missing/empty tickers file
         raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {**scheduler.status(), "plan": plan}
+
+@app.post("/scheduler/start")
+def start_scheduler():
+    """Start refreshing stale symbols in the background."""
+    _check_tickers_file()
+    scheduler.start()
+    return scheduler.status()
+
+@app.post("/scheduler/stop")
+def stop_scheduler():
+    """Stop the background refresh, a refresh already running finishes."""
+    scheduler.stop()
+    return scheduler.status()
+
+@app.post("/scheduler/run", status_code=202)
+def run_scheduler_cycle():
+    """Run one refresh cycle now, whether or not the scheduler is started."""
+    _check_tickers_file()
+    job = scheduler.run_once()
+    return {"status": "accepted" if job else "idle", "job": job.to_dict() if job else None,
+            "cycle": scheduler.last_cycle}
 
 @app.get("/data/reports")
 def list_reports():
-    """List all CSV reports in the root directory."""
-    files = glob.glob("History Report *.csv")
-    # Sort files by modification time, newest first
-    files.sort(key=os.path.getmtime, reverse=True)
-    return {"reports": files}
+    """List all history reports from the catalog, most recently refreshed first."""
+    from utils import catalog
+    datasets = catalog.list_datasets(kind=catalog.REPORT)
+    return {"reports": [d["path"] for d in datasets], "datasets": datasets}
 
 @app.get("/data/market")
-def list_market_data():
-    """List all market data CSVs."""
-    files = glob.glob("market_data/*.csv")
-    return {"files": files}
+def list_market_data(symbol: Optional[str] = None, interval: Optional[str] = None):
+    """List market data files from the catalog, optionally for one symbol or interval."""
+    from utils import catalog
+    datasets = catalog.list_datasets(kind=catalog.MARKET, symbol=symbol, interval=interval)
+    return {"files": [d["path"] for d in datasets], "datasets": datasets}
+
+@app.get("/data/catalog")
+def list_catalog(
+    kind: Optional[str] = None,
+    symbol: Optional[str] = None,
+    interval: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+):
+    """
+    Every catalogued dataset with its symbol, interval, rows, first/last
+    timestamp, size and refresh time. start/end keep the datasets whose
+    coverage overlaps that range.
+    """
+    from utils import catalog
+    try:
+        datasets = catalog.list_datasets(
+            kind=kind, symbol=symbol, interval=interval,
+            start=_parse_timestamp(start) if start else None,
+            end=_parse_end(end) if end else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"datasets": datasets, "count": len(datasets)}
+
+@app.get("/data/cache")
+def cache_stats():
+    """Hit/miss counters and memory use of the parsed-file cache."""
+    return frame_cache.stats()
+
+def _negotiate(request: Request, format: Optional[str]) -> str:
+    """
+    Pick the response encoding of a data endpoint: the format query
+    parameter if given, Arrow if the Accept header asks for it, else records.
+    """
+    if format:
+        if format not in FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unknown format {format}, expected one of: {', '.join(FORMATS)}")
+        return format
+    if ARROW_MEDIA_TYPE in request.headers.get("accept", ""):
+        return "arrow"
+    return "records"
+
+def _frame_response(df: "pd.DataFrame", format: str, **meta):
+    """Serve a frame as records or columnar JSON, or as an Arrow IPC stream."""
+    meta["count"] = len(df)
+    if format == "arrow":
+        headers = {"X-Total-Count": str(meta["total"])} if "total" in meta else None
+        return Response(frame_arrow(df, meta), media_type=ARROW_MEDIA_TYPE, headers=headers)
+    if format == "columns":
+        return Response(frame_columns_json(df, meta), media_type="application/json")
+    return {"columns": df.columns.tolist(), "data": frame_records(df), **meta}
+
+@app.get("/data/transactions")
+def get_transactions(
+    request: Request,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    ticker: Optional[str] = None,
+    action: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    format: Optional[str] = None,
+):
+    """
+    Every synced Trading212 transaction from the local ledger, oldest first.
+    Filter by start/end time, ticker and action, and page with offset/limit.
+    """
+    from utils import ledger
+    fmt = _negotiate(request, format)
+    try:
+        df, total = ledger.query_transactions(
+            start=_parse_timestamp(start) if start else None,
+            end=_parse_end(end) if end else None,
+            ticker=ticker, action=action, offset=offset, limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _frame_response(df, fmt, total=total, offset=offset, limit=limit)
+
+@app.get("/analytics/positions")
+def get_positions():
+    """
+    Current holdings replayed from the transaction ledger, marked to market
+    at the latest close, with cost basis, realized/unrealized P&L and dividends.
+    """
+    df = analytics.positions()
+    totals = {c: float(df[c].sum()) for c in ("cost_basis", "value", "unrealized", "realized", "dividends")}
+    return {"positions": frame_records(df), "totals": totals}
+
+@app.get("/analytics/performance")
+def get_performance(request: Request, start: Optional[str] = None, end: Optional[str] = None,
+                    format: Optional[str] = None):
+    """Daily portfolio value, P&L, income and time-weighted return."""
+    fmt = _negotiate(request, format)
+    try:
+        df = analytics.performance(
+            start=_parse_timestamp(start) if start else None,
+            end=_parse_end(end) if end else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _frame_response(df, fmt)
+
+@app.get("/analytics/stats")
+def get_analytics_stats():
+    """Full and incremental recompute counters of the analytics cache."""
+    return analytics.stats()
+
+@app.get("/screener")
+def screen_symbols(
+    request: Request,
+    interval: str = "15m",
+    where: Optional[str] = None,
+    sort: Optional[str] = None,
+    order: str = "desc",
+    limit: Optional[int] = Query(None, ge=1),
+    symbols: Optional[str] = None,
+    format: Optional[str] = None,
+):
+    """
+    Rank and filter every stored symbol of an interval by its latest
+    indicators: returns, SMA 20/50, RSI 14, ATR 14, volatility and volume
+    z-score. where takes comma-separated filters such as
+    rsi_14<30,volume_z_20>=2; sort names the indicator to rank by.
+    Only symbols whose data changed since the last screen are recomputed.
+    """
+    from utils.screener import parse_filters
+    fmt = _negotiate(request, format)
+    try:
+        df, total = screener.screen(
+            interval=interval, filters=parse_filters(where), sort=sort, order=order, limit=limit,
+            symbols=[s.strip() for s in symbols.split(",") if s.strip()] if symbols else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _frame_response(df, fmt, interval=interval, total=total, refresh=screener.last_refresh)
+
+@app.get("/screener/stats")
+def screener_stats():
+    """Cached symbols, recompute counters and the last refresh of the screener."""
+    return screener.stats()
+
+# Columns holding the timestamp of each row, market data first then reports
+DATE_COLUMNS = ("Date", "Time")
+
+def _load_typed(path: str) -> "pd.DataFrame":
+    """Load a data file with typed columns, converting legacy CSV on the fly."""
+    from utils.data_transform import normalize_yfinance_data, normalize_report_data
+    from utils.storage import load_frame
+    df = load_frame(path)
+    if path.endswith(".csv"):
+        df = normalize_report_data(normalize_yfinance_data(df))
+    return df
+
+def _parse_timestamp(value: str) -> "pd.Timestamp":
+    """Parse a query string timestamp, treating naive values as UTC."""
+    import pandas as pd
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+def _parse_end(value: str) -> "pd.Timestamp":
+    """
+    Parse the inclusive end of a query string range. A date on its own
+    means the end of that day, so end=2024-01-05 keeps the bars of the 5th.
+    """
+    import pandas as pd
+    ts = _parse_timestamp(value)
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return ts
+    return ts + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
 
 @app.get("/data/content")
-def get_file_content(path: str):
-    """Read specific CSV file content"""
+def get_file_content(
+    request: Request,
+    path: str,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    columns: Optional[str] = None,
+    format: Optional[str] = None,
+):
+    """
+    Read specific data file content.
+    Rows can be paged with offset/limit, filtered to a start/end date range
+    (both inclusive, a date-only end includes that whole day) and projected to a comma-separated list of columns. Filtering is done on
+    the cached typed frame, before anything is converted for JSON.
+    format (or an Arrow Accept header) picks records, columns or arrow.
+    """
+    fmt = _negotiate(request, format)
     if not os.path.exists(path):
         raise HTTPException(status_code=404, detail="File not found")
-    
+
     try:
-        from utils.data_transform import transform_yfinance_data
-        df = pd.read_csv(path)
-        
-        # Apply clean-up for display
-        df = transform_yfinance_data(df)
-        
-        # Convert to object type to allow None values (which map to JSON null)
-        # Otherwise, pandas keeps None as NaN in float columns, breaking JSON serialization
-        data = df.astype(object).where(pd.notnull(df), None).to_dict(orient="records")
-        return {"filename": path, "columns": df.columns.tolist(), "data": data}
+        import pandas as pd
+        from utils.data_transform import format_yfinance_data
+        # Parsed frames are cached, repeat views of an unchanged file skip the disk
+        df = frame_cache.get(path, lambda: _load_typed(path))
+        available = df.columns.tolist()
+        date_col = next((c for c in DATE_COLUMNS if c in available), None)
+
+        # Work out which columns to return
+        selected = available
+        if columns:
+            selected = [c.strip() for c in columns.split(",") if c.strip()]
+            missing = [c for c in selected if c not in available]
+            if missing:
+                raise ValueError(f"Unknown columns: {', '.join(missing)}")
+
+        # Filter to the requested date range
+        if date_col and (start or end):
+            dates = pd.to_datetime(df[date_col], utc=True)
+            mask = pd.Series(True, index=df.index)
+            if start:
+                mask &= dates >= _parse_timestamp(start)
+            if end:
+                mask &= dates <= _parse_end(end)
+            df = df.loc[mask]
+        df = df[selected]
+
+        # Page through the matching rows
+        total = len(df)
+        stop = offset + limit if limit is not None else None
+        df = df.iloc[offset:stop]
+
+        # Format the page for display, the cached frame stays typed
+        df = format_yfinance_data(df)
+        return _frame_response(df, fmt, filename=path, total=total, offset=offset, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading file: {str(e)}")
 
+def _stored_series(path: str, interval: str):
+    """The memory-mapped series of a market data file, if it holds the same bars."""
+    from utils import catalog, series_store
+    _, symbol, _ = catalog.parse_path(path)
+    series = series_store.open_series(symbol, interval) if symbol else None
+    if series is None:
+        return None
+    # a series behind its parquet file (written before the store existed, or a
+    # failed publish) is not served, the parquet file is
+    dataset = catalog.find_dataset(symbol, interval)
+    if dataset is None or dataset["path"] != os.path.normpath(path) or dataset["rows"] != series.rows:
+        return None
+    return series
+
+@app.get("/data/bars")
+def get_bars(
+    request: Request,
+    symbol: str,
+    interval: str = "1d",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    points: Optional[int] = Query(None, ge=3),
+    method: str = "ohlc",
+    format: Optional[str] = None,
+):
+    """
+    OHLCV bars for a symbol at any interval, derived from its finest stored
+    bars that fit, so no extra Yahoo request is needed. points caps the rows
+    returned for the start/end range using the ohlc, minmax or lttb method.
+    Stored bars at the requested interval are sliced straight from the
+    memory-mapped series store, shared by every worker process. Resampled
+    bars and downsampled ranges are cached until the file changes.
+    """
+    from utils.resample import check_method, downsample, pick_source, resample_ohlcv
+    fmt = _negotiate(request, format)
+    try:
+        check_method(method)
+        source = pick_source(symbol, interval)
+        if source is None:
+            raise HTTPException(status_code=404, detail=f"No stored bars for {symbol} fit {interval}")
+        source_interval, path = source
+        series = _stored_series(path, source_interval)
+        start_ts = _parse_timestamp(start) if start else None
+        end_ts = _parse_end(end) if end else None
+
+        def load_bars() -> "pd.DataFrame":
+            df = series.frame() if series is not None else _load_typed(path)
+            return df if source_interval == interval else resample_ohlcv(df, interval)
+
+        def bars_in_range() -> "pd.DataFrame":
+            if series is not None and source_interval == interval:
+                # a binary search on the mapped Date column, the columns are views
+                return series.frame(start_ts, end_ts)
+            df = frame_cache.get(path, load_bars, variant=("bars", interval))
+            if start_ts is not None:
+                df = df.loc[df["Date"] >= start_ts]
+            if end_ts is not None:
+                df = df.loc[df["Date"] <= end_ts]
+            return df
+
+        def load_range() -> "pd.DataFrame":
+            df = bars_in_range()
+            # bars in range before downsampling, kept with the cached frame
+            total = len(df)
+            df = downsample(df, points, method) if points else df.copy()
+            df.attrs["total"] = total
+            return df
+
+        if series is not None and source_interval == interval and not points:
+            # nothing to compute, so nothing is cached per process either
+            df = bars_in_range()
+            total = len(df)
+        else:
+            df = frame_cache.get(path, load_range, variant=("bars", interval, start, end, points, method))
+            total = df.attrs.get("total", len(df))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _frame_response(df, fmt, symbol=symbol, interval=interval, source=source_interval, total=total)
+
 @app.post("/shutdown")
 def shutdown_server():
     """Shuts down the backend server."""
@@ -0,0 +1,96 @@
+"""
+Benchmark of history export ingestion: peak memory against export size.
+
+Each size runs in a fresh process. The streaming mode syncs a synthetic
+export of that many rows from the local mock server through
+Trading212Client, the legacy mode reads the same export whole with
+pd.read_csv and types and stores it in one go, as the client used to.
+Streaming peak memory should stay flat as the export grows. Run from the
+project root with:
+
+    python -m benchmarks.bench_ingest [--rows 100000,1000000,3000000] [--legacy]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+
+def _peak_rss_mb() -> Optional[float]:
+    # ru_maxrss is in KiB on Linux, bytes on macOS, missing on Windows
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _streaming(rows: int, memory_limit: int) -> Dict[str, Any]:
+    from benchmarks.mock_t212 import MockT212Server
+    from clients.trading212 import Trading212Client
+
+    Trading212Client.INGEST_MEMORY_LIMIT = memory_limit
+    with MockT212Server(report_rows=rows, rate_limit=100) as server:
+        client = Trading212Client(base_url=server.base_url, credentials=("bench-key", "bench-secret"))
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            saved = client.download_historic_data()
+        return {"seconds": round(time.perf_counter() - start, 3), "saved": saved is not None}
+
+
+def _legacy(rows: int) -> Dict[str, Any]:
+    import pandas as pd
+    from benchmarks.mock_t212 import report_lines
+    from utils import ledger
+    from utils.data_transform import normalize_report_data
+    from utils.storage import save_frame
+
+    with open("export.csv", "w", encoding="utf-8") as file:
+        file.writelines(report_lines(rows))
+    start = time.perf_counter()
+    df = pd.read_csv("export.csv")
+    save_frame(normalize_report_data(df), "History Report 1.parquet")
+    ledger.upsert_report(df, 1)
+    return {"seconds": round(time.perf_counter() - start, 3), "saved": True}
+
+
+def run_one(rows: int, mode: str, memory_limit: int) -> Dict[str, Any]:
+    """Ingest one export in a child process, returns its timing and peak memory."""
+    code = (f"import json, benchmarks.bench_ingest as b; "
+            f"print(json.dumps(b._child({rows}, {mode!r}, {memory_limit})))")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory(prefix="bench-ingest-", ignore_cleanup_errors=True) as workdir:
+        env = {**os.environ, "PYTHONPATH": root + os.pathsep + os.environ.get("PYTHONPATH", "")}
+        output = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env,
+                                capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _child(rows: int, mode: str, memory_limit: int) -> Dict[str, Any]:
+    # imports are part of the baseline, so load them before measuring it
+    import pandas  # noqa: F401
+    import pyarrow.parquet  # noqa: F401
+    import clients.trading212  # noqa: F401
+    baseline = _peak_rss_mb()
+    result = _streaming(rows, memory_limit) if mode == "streaming" else _legacy(rows)
+    peak = _peak_rss_mb()
+    return {"rows": rows, "mode": mode, **result, "baseline_rss_mb": baseline, "peak_rss_mb": peak,
+            "ingest_rss_mb": round(peak - baseline, 1) if peak is not None else None}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark history export ingestion memory.")
+    parser.add_argument("--rows", default="100000,1000000,3000000")
+    parser.add_argument("--memory-limit", type=int, default=64 * 1024 * 1024, help="ingest ceiling in bytes")
+    parser.add_argument("--legacy", action="store_true", help="also measure the whole-file read")
+    args = parser.parse_args()
+    modes = ["streaming"] + (["legacy"] if args.legacy else [])
+    results = [run_one(int(n), mode, args.memory_limit) for n in args.rows.split(",") for mode in modes]
+    print(json.dumps(results, indent=2))
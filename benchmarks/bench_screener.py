@@ -0,0 +1,105 @@
+"""
+Benchmark of the screening engine over a synthetic universe.
+
+Writes N symbols of 15m bars to a scratch folder and catalogs them, then
+times a cold screen (every symbol computed, pool start-up included), a warm
+screen (nothing changed), and a screen after new bars were appended to a
+share of the symbols (only those fold in their new bars). The cold screen is
+also timed in-process for comparison. Run from the project root with:
+
+    python -m benchmarks.bench_screener [--symbols 3000] [--bars 2000] [--workers 4]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+import numpy as np
+import pandas as pd
+
+
+def _bars(symbol_index: int, bars: int, start: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(symbol_index)
+    close = 100 * np.exp(0.002 * rng.standard_normal(start + bars).cumsum()[start:])
+    return pd.DataFrame({
+        "Date": pd.date_range("2024-01-01", periods=start + bars, freq="15min", tz="UTC")[start:],
+        "Open": close + rng.random(bars),
+        "High": close + 1 + rng.random(bars),
+        "Low": close - 1 - rng.random(bars),
+        "Close": close,
+        "Volume": rng.integers(0, 5_000_000, bars).astype(float),
+    })
+
+
+def _write_universe(symbols: int, bars: int) -> None:
+    from utils import catalog
+    from utils.storage import market_data_path, save_frame
+
+    for i in range(symbols):
+        path = market_data_path(f"SCR{i:05d}", "15m")
+        df = _bars(i, bars)
+        save_frame(df, path)
+        catalog.record(path, df)
+
+
+def _append(symbols: int, bars: int, share: float, new_bars: int) -> int:
+    # rewrite a share of the files with new bars, as an incremental scrape does
+    from utils import catalog
+    from utils.storage import market_data_path, save_frame
+
+    changed = max(1, int(symbols * share))
+    for i in range(changed):
+        path = market_data_path(f"SCR{i:05d}", "15m")
+        df = _bars(i, bars + new_bars)
+        save_frame(df, path)
+        catalog.record(path, df)
+    return changed
+
+
+def _timed_screen(screener) -> Dict[str, Any]:
+    start = time.perf_counter()
+    df, total = screener.screen(sort="rsi_14", limit=20)
+    return {"seconds": round(time.perf_counter() - start, 3), "matched": total, **screener.last_refresh}
+
+
+def run(symbols: int, bars: int, workers: Optional[int], share: float, new_bars: int) -> Dict[str, Any]:
+    from utils import catalog
+    from utils.screener import Screener
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench-screener-", ignore_cleanup_errors=True) as workdir:
+        os.chdir(workdir)
+        try:
+            start = time.perf_counter()
+            _write_universe(symbols, bars)
+            setup = round(time.perf_counter() - start, 3)
+
+            serial = Screener(max_workers=1)
+            in_process = _timed_screen(serial)
+            parallel = Screener(max_workers=workers, parallel_min=1)
+            try:
+                cold = _timed_screen(parallel)
+                warm = _timed_screen(parallel)
+                changed = _append(symbols, bars, share, new_bars)
+                incremental = _timed_screen(parallel)
+            finally:
+                parallel.close()
+            return {"symbols": symbols, "bars": bars, "workers": parallel.max_workers, "setup_seconds": setup,
+                    "cold_in_process": in_process, "cold": cold, "warm": warm,
+                    "changed": changed, "incremental": incremental}
+        finally:
+            if catalog.db.database is not None:
+                catalog.db.close()
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the screening engine.")
+    parser.add_argument("--symbols", type=int, default=3000)
+    parser.add_argument("--bars", type=int, default=2000, help="bars stored per symbol")
+    parser.add_argument("--workers", type=int, help="worker processes, defaults to the CPU count")
+    parser.add_argument("--share", type=float, default=0.1, help="share of symbols given new bars")
+    parser.add_argument("--new-bars", type=int, default=4, help="bars appended to each changed symbol")
+    args = parser.parse_args()
+    print(json.dumps(run(args.symbols, args.bars, args.workers, args.share, args.new_bars), indent=2))
@@ -0,0 +1,125 @@
+"""
+Benchmark of the memory-mapped series store against parquet frames.
+
+Writes N symbols of 15m bars both as parquet and to the series store, then
+in a fresh process per mode holds every symbol the way an API worker would,
+either as parsed parquet frames or as mapped series, and reports that
+process's anonymous memory: what each extra uvicorn worker costs. Mapped
+file pages live in the page cache and are shared by every process mapping
+them, so they do not count. Random range queries are timed too: boolean
+masks over a cached frame against a binary search on the mapped Date
+column, both as bare column views and as a DataFrame. Run from the project
+root with:
+
+    python -m benchmarks.bench_series_store [--symbols 200] [--bars 20000] [--queries 2000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Optional
+import numpy as np
+
+MODES = ("parquet", "series")
+
+
+def _anonymous_mb() -> Optional[float]:
+    # resident memory not backed by a file, which no other process can share, Linux only
+    try:
+        with open("/proc/self/smaps_rollup", "r", encoding="utf-8") as file:
+            kb = sum(int(line.split()[1]) for line in file if line.startswith("Anonymous:"))
+        return round(kb / 1024, 1)
+    except OSError:
+        return None
+
+
+def _write(symbols: int, bars: int) -> None:
+    from benchmarks.bench_screener import _bars
+    from utils import series_store
+    from utils.storage import market_data_path, save_frame
+
+    for i in range(symbols):
+        df = _bars(i, bars)
+        df.insert(0, "Symbol", f"SER{i:04d}")
+        save_frame(df, market_data_path(f"SER{i:04d}", "15m"))
+        series_store.write_series(f"SER{i:04d}", "15m", df)
+
+
+def _child(symbols: int, mode: str, queries: int) -> Dict[str, Any]:
+    from utils import series_store
+    from utils.storage import load_frame, market_data_path
+
+    names = [f"SER{i:04d}" for i in range(symbols)]
+    baseline = _anonymous_mb()
+    start = time.perf_counter()
+    if mode == "parquet":
+        held = {name: load_frame(market_data_path(name, "15m")) for name in names}
+    else:
+        held = {name: series_store.open_series(name, "15m") for name in names}
+        # touch every page once, as serving each symbol's full range would
+        for series in held.values():
+            for values in series.columns.values():
+                float(values.sum())
+    load_seconds = time.perf_counter() - start
+    anonymous = _anonymous_mb()
+
+    rng = np.random.default_rng(0)
+    first = held[names[0]]
+    dates = first["Date"] if mode == "parquet" else first.frame()["Date"]
+    picks = np.sort(rng.integers(0, len(dates), (queries, 2)), axis=1)
+    bounds = [(dates.iloc[a], dates.iloc[b]) for a, b in picks]
+    start = time.perf_counter()
+    rows = 0
+    for i, (lo, hi) in enumerate(bounds):
+        item = held[names[i % len(names)]]
+        if mode == "parquet":
+            rows += len(item.loc[(item["Date"] >= lo) & (item["Date"] <= hi)])
+        else:
+            rows += len(item.frame(lo, hi))
+    query_seconds = time.perf_counter() - start
+    result = {"mode": mode, "load_seconds": round(load_seconds, 3),
+              "anonymous_mb": round(anonymous - baseline, 1) if anonymous is not None else None,
+              "query_ms": round(query_seconds / queries * 1000, 4), "rows_returned": rows}
+    if mode == "series":
+        start = time.perf_counter()
+        for i, (lo, hi) in enumerate(bounds):
+            held[names[i % len(names)]].slice(lo, hi)
+        result["slice_ms"] = round((time.perf_counter() - start) / queries * 1000, 4)
+    return result
+
+
+def run_one(workdir: str, symbols: int, mode: str, queries: int) -> Dict[str, Any]:
+    """Hold every symbol in a child process, returns its memory and query timings."""
+    code = (f"import json, benchmarks.bench_series_store as b; "
+            f"print(json.dumps(b._child({symbols}, {mode!r}, {queries})))")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": root + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    output = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(symbols: int, bars: int, queries: int) -> Dict[str, Any]:
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench-series-", ignore_cleanup_errors=True) as workdir:
+        os.chdir(workdir)
+        try:
+            start = time.perf_counter()
+            _write(symbols, bars)
+            setup = round(time.perf_counter() - start, 3)
+        finally:
+            os.chdir(cwd)
+        results = {mode: run_one(workdir, symbols, mode, queries) for mode in MODES}
+    return {"symbols": symbols, "bars": bars, "setup_seconds": setup, **results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the memory-mapped series store.")
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--bars", type=int, default=20000, help="bars stored per symbol")
+    parser.add_argument("--queries", type=int, default=2000, help="random range queries timed")
+    args = parser.parse_args()
+    print(json.dumps(run(args.symbols, args.bars, args.queries), indent=2))
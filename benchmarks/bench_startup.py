@@ -0,0 +1,125 @@
+"""
+Benchmark of API cold start: import time and time to the first answer.
+
+Each run is a fresh interpreter. The import report runs
+`python -X importtime -c "import api"` and lists the modules that took
+longest, counting everything they imported; heavy modules such as pandas
+showing up there means something imports them eagerly again. The first
+answer times uvicorn from launch until GET / responds. With --budget the
+run exits 1 if either figure goes over it. Run from the project root with:
+
+    python -m benchmarks.bench_startup [--runs 3] [--top 15] [--budget 1.0]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# modules the API loads on first use, none should be imported at startup
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "yahooquery", "peewee", "clients.trading212", "clients.yfinance")
+
+
+def _env() -> Dict[str, str]:
+    return {**os.environ, "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", "")}
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Rows of a -X importtime report: module, self and cumulative microseconds."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+    return rows
+
+
+def import_report(module: str = "api", top: int = 15) -> Dict[str, Any]:
+    """Import time of module in a fresh interpreter, with its slowest imports."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                            env=_env(), capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    rows = parse_importtime(result.stderr)
+    loaded = {row["module"] for row in rows}
+    total = next((row["cumulative_us"] for row in reversed(rows) if row["module"] == module), 0)
+    slowest = sorted(rows, key=lambda row: row["cumulative_us"], reverse=True)[:top]
+    return {
+        "module": module,
+        "seconds": round(total / 1e6, 4),
+        "process_seconds": round(wall, 4),
+        "heavy_loaded": [name for name in HEAVY_MODULES if name in loaded],
+        "slowest": [{"module": row["module"], "ms": round(row["cumulative_us"] / 1000, 1),
+                     "self_ms": round(row["self_us"] / 1000, 1)} for row in slowest],
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def first_response(timeout: float = 30.0) -> Dict[str, Any]:
+    """Seconds from launching uvicorn until GET / answers."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/"
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "api:app", "--port", str(port),
+                               "--log-level", "warning"], cwd=ROOT, env=_env(),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    response.read()
+                return {"seconds": round(time.perf_counter() - start, 4)}
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"API did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def bench_startup(runs: int = 3, top: int = 15) -> Dict[str, Any]:
+    """Best import time and first response of several cold starts."""
+    reports = [import_report(top=top) for _ in range(max(1, runs))]
+    best = min(reports, key=lambda r: r["seconds"])
+    responses = [first_response() for _ in range(max(1, runs))]
+    return {
+        "import": best,
+        "first_response": {"seconds": min(r["seconds"] for r in responses)},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark API cold start.")
+    parser.add_argument("--runs", type=int, default=3, help="cold starts per figure, the best is kept")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--budget", type=float, help="fail if the import or first response takes longer, in seconds")
+    args = parser.parse_args()
+
+    results = bench_startup(args.runs, args.top)
+    print(json.dumps(results, indent=2))
+    if args.budget is not None:
+        over = [f"{name} {results[name]['seconds']}s" for name in ("import", "first_response")
+                if results[name]["seconds"] > args.budget]
+        heavy = results["import"]["heavy_loaded"]
+        if heavy:
+            print(f"Imported at startup: {', '.join(heavy)}", file=sys.stderr)
+        if over:
+            print(f"Over the {args.budget}s budget: {', '.join(over)}", file=sys.stderr)
+        if over or heavy:
+            sys.exit(1)
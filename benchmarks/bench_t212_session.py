@@ -0,0 +1,82 @@
+"""
+Benchmark of Trading212Client connection reuse against the local mock server.
+
+Compares a fresh connection per request (the old module-level requests.get)
+with the pooled keep-alive session and the asyncio client. The mock sends
+rate-limit headers with a budget the run never spends, so the governor lets
+every call straight through and only connection reuse is measured. Run from
+the project root with:
+
+    python -m benchmarks.bench_t212_session [--requests 50] [--connect-latency 0.02]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+import requests
+from benchmarks.mock_t212 import MockT212Server
+from clients.trading212 import AsyncTrading212Client, Trading212Client
+
+CREDENTIALS = ("bench-key", "bench-secret")
+# calls allowed per endpoint per second, well above what the benchmark sends
+RATE_LIMIT = 100_000
+
+
+def _fresh_connections(server: MockT212Server, n: int) -> None:
+    client = Trading212Client(base_url=server.base_url, credentials=CREDENTIALS)
+    for _ in range(n):
+        requests.get(server.base_url + Trading212Client.ENDPOINT_CASH, headers=client.headers).json()
+
+
+def _pooled_session(server: MockT212Server, n: int) -> None:
+    # the client's own shared session for the host, with its retry adapter
+    client = Trading212Client(base_url=server.base_url, credentials=CREDENTIALS)
+    for _ in range(n):
+        client._make_request("GET", Trading212Client.ENDPOINT_CASH)
+
+
+async def _async_client(server: MockT212Server, n: int, concurrency: int) -> None:
+    async with AsyncTrading212Client(base_url=server.base_url, credentials=CREDENTIALS) as client:
+        for start in range(0, n, concurrency):
+            batch = range(start, min(n, start + concurrency))
+            await asyncio.gather(*(client._make_request("GET", Trading212Client.ENDPOINT_CASH) for _ in batch))
+
+
+def _measure(server: MockT212Server, func) -> dict:
+    before = dict(server.counters)
+    start = time.perf_counter()
+    # the clients print every request, keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": round(elapsed, 4),
+        "connections": server.counters["connections"] - before["connections"],
+        "requests": server.counters["requests"] - before["requests"],
+    }
+
+
+def run(n: int, latency: float, connect_latency: float, concurrency: int) -> dict:
+    # without rate-limit headers the governor would space the calls by the documented limits
+    with MockT212Server(latency=latency, connect_latency=connect_latency, rate_limit=RATE_LIMIT) as server:
+        return {
+            "fresh_connection_per_request": _measure(server, lambda: _fresh_connections(server, n)),
+            "pooled_session": _measure(server, lambda: _pooled_session(server, n)),
+            "async_sequential": _measure(server, lambda: asyncio.run(_async_client(server, n, 1))),
+            "async_concurrent": _measure(server, lambda: asyncio.run(_async_client(server, n, concurrency))),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Trading212 connection reuse.")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.002, help="server time per request, seconds")
+    parser.add_argument("--connect-latency", type=float, default=0.02, help="handshake time per connection, seconds")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    results = run(args.requests, args.latency, args.connect_latency, args.concurrency)
+    for name, result in results.items():
+        per_request = result["seconds"] / max(1, result["requests"]) * 1000
+        print(f"{name:>30}: {result['seconds']:.3f}s, {per_request:.1f} ms/request, "
+              f"{result['connections']} connections")
@@ -0,0 +1,166 @@
+"""
+Local stand-in for Yahoo Finance, used by the benchmarks.
+
+FakeYahoo is passed to YFinanceClient(ticker_factory=...) in place of
+yahooquery.Ticker. It serves bars from Yahoo v8 chart responses, either
+recorded ones loaded from a folder of {symbol}.json files or synthetic ones
+generated per symbol, in the multi-symbol frame shape yahooquery returns.
+latency is paid on every history call, and error_rate of the calls answer
+with the per-symbol 429 error strings yahooquery gives when throttled.
+Record real chart responses with:
+
+    python -m benchmarks.fake_yahoo AAPL CSP1.L [--interval 15m] [--range 1mo] [--out DIR]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import threading
+import time
+import zlib
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+RATE_LIMITED = "429 Client Error: Too Many Requests"
+# length of the yahoo period names the client asks for
+PERIODS = {"1d": 1, "5d": 5, "1mo": 31, "3mo": 92, "6mo": 183, "1y": 366, "2y": 731, "5y": 1827}
+
+
+def chart_payload(symbol: str, interval: str = "15m", bars: int = 500,
+                  end: Optional[pd.Timestamp] = None) -> Dict[str, Any]:
+    """Synthetic v8 chart response: a seeded random walk ending at end (default now)."""
+    step = pd.Timedelta(interval.replace("m", "min") if interval.endswith("m") and interval != "1mo" else interval)
+    end = (end or pd.Timestamp.now(tz="UTC")).floor(step)
+    stamps = pd.date_range(end=end, periods=bars, freq=step)
+    rng = np.random.default_rng(zlib.crc32(symbol.encode("utf-8")))
+    close = 100 + rng.standard_normal(bars).cumsum()
+    quote = {
+        "open": (close + rng.standard_normal(bars) * 0.1).round(4).tolist(),
+        "high": (close + rng.random(bars)).round(4).tolist(),
+        "low": (close - rng.random(bars)).round(4).tolist(),
+        "close": close.round(4).tolist(),
+        "volume": rng.integers(0, 1_000_000, bars).tolist(),
+    }
+    return {"chart": {"result": [{
+        "meta": {"symbol": symbol, "dataGranularity": interval},
+        "timestamp": (stamps.asi8 // 10**9).tolist(),
+        "indicators": {"quote": [quote]},
+    }], "error": None}}
+
+
+def chart_frame(payload: Dict[str, Any]) -> pd.DataFrame:
+    """Bars of a v8 chart response, indexed by UTC date like yahooquery's history."""
+    result = payload["chart"]["result"][0]
+    quote = result["indicators"]["quote"][0]
+    df = pd.DataFrame({c: pd.to_numeric(pd.Series(quote.get(c), dtype=object), errors="coerce")
+                       for c in ("open", "high", "low", "close", "volume")})
+    df.index = pd.to_datetime(pd.Series(result.get("timestamp", []), dtype="int64"), unit="s", utc=True)
+    df.index.name = "date"
+    return df.loc[df["close"].notna()]
+
+
+class FakeTicker:
+    """The slice of yahooquery.Ticker the client uses: history()."""
+
+    def __init__(self, yahoo: "FakeYahoo", symbols: Union[str, List[str]]):
+        self.yahoo = yahoo
+        self.symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+
+    def history(self, period: str = "1mo", interval: str = "15m",
+                start: Optional[datetime] = None, **kwargs) -> Union[pd.DataFrame, Dict[str, Any]]:
+        return self.yahoo.history(self.symbols, period, interval, start)
+
+
+class FakeYahoo:
+    """
+    Replays chart responses for any symbol. Call it like yahooquery.Ticker;
+    counters hold the calls, symbols, bars served and calls rate limited.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, bars: int = 500,
+                 recordings: Optional[str] = None, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.bars = bars
+        self.counters: Dict[str, int] = {"calls": 0, "symbols": 0, "bars": 0, "rate_limited": 0}
+        self._charts: Dict[tuple, pd.DataFrame] = {}
+        self._recorded: Dict[str, Dict[str, Any]] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        if recordings:
+            for path in glob.glob(os.path.join(recordings, "*.json")):
+                with open(path, "r", encoding="utf-8") as file:
+                    payload = json.load(file)
+                self._recorded[payload["chart"]["result"][0]["meta"]["symbol"]] = payload
+
+    def __call__(self, symbols: Union[str, List[str]], **kwargs) -> FakeTicker:
+        return FakeTicker(self, symbols)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += amount
+
+    def bars_for(self, symbol: str, interval: str) -> pd.DataFrame:
+        """Every bar the fake holds for a symbol, recorded if available."""
+        key = (symbol, interval)
+        with self._lock:
+            cached = self._charts.get(key)
+        if cached is None:
+            payload = self._recorded.get(symbol) or chart_payload(symbol, interval, self.bars)
+            cached = chart_frame(payload)
+            with self._lock:
+                self._charts[key] = cached
+        return cached
+
+    def history(self, symbols: List[str], period: str, interval: str,
+                start: Optional[datetime]) -> Union[pd.DataFrame, Dict[str, Any]]:
+        self.count("calls")
+        self.count("symbols", len(symbols))
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            throttled = self._random.random() < self.error_rate
+        if throttled:
+            self.count("rate_limited")
+            return {symbol: RATE_LIMITED for symbol in symbols}
+        frames = {}
+        for symbol in symbols:
+            df = self.bars_for(symbol, interval)
+            if start is not None:
+                df = df.loc[df.index >= pd.Timestamp(start).tz_convert("UTC")]
+            elif period in PERIODS and not df.empty:
+                df = df.loc[df.index > df.index[-1] - pd.Timedelta(days=PERIODS[period])]
+            frames[symbol] = df
+        self.count("bars", sum(len(df) for df in frames.values()))
+        return pd.concat(frames, names=["symbol", "date"])
+
+
+def record(symbols: List[str], interval: str, range_: str, out: str) -> List[str]:
+    """Save live v8 chart responses as {symbol}.json for FakeYahoo(recordings=out)."""
+    import requests
+    os.makedirs(out, exist_ok=True)
+    saved = []
+    for symbol in symbols:
+        response = requests.get(CHART_URL.format(symbol=symbol), params={"interval": interval, "range": range_},
+                                headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
+        response.raise_for_status()
+        path = os.path.join(out, f"{symbol}.json")
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(response.json(), file)
+        saved.append(path)
+        print(f"Recorded {symbol} to {path}")
+    return saved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record Yahoo chart responses for the benchmarks.")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--interval", default="15m")
+    parser.add_argument("--range", default="1mo")
+    parser.add_argument("--out", default=os.path.join("benchmarks", "recordings"))
+    args = parser.parse_args()
+    record(args.symbols, args.interval, args.range, args.out)
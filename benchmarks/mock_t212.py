@@ -0,0 +1,249 @@
+"""
+Local stand-in for the Trading212 API, used by the benchmarks.
+
+Serves the cash, history export and report download endpoints over plain
+HTTP/1.1 with keep-alive. connect_latency is paid once per new connection,
+emulating the TCP+TLS handshake of the real service, and latency is paid on
+every request. With rate_limit set, each method and path gets that many
+calls per rate_period seconds, answers carry T212-style x-ratelimit-* headers
+and calls over the limit get a 429 with Retry-After. The first server_errors
+API calls get a 503, to exercise the client's retries.
+"""
+import math
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Optional, Tuple
+
+API_PREFIX = "/api/v0"
+
+# Column layout of a Trading212 history export
+REPORT_COLUMNS = [
+    "Action", "Time", "ISIN", "Ticker", "Name", "No. of shares", "Price / share",
+    "Currency (Price / share)", "Exchange rate", "Total", "Currency (Total)", "ID",
+]
+
+
+def report_lines(rows: int, report_id: int = 1) -> Iterator[str]:
+    """Lines of a synthetic history export, header first, generated lazily."""
+    yield ",".join(REPORT_COLUMNS) + "\n"
+    for i in range(rows):
+        action = "Market buy" if i % 3 else "Market sell"
+        yield (
+            f"{action},2026-01-{1 + i % 28:02d} 10:{i % 60:02d}:00,GB00B03MLX29,VUSA,"
+            f"Vanguard S&P 500,{1 + i % 5},{50 + i % 10}.25,GBP,1,{(1 + i % 5) * 50.25:.2f},GBP,"
+            f"EOF{report_id}{i:08d}\n"
+        )
+
+
+def report_csv(rows: int, report_id: int = 1) -> str:
+    """Synthetic history export with the given number of rows."""
+    return "".join(report_lines(rows, report_id))
+
+
+class _Server(ThreadingHTTPServer):
+    # the default backlog of 5 drops concurrent connects, which then stall
+    # for a full second on SYN retransmit
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class MockT212Server:
+    """
+    Threaded mock server. Use as a context manager, the base URL to pass to
+    Trading212Client(base_url=...) is in .base_url once started.
+    """
+
+    def __init__(self, latency: float = 0.0, connect_latency: float = 0.0,
+                 export_polls: int = 1, report_rows: int = 100,
+                 rate_limit: Optional[int] = None, rate_period: float = 1.0, server_errors: int = 0):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.export_polls = export_polls
+        self.report_rows = report_rows
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self.server_errors = server_errors
+        self._windows: Dict[str, list] = {}
+        self.counters: Dict[str, int] = {"connections": 0, "requests": 0}
+        self._exports: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def host_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self) -> str:
+        return self.host_url + API_PREFIX
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def start(self) -> "MockT212Server":
+        self._server = _Server(("127.0.0.1", 0), _make_handler(self))
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self) -> "MockT212Server":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def rate_headers(self, key: str) -> Tuple[bool, Dict[str, str]]:
+        """Count a call against key's window, returns (allowed, headers)."""
+        if not self.rate_limit:
+            return True, {}
+        now = time.time()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now >= window[0]:
+                window = self._windows[key] = [now + self.rate_period, 0]
+            window[1] += 1
+            reset_at, used = window
+        headers = {
+            "x-ratelimit-limit": str(self.rate_limit),
+            "x-ratelimit-period": str(self.rate_period),
+            "x-ratelimit-remaining": str(max(0, self.rate_limit - used)),
+            "x-ratelimit-reset": f"{reset_at:.3f}",
+        }
+        if used > self.rate_limit:
+            self.count("rate_limited")
+            headers["Retry-After"] = str(math.ceil(reset_at - now))
+            return False, headers
+        return True, headers
+
+    def take_server_error(self) -> bool:
+        """True if this call should fail with a 503."""
+        with self._lock:
+            if self.server_errors <= 0:
+                return False
+            self.server_errors -= 1
+            self.counters["server_errors"] = self.counters.get("server_errors", 0) + 1
+            return True
+
+    # ---- endpoint behaviour, overridden by benchmarks that need more ----
+
+    def create_export(self) -> int:
+        with self._lock:
+            report_id = len(self._exports) + 1
+            self._exports[report_id] = 0
+        return report_id
+
+    def list_exports(self):
+        exports = []
+        with self._lock:
+            for report_id in self._exports:
+                self._exports[report_id] += 1
+                finished = self._exports[report_id] >= self.export_polls
+                exports.append({
+                    "reportId": report_id,
+                    "status": "Finished" if finished else "Processing",
+                    "downloadLink": f"{self.host_url}/reports/{report_id}.csv" if finished else None,
+                })
+        return exports
+
+
+def _make_handler(server: MockT212Server):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # send headers and body together, Nagle plus delayed ACKs would
+        # otherwise add ~40 ms to every keep-alive response
+        disable_nagle_algorithm = True
+        wbufsize = 1 << 16
+
+        def setup(self):
+            # one handler per connection, so this is the handshake cost
+            super().setup()
+            server.count("connections")
+            if server.connect_latency:
+                time.sleep(server.connect_latency)
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: str, content_type: str = "application/json",
+                  headers: Optional[Dict[str, str]] = None):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in {**self.rate_headers, **(headers or {})}.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_chunked(self, lines: Iterator[str], content_type: str, lines_per_chunk: int = 10000):
+            # stream a large body without building it, as the real report download does
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            block = []
+            for line in lines:
+                block.append(line)
+                if len(block) >= lines_per_chunk:
+                    self._write_chunk("".join(block).encode("utf-8"))
+                    block = []
+            if block:
+                self._write_chunk("".join(block).encode("utf-8"))
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+        def _begin(self) -> bool:
+            server.count("requests")
+            self.rate_headers: Dict[str, str] = {}
+            if server.latency:
+                time.sleep(server.latency)
+            if self.path.startswith(API_PREFIX):
+                if not self.headers.get("Authorization"):
+                    self._send(401, json.dumps({"message": "Unauthorized"}))
+                    return False
+                allowed, self.rate_headers = server.rate_headers(f"{self.command} {self.path}")
+                if not allowed:
+                    self._send(429, json.dumps({"message": "Too many requests"}))
+                    return False
+                if server.take_server_error():
+                    self._send(503, json.dumps({"message": "Service unavailable"}))
+                    return False
+            return True
+
+        def do_GET(self):
+            if not self._begin():
+                return
+            if self.path == API_PREFIX + "/equity/account/cash":
+                self._send(200, json.dumps({"free": 1250.5, "total": 10250.75, "invested": 9000.25}))
+            elif self.path == API_PREFIX + "/equity/history/exports":
+                self._send(200, json.dumps(server.list_exports()))
+            elif self.path.startswith("/reports/"):
+                report_id = int(self.path.rsplit("/", 1)[1].split(".")[0])
+                self._send_chunked(report_lines(server.report_rows, report_id), "text/csv")
+            else:
+                self._send(404, json.dumps({"message": "Not found"}))
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+            if not self._begin():
+                return
+            if self.path == API_PREFIX + "/equity/history/exports":
+                self._send(200, json.dumps({"reportId": server.create_export()}))
+            else:
+                self._send(404, json.dumps({"message": "Not found"}))
+
+    return Handler
@@ -0,0 +1,256 @@
+"""
+Reproducible benchmark suite, run against local stand-ins for both services.
+
+Scenarios:
+    scrape   full then incremental YFinance scrape of N tickers via FakeYahoo
+    t212     Trading212 cash fetch and history sync via MockT212Server
+    content  /data/content on market files of 10k, 100k and 1M rows
+    startup  API import time and time to the first answer, in fresh processes
+
+Everything runs in a scratch folder, so stored data and databases are left
+alone. Results go to stdout (or --output) as JSON; --compare checks every
+"seconds" figure against an earlier run and exits 1 on a regression. Run
+from the project root with:
+
+    python -m benchmarks.suite [--scenarios scrape,t212,content,startup] [--output results.json]
+                               [--compare baseline.json --tolerance 0.25]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from benchmarks.bench_startup import bench_startup
+from benchmarks.bench_transform import make_frame
+from benchmarks.fake_yahoo import FakeYahoo
+from benchmarks.mock_t212 import MockT212Server
+
+SCENARIOS = ("scrape", "t212", "content", "startup")
+CREDENTIALS = ("bench-key", "bench-secret")
+# a slower figure only counts as a regression if it is also this much slower
+NOISE_FLOOR = 0.005
+
+
+def _timed(func: Callable[[], Any]) -> Tuple[Any, float]:
+    # the clients print every step, keep the JSON on stdout clean
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    return result, round(time.perf_counter() - start, 4)
+
+
+def _best(func: Callable[[], Any], repeat: int) -> Tuple[Any, float]:
+    results = [_timed(func) for _ in range(max(1, repeat))]
+    return results[-1][0], min(seconds for _, seconds in results)
+
+
+def bench_scrape(tickers: int, latency: float, error_rate: float, bars: int,
+                 batch_size: int, workers: int, requests_per_second: float) -> Dict[str, Any]:
+    """Scrape every ticker from nothing, then again incrementally."""
+    from clients.yfinance import YFinanceClient
+
+    yahoo = FakeYahoo(latency=latency, error_rate=error_rate, bars=bars)
+    pd.DataFrame({"Name": "Bench", "ISIN": "", "Ticker": [f"BENCH{i:04d}" for i in range(tickers)]}) \
+        .to_csv("tickers.csv", index=False)
+    client = YFinanceClient(max_workers=workers, requests_per_second=requests_per_second,
+                            batch_size=batch_size, ticker_factory=yahoo)
+
+    def run() -> Dict[str, Any]:
+        before = dict(yahoo.counters)
+        summary, seconds = _timed(client.get_tickers)
+        return {
+            "seconds": seconds,
+            "succeeded": summary["succeeded"],
+            "failed": summary["failed"],
+            **{name: yahoo.counters[name] - before[name] for name in yahoo.counters},
+        }
+
+    return {"tickers": tickers, "latency": latency, "error_rate": error_rate,
+            "full": run(), "incremental": run()}
+
+
+def bench_t212(report_rows: int, latency: float, connect_latency: float, export_polls: int,
+               rate_limit: Optional[int], rate_period: float) -> Dict[str, Any]:
+    """Fetch the cash balance and sync the history export, twice."""
+    from clients.trading212 import Trading212Client
+
+    with MockT212Server(latency=latency, connect_latency=connect_latency, export_polls=export_polls,
+                        report_rows=report_rows, rate_limit=rate_limit, rate_period=rate_period) as server:
+        client = Trading212Client(base_url=server.base_url, credentials=CREDENTIALS)
+
+        def run() -> Dict[str, Any]:
+            before = dict(server.counters)
+            report, seconds = _timed(lambda: (client.fetch_account_cash(), client.download_historic_data())[1])
+            return {
+                "seconds": seconds,
+                "saved": report is not None,
+                **{name: server.counters.get(name, 0) - before.get(name, 0)
+                   for name in ("requests", "connections", "rate_limited")},
+            }
+
+        return {"report_rows": report_rows, "latency": latency, "rate_limit": rate_limit,
+                "sync": run(), "resync": run()}
+
+
+def bench_content(rows: List[int], repeat: int, records_max: int) -> Dict[str, Any]:
+    """Serve market files of each size through the API, cold and warm."""
+    from fastapi.testclient import TestClient
+    from utils.data_transform import normalize_yfinance_data
+    from utils.storage import market_data_path, save_frame
+    import api
+
+    results = {}
+    with TestClient(api.app) as http:
+        for n in rows:
+            path = market_data_path(f"BENCH{n}", "15m")
+            save_frame(normalize_yfinance_data(make_frame(n)), path)
+
+            def get(**params) -> int:
+                response = http.get("/data/content", params={"path": path, **params})
+                response.raise_for_status()
+                return len(response.content)
+
+            def cold_page() -> int:
+                api.frame_cache.invalidate(path)
+                return get(limit=100)
+
+            entry: Dict[str, Any] = {"rows": n}
+            size, seconds = _best(cold_page, repeat)
+            entry["cold_page"] = {"seconds": seconds, "bytes": size}
+            for name, params in (("warm_page", {"limit": 100}),
+                                 ("full_columns", {"format": "columns"}),
+                                 ("full_arrow", {"format": "arrow"}),
+                                 ("full_records", {"format": "records"})):
+                if name == "full_records" and n > records_max:
+                    continue
+                size, seconds = _best(lambda: get(**params), repeat)
+                entry[name] = {"seconds": seconds, "bytes": size}
+            results[str(n)] = entry
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    """Versions and commit the results were measured with."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "time": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+    }
+
+
+def _seconds(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    # every timing in a result tree, keyed by its dotted path
+    found = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            found.update(_seconds(value, name + "."))
+        elif key == "seconds" and isinstance(value, (int, float)):
+            found[name] = float(value)
+    return found
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """Timings more than tolerance (a fraction) slower than in baseline."""
+    old = _seconds(baseline.get("scenarios", {}))
+    regressions = []
+    for name, seconds in _seconds(results["scenarios"]).items():
+        before = old.get(name)
+        if before is not None and seconds > before * (1 + tolerance) and seconds - before > NOISE_FLOOR:
+            regressions.append({"name": name, "baseline": before, "seconds": seconds,
+                                "change": round(seconds / before - 1, 3) if before else None})
+    return regressions
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(unknown)}, expected: {', '.join(SCENARIOS)}")
+    results: Dict[str, Any] = {"environment": environment(), "scenarios": {}}
+    cwd = os.getcwd()
+    # a scratch working folder, the clients and databases write relative to it
+    with tempfile.TemporaryDirectory(prefix="bench-", ignore_cleanup_errors=True) as workdir:
+        os.chdir(workdir)
+        try:
+            if "scrape" in scenarios:
+                results["scenarios"]["scrape"] = bench_scrape(
+                    args.tickers, args.yahoo_latency, args.yahoo_error_rate, args.bars,
+                    args.batch_size, args.workers, args.yahoo_rps)
+            if "t212" in scenarios:
+                results["scenarios"]["t212"] = bench_t212(
+                    args.report_rows, args.t212_latency, args.connect_latency, args.export_polls,
+                    args.t212_rate_limit, args.t212_rate_period)
+            if "content" in scenarios:
+                rows = [int(n) for n in args.rows.split(",") if n.strip()]
+                results["scenarios"]["content"] = bench_content(rows, args.repeat, args.records_max)
+            if "startup" in scenarios:
+                results["scenarios"]["startup"] = bench_startup(args.repeat)
+        finally:
+            from utils import catalog, ledger
+            for db in (catalog.db, ledger.db):
+                if db.database is not None:
+                    db.close()
+            os.chdir(cwd)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the benchmark suite against local fakes.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="earlier results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, as a fraction")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per timing, the best is kept")
+    # scrape
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--bars", type=int, default=2000, help="bars the fake holds per symbol")
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--yahoo-rps", type=float, default=1000.0, help="client request budget, high to time the code")
+    parser.add_argument("--yahoo-latency", type=float, default=0.05, help="seconds per Yahoo call")
+    parser.add_argument("--yahoo-error-rate", type=float, default=0.0, help="share of Yahoo calls answering 429")
+    # t212
+    parser.add_argument("--report-rows", type=int, default=10000)
+    parser.add_argument("--t212-latency", type=float, default=0.01)
+    parser.add_argument("--connect-latency", type=float, default=0.02)
+    parser.add_argument("--export-polls", type=int, default=2)
+    parser.add_argument("--t212-rate-limit", type=int, default=10, help="calls per period per endpoint")
+    parser.add_argument("--t212-rate-period", type=float, default=1.0)
+    # content
+    parser.add_argument("--rows", default="10000,100000,1000000")
+    parser.add_argument("--records-max", type=int, default=100000, help="largest file served as records")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            results["regressions"] = compare(results, json.load(file), args.tolerance)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+        print(f"Results written to {args.output}")
+    else:
+        print(text)
+    if results.get("regressions"):
+        for r in results["regressions"]:
+            print(f"Regression: {r['name']} {r['baseline']}s -> {r['seconds']}s", file=sys.stderr)
+        sys.exit(1)
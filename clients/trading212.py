@@ -1,127 +1,318 @@
+import asyncio
 import base64
+import os
+import threading
 import time
 import requests
-import pandas as pd
-from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from config import get_api_keys
+from utils import ingest, ledger
+from utils.events import publish
+from utils.metrics import (EXPORT_WAIT_SECONDS, POLL_ITERATIONS, UPSTREAM_RATE_LIMITED, UPSTREAM_REQUESTS,
+                           UPSTREAM_RETRIES, UPSTREAM_ROWS, UPSTREAM_SECONDS, stage)
+from utils.rate_limit import RateLimitGovernor
+
+# build the authorization header once per set of credentials
+@lru_cache(maxsize=8)
+def _auth_header(key_id: str, secret_key: str) -> str:
+    # create the authorization header value and encode to UTF-8 (bytes)
+    credentials_string = f"{key_id}:{secret_key}"
+    raw_bytes = credentials_string.encode("utf-8")
+    # encode the bytes to Base64 then back to useable string
+    base64_bytes = base64.b64encode(raw_bytes)
+    base64_string = base64_bytes.decode("utf-8")
+    # format the final authorization header value
+    return f"Basic {base64_string}"
+
+# read the T212 api keys from the .env file once per process
+@lru_cache(maxsize=1)
+def _env_credentials() -> Tuple[str, str]:
+    key_id, secret_key = get_api_keys("Trading212")
+    # exit the function if we didn't get a key, failures are not cached
+    if not key_id or not secret_key:
+        raise ValueError("Credentials missing in .env file.")
+    return key_id, secret_key
 
 class Trading212Client:
 
     # define the specific api endpoints
     ENDPOINT_CASH = "/equity/account/cash"
     ENDPOINT_HISTORY = "/equity/history/exports"
+    # (connect, read) timeouts in seconds
+    DEFAULT_TIMEOUT = (5.0, 30.0)
+    # retries with exponential backoff for dropped connections and server errors
+    MAX_RETRIES = 3
+    BACKOFF_FACTOR = 0.5
+    RETRY_STATUSES = (500, 502, 503, 504)
+    # documented per-endpoint limits, used until the rate-limit headers arrive
+    RATE_LIMITS = {
+        f"GET {ENDPOINT_CASH}": 2.0,
+        f"GET {ENDPOINT_HISTORY}": 60.0,
+        f"POST {ENDPOINT_HISTORY}": 30.0,
+    }
+    # 429 responses absorbed per request before giving up
+    MAX_RATE_LIMITED = 5
+    # memory ceiling for typing a downloaded export, it is processed in chunks that fit
+    INGEST_MEMORY_LIMIT = ingest.DEFAULT_MEMORY_LIMIT
+    # export polling: first wait, growth per poll, longest wait and overall deadline
+    POLL_INITIAL_DELAY = 1.0
+    POLL_BACKOFF = 1.5
+    POLL_MAX_DELAY = 15.0
+    POLL_DEADLINE = 300.0
+    # longest an async wait sleeps before checking for a cancel
+    CANCEL_CHECK = 0.25
+
+    # pooled keep-alive sessions shared by every client for the same host
+    _sessions: Dict[str, requests.Session] = {}
+    _sessions_lock = threading.Lock()
+    # one rate-limit governor per host, shared by sync and async clients
+    _governors: Dict[str, RateLimitGovernor] = {}
 
     # class constructor
-    def __init__(self, is_demo: bool = False):
-        # define the URL we want to 'call'.
-        if is_demo:
-           self.url = "https://demo.trading212.com/api/v0"
-        else:
-           self.url = "https://live.trading212.com/api/v0"
-        self.headers = self._set_auth_header()
+    def __init__(self, is_demo: bool = False, base_url: Optional[str] = None,
+                 credentials: Optional[Tuple[str, str]] = None,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+                 session: Optional[requests.Session] = None):
+        self.url = self._base_url(is_demo, base_url)
+        self.timeout = timeout
+        self.headers = self._set_auth_header(credentials)
+        self.session = session or self._shared_session(self.url)
+        self.governor = self._shared_governor(self.url)
 
     ##~~~~~~~~~~~~~~~~~~
     ## HELPER FUNCTIONS
     ##~~~~~~~~~~~~~~~~~~
 
+    # function to pick the URL we want to 'call'
+    @staticmethod
+    def _base_url(is_demo: bool, base_url: Optional[str]) -> str:
+        if base_url:
+           return base_url.rstrip("/")
+        if is_demo:
+           return "https://demo.trading212.com/api/v0"
+        return "https://live.trading212.com/api/v0"
+
+    # function to get the pooled session for a host, creating it on first use
+    @classmethod
+    def _shared_session(cls, url: str) -> requests.Session:
+        with cls._sessions_lock:
+            session = cls._sessions.get(url)
+            if session is None:
+                session = requests.Session()
+                # only idempotent GETs are retried on server errors, a POST is
+                # only retried if the connection failed before it was sent. A 429
+                # is left to the rate-limit governor, whose wait can be cancelled
+                retry = Retry(total=cls.MAX_RETRIES, backoff_factor=cls.BACKOFF_FACTOR,
+                              status_forcelist=cls.RETRY_STATUSES, allowed_methods=frozenset(["GET"]),
+                              respect_retry_after_header=False, raise_on_status=False)
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                cls._sessions[url] = session
+            return session
+
+    # function to get the rate-limit governor for a host, creating it on first use
+    @classmethod
+    def _shared_governor(cls, url: str) -> RateLimitGovernor:
+        with cls._sessions_lock:
+            governor = cls._governors.get(url)
+            if governor is None:
+                governor = RateLimitGovernor(cls.RATE_LIMITS)
+                cls._governors[url] = governor
+            return governor
+
     # function to set the authorization header for requests
-    def _set_auth_header(self) -> Optional[Dict[str, str]]:
-        # get the T212 api keys from the .env file
-        key_id, secret_key = get_api_keys("Trading212")
+    def _set_auth_header(self, credentials: Optional[Tuple[str, str]] = None) -> Optional[Dict[str, str]]:
+        # get the T212 api keys, the .env file is only read once per process
+        key_id, secret_key = credentials or _env_credentials()
         # exit the function if we didn't get a key
         if not key_id or not secret_key:
             raise ValueError("Credentials missing in .env file.")
-        # create the authorization header value and encode to UTF-8 (bytes)
-        credentials_string = f"{key_id}:{secret_key}"
-        raw_bytes = credentials_string.encode("utf-8")
-        # encode the bytes to Base64 then back to useable string
-        base64_bytes = base64.b64encode(raw_bytes)
-        base64_string = base64_bytes.decode("utf-8")
-        # format the final authorization header value
-        auth_header_value = f"Basic {base64_string}"
         headers = {
-            "Authorization": auth_header_value
+            "Authorization": _auth_header(key_id, secret_key)
         }
         return headers
 
-    # function to make HTTP requests
-    def _make_request(self, method: str, endpoint: str, payload: Optional[dict] = None) -> Any:
+    # function to check a response and return its JSON data
+    def _parse_response(self, status_code: int, text: str, json_data) -> Any:
+        # check the response status code
+        if status_code == 200:
+            # on successful request return the JSON data
+            return json_data()
+        # on failed request print the status code and reason
+        error_msg = f"Request failed. Status: {status_code} Reason: {text}"
+        print(error_msg)
+        raise Exception(error_msg)
+
+    # function to build the history export request body
+    def _history_payload(self) -> Dict[str, Any]:
+        # only request the days since the last ingested transaction, plus an overlap
+        sdt, now = ledger.sync_window()
+        print(f"Requesting history from {sdt:%Y-%m-%d %H:%M} to {now:%Y-%m-%d %H:%M}")
+        time_from = sdt.strftime("%Y-%m-%dT%H:%M:%SZ")
+        time_to = now.strftime("%Y-%m-%dT%H:%M:%SZ")
+        # set payload
+        return {
+          "dataIncluded": {
+            "includeDividends": True,
+            "includeInterest": True,
+            "includeOrders": True,
+            "includeTransactions": True
+            },
+          "timeFrom": time_from,
+          "timeTo": time_to
+        }
+
+    # function to yield the waits between export polls, growing until the deadline
+    def _poll_delays(self, deadline: float) -> Iterator[float]:
+        # short waits first so quick exports come back in seconds, then back
+        # off so a slow export doesn't spend the request budget
+        deadline_at = time.monotonic() + deadline
+        delay = self.POLL_INITIAL_DELAY
+        while time.monotonic() + delay < deadline_at:
+            yield delay
+            delay = min(self.POLL_MAX_DELAY, delay * self.POLL_BACKOFF)
+
+    # function to check a polled exports list, returns (finished, download link)
+    def _check_report(self, exports: Optional[List[Dict[str, Any]]], report_id: int, attempt: int) -> Tuple[bool, Optional[str]]:
+        # make sure it found the target report
+        target_report = self._find_report(exports, report_id)
+        if not target_report:
+            return False, None
+        status = target_report.get("status")
+        publish("t212.report", report_id=report_id, status=status, attempt=attempt)
+        # check if the report is finished
+        if status == "Finished":
+            print(f"Status is {status}")
+            return True, target_report.get("downloadLink")
+        # a failed export will never finish, stop polling
+        if status in ("Failed", "Canceled"):
+            print(f"Status is {status}")
+            return True, None
+        return False, None
+
+    # function to find a report in the exports list
+    def _find_report(self, exports: Optional[List[Dict[str, Any]]], report_id: int) -> Optional[Dict[str, Any]]:
+        # check if the request returned any exports
+        for report in exports or []:
+            # find the report with the matching report ID
+            if report.get("reportId") == report_id:
+                return report
+        return None
+
+    # function to save a downloaded report, typed and merged into the ledger in bounded chunks
+    def _save_report(self, csv_path: str, report_id: int) -> Optional[str]:
+        try:
+            result = ingest.ingest_report(csv_path, report_id, self.INGEST_MEMORY_LIMIT)
+        finally:
+            # the raw download is only needed until the typed copy exists
+            os.remove(csv_path)
+        # check report was not empty
+        if result is None:
+            # warn user if report was empty
+            print(".csv report was empty.")
+            return None
+        UPSTREAM_ROWS.inc(result["rows"], service="trading212")
+        if result["invalid"]:
+            print(f"{result['invalid']} rows had no readable Time and were left out of the ledger")
+        print(f"Saved to {result['file']}, {result['new_rows']} new of {result['rows']} transactions "
+              f"in {result['chunks']} chunks")
+        publish("rows.written", file=result["file"], rows=result["rows"], new_rows=result["new_rows"])
+        return result["file"]
+
+    # function to count a response in the metrics by status
+    @staticmethod
+    def _count_response(key: str, status_code: int) -> None:
+        UPSTREAM_REQUESTS.inc(service="trading212", endpoint=key, status=status_code)
+        if status_code == 429:
+            UPSTREAM_RATE_LIMITED.inc(service="trading212", endpoint=key)
+
+    # function to make HTTP requests, returns None if cancelled while rate limited
+    def _make_request(self, method: str, endpoint: str, payload: Optional[dict] = None,
+                      cancel_event: Optional[threading.Event] = None, deadline_at: Optional[float] = None) -> Any:
         # construct the full URL
         url = self.url + endpoint
+        key = f"{method} {endpoint}"
         print(f"\nSending {method} request to: {endpoint}")
         # check if headers are set
         if not self.headers:
             raise ValueError("Headers not set, check API keys")
         # run inside a try catch block for error handling
         try:
-            # perform the HTTP request based on the method
-            if method == "GET":
-                response = requests.get(url, headers=self.headers)
-            elif method == "POST":
-                response = requests.post(url, headers=self.headers, json=payload)
-            else:
+            if method not in ("GET", "POST"):
                 raise ValueError("Unsupported HTTP request")
-            # check the response status code
-            if response.status_code == 200:
-                # on successful request return the JSON data
-                return response.json()
-            else:
-                # on failed request print the status code and reason
-                error_msg = f"Request failed. Status: {response.status_code} Reason: {response.text}"
-                print(error_msg)
-                raise Exception(error_msg)
+            for _ in range(self.MAX_RATE_LIMITED + 1):
+                # hold the call until the endpoint's rate limit allows it
+                self._check_deadline(key, deadline_at)
+                if self.governor.wait(key, cancel_event):
+                    return None
+                # perform the HTTP request on the pooled session
+                with UPSTREAM_SECONDS.time(service="trading212", endpoint=key):
+                    response = self.session.request(method, url, headers=self.headers, json=payload, timeout=self.timeout)
+                self._count_response(key, response.status_code)
+                delay = self.governor.update(key, response.status_code, response.headers)
+                if response.status_code != 429:
+                    break
+                print(f"Rate limited on {endpoint}, retrying in {delay:.1f}s")
+                UPSTREAM_RETRIES.inc(service="trading212", endpoint=key, reason="rate_limited")
+                publish("t212.rate_limited", endpoint=endpoint, retry_in=delay)
+            return self._parse_response(response.status_code, response.text, response.json)
+        # the caller's deadline reports its own timeout
+        except TimeoutError:
+            raise
         # catch any exceptions that occur during the request
         except Exception as e:
             print(f"An error occurred during request: {e}")
+            publish("error", source="trading212", endpoint=endpoint, message=str(e))
             raise e
 
+    # function to give up on a call the rate limit would hold past the caller's deadline
+    def _check_deadline(self, key: str, deadline_at: Optional[float]) -> None:
+        if deadline_at is not None and time.monotonic() + self.governor.delay(key) > deadline_at:
+            raise TimeoutError(f"Rate limit on {key} would hold the call past the deadline")
+
+    # function to sleep that wakes early if the caller cancels
+    def _wait(self, seconds: float, cancel_event: Optional[threading.Event]) -> bool:
+        if cancel_event is None:
+            time.sleep(seconds)
+            return False
+        return cancel_event.wait(seconds)
+
     # function to poll for report completion
-    def _poll_for_completion(self, report_id: int) -> Optional[str]:
+    def _poll_for_completion(self, report_id: int, cancel_event: Optional[threading.Event] = None,
+                             deadline: Optional[float] = None) -> Optional[str]:
         # define the endpoint
         endpoint = self.ENDPOINT_HISTORY
-        # set loop variable
-        attempts: int = 10
-        count: int = 1
+        deadline = deadline or self.POLL_DEADLINE
+        deadline_at = time.monotonic() + deadline
         # run inside a try catch block for error handling
         try:
-            # loop until max attempts
-            while count < attempts:
-                print(f"Checking status, attempt {count} of {attempts}...")
-                # wait 5 seconds before HTTP request to avoid multiple calls in short succession
-                time.sleep(5)
-                # perform GET request on endpoint
-                exports = self._make_request("GET", endpoint)
-                # wait before next attempt
-                time.sleep(5)
-                # Check for a 'too many requests' error and break if so
-                if exports == 429:
-                    print("Rate limit exceeded, waiting longer before trying again...")
-                    time.sleep(5)
-                # check if the request returned any exports
-                if exports:
-                    target_report = None
-                    # find the report with the matching report ID
-                    for report in exports:
-                        if report.get("reportId") == report_id:
-                            target_report = report
-                            #  exit the loop early if theres no report to wait for
-                            break
-                    # make sure it found the target report
-                    if target_report:
-                        status = target_report.get("status")
-                        # check if the report is finished
-                        if status == "Finished":
-                            print(f"Status is {status}")
-                            # return the download link
-                            return target_report.get("downloadLink")
-                count += 1
+            # poll with growing waits until the report is done or the deadline passes
+            for attempt, delay in enumerate(self._poll_delays(deadline), start=1):
+                print(f"Checking status, attempt {attempt}...")
+                publish("t212.report", report_id=report_id, status="Polling", attempt=attempt)
+                if self._wait(delay, cancel_event):
+                    print("\nCancelled while waiting on report")
+                    return None
+                POLL_ITERATIONS.inc()
+                # perform GET request on endpoint, the governor spaces the calls
+                exports = self._make_request("GET", endpoint, cancel_event=cancel_event, deadline_at=deadline_at)
+                done, download_link = self._check_report(exports, report_id, attempt)
+                if done:
+                    return download_link
+        # the rate limit would outlast the deadline, the same as running out of polls
+        except TimeoutError as e:
+            print(f"\n{e}")
         # catch any exceptions that occur during polling
         except Exception as e:
             print(f"An error occurred while polling for report completion: \n{e}")
             return None
         # if we reach here it timed out
         print("\nTimed out waiting on report")
+        publish("t212.report", report_id=report_id, status="TimedOut")
         return None
 
     ##~~~~~~~~~~~~~~~~~~
@@ -132,66 +323,212 @@ class Trading212Client:
     def fetch_account_cash(self) -> Any:
         endpoint = self.ENDPOINT_CASH
         data = self._make_request("GET", endpoint)
-        # wait for response from requeest
-        time.sleep(2) # Reduced from 5 for snappier UI, can adjust back if rate limited
-        # Check for a 'too many requests' error and break if so
-        if data == 429:
-            print("Rate limit exceeded, try again later.")
-            return None
         if data:
             print(f"\n---CASH DATA---")
             print(data)
+            publish("t212.cash", cash=data)
             return data
         return None
 
     # function to download history report
-    def download_historic_data(self) -> Optional[str]:
+    def download_historic_data(self, cancel_event: Optional[threading.Event] = None) -> Optional[str]:
         endpoint = self.ENDPOINT_HISTORY
-        # set from and to date for history reports
-        now = datetime.now(timezone.utc)
-        sdt = now - timedelta(weeks=4)
-        time_from = sdt.strftime("%Y-%m-%dT%H:%M:%SZ")
-        time_to = now.strftime("%Y-%m-%dT%H:%M:%SZ")
-        # set payload
-        payload = {
-          "dataIncluded": {
-            "includeDividends": True,
-            "includeInterest": True,
-            "includeOrders": True,
-            "includeTransactions": True
-            },
-          "timeFrom": time_from,
-          "timeTo": time_to
-        }
+        payload = self._history_payload()
         # perform POST request on endpoint
-        response = self._make_request("POST", endpoint, payload)
-        time.sleep(2)        
-        # Check for a 'too many requests' error and break if so
-        if response == 429:
-            print("Rate limit exceeded, try again later.")
+        response = self._make_request("POST", endpoint, payload, cancel_event)
+        # check if a report id was in the response
+        if not response or "reportId" not in response:
+            print("Failed to get Report ID")
+            return None
+        report_id = response.get("reportId")
+        print(f"Report ID: {report_id}")
+        publish("t212.report", report_id=report_id, status="Requested")
+        # poll for the download to complete and get report link
+        requested = time.monotonic()
+        download_link = self._poll_for_completion(report_id, cancel_event)
+        if download_link:
+            EXPORT_WAIT_SECONDS.observe(time.monotonic() - requested)
+            print("\nDownloading .csv report...")
+            # stream the export to disk, it is never held in memory whole
+            csv_path = ingest.download_path(report_id)
+            with stage("t212.download") as info:
+                with self.session.get(download_link, stream=True, timeout=self.timeout) as download:
+                    download.raise_for_status()
+                    info["bytes"] = ingest.stream_to_file(download.iter_content(ingest.DOWNLOAD_CHUNK), csv_path)
+            return self._save_report(csv_path, report_id)
+        return None
+
+
+class AsyncTrading212Client(Trading212Client):
+    """
+    asyncio variant of Trading212Client built on httpx, with the same methods
+    as coroutines. Use it as an async context manager so the pooled
+    connections are closed when done.
+    """
+
+    # class constructor
+    def __init__(self, is_demo: bool = False, base_url: Optional[str] = None,
+                 credentials: Optional[Tuple[str, str]] = None,
+                 timeout: Tuple[float, float] = Trading212Client.DEFAULT_TIMEOUT,
+                 client=None):
+        import httpx
+
+        self.url = self._base_url(is_demo, base_url)
+        self.timeout = timeout
+        self.headers = self._set_auth_header(credentials)
+        # keep-alive pool, the transport retries connections that fail to open
+        self.client = client or httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout[1], connect=timeout[0]),
+            transport=httpx.AsyncHTTPTransport(retries=self.MAX_RETRIES),
+        )
+        self.governor = self._shared_governor(self.url)
+
+    async def __aenter__(self) -> "AsyncTrading212Client":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    # function to close the pooled connections
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    ##~~~~~~~~~~~~~~~~~~
+    ## HELPER FUNCTIONS
+    ##~~~~~~~~~~~~~~~~~~
+
+    # function to make HTTP requests, returns None if cancelled while rate limited
+    async def _make_request(self, method: str, endpoint: str, payload: Optional[dict] = None,
+                            cancel_event: Optional[threading.Event] = None,
+                            deadline_at: Optional[float] = None) -> Any:
+        # construct the full URL
+        url = self.url + endpoint
+        key = f"{method} {endpoint}"
+        print(f"\nSending {method} request to: {endpoint}")
+        # check if headers are set
+        if not self.headers:
+            raise ValueError("Headers not set, check API keys")
+        # run inside a try catch block for error handling
+        try:
+            if method not in ("GET", "POST"):
+                raise ValueError("Unsupported HTTP request")
+            attempt = 0
+            rate_limited = 0
+            while True:
+                # hold the call until the endpoint's rate limit allows it
+                self._check_deadline(key, deadline_at)
+                if await self._wait(self.governor.delay(key), cancel_event):
+                    return None
+                with UPSTREAM_SECONDS.time(service="trading212", endpoint=key):
+                    response = await self.client.request(method, url, headers=self.headers, json=payload)
+                self._count_response(key, response.status_code)
+                delay = self.governor.update(key, response.status_code, response.headers)
+                # absorb 429s, the governor has scheduled the retry
+                if response.status_code == 429 and rate_limited < self.MAX_RATE_LIMITED:
+                    print(f"Rate limited on {endpoint}, retrying in {delay:.1f}s")
+                    publish("t212.rate_limited", endpoint=endpoint, retry_in=delay)
+                    UPSTREAM_RETRIES.inc(service="trading212", endpoint=key, reason="rate_limited")
+                    rate_limited += 1
+                    continue
+                # retry idempotent GETs on server errors with exponential backoff
+                if method == "GET" and response.status_code in self.RETRY_STATUSES and attempt < self.MAX_RETRIES:
+                    UPSTREAM_RETRIES.inc(service="trading212", endpoint=key, reason="server_error")
+                    await asyncio.sleep(self.BACKOFF_FACTOR * (2 ** attempt))
+                    attempt += 1
+                    continue
+                return self._parse_response(response.status_code, response.text, response.json)
+        # the caller's deadline reports its own timeout
+        except TimeoutError:
+            raise
+        # catch any exceptions that occur during the request
+        except Exception as e:
+            print(f"An error occurred during request: {e}")
+            publish("error", source="trading212", endpoint=endpoint, message=str(e))
+            raise e
+
+    # function to sleep that wakes early if the caller cancels
+    async def _wait(self, seconds: float, cancel_event: Optional[threading.Event]) -> bool:
+        # a threading.Event cannot be awaited, so sleep in short slices and check it between them
+        wake_at = time.monotonic() + seconds
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                return True
+            remaining = wake_at - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(remaining, self.CANCEL_CHECK))
+
+    # function to poll for report completion
+    async def _poll_for_completion(self, report_id: int, cancel_event: Optional[threading.Event] = None,
+                                   deadline: Optional[float] = None) -> Optional[str]:
+        # define the endpoint
+        endpoint = self.ENDPOINT_HISTORY
+        deadline = deadline or self.POLL_DEADLINE
+        deadline_at = time.monotonic() + deadline
+        # run inside a try catch block for error handling
+        try:
+            # poll with growing waits until the report is done or the deadline passes
+            for attempt, delay in enumerate(self._poll_delays(deadline), start=1):
+                print(f"Checking status, attempt {attempt}...")
+                publish("t212.report", report_id=report_id, status="Polling", attempt=attempt)
+                if await self._wait(delay, cancel_event):
+                    print("\nCancelled while waiting on report")
+                    return None
+                POLL_ITERATIONS.inc()
+                # perform GET request on endpoint, the governor spaces the calls
+                exports = await self._make_request("GET", endpoint, cancel_event=cancel_event, deadline_at=deadline_at)
+                done, download_link = self._check_report(exports, report_id, attempt)
+                if done:
+                    return download_link
+        # the rate limit would outlast the deadline, the same as running out of polls
+        except TimeoutError as e:
+            print(f"\n{e}")
+        # catch any exceptions that occur during polling
+        except Exception as e:
+            print(f"An error occurred while polling for report completion: \n{e}")
             return None
+        # if we reach here it timed out
+        print("\nTimed out waiting on report")
+        publish("t212.report", report_id=report_id, status="TimedOut")
+        return None
+
+    ##~~~~~~~~~~~~~~~~~~
+    ## CLASS FUNCTIONS
+    ##~~~~~~~~~~~~~~~~~~
+
+    # function to fetch account cash data
+    async def fetch_account_cash(self) -> Any:
+        data = await self._make_request("GET", self.ENDPOINT_CASH)
+        if data:
+            print(f"\n---CASH DATA---")
+            print(data)
+            publish("t212.cash", cash=data)
+            return data
+        return None
+
+    # function to download history report
+    async def download_historic_data(self, cancel_event: Optional[threading.Event] = None) -> Optional[str]:
+        # perform POST request on endpoint
+        response = await self._make_request("POST", self.ENDPOINT_HISTORY, self._history_payload(), cancel_event)
         # check if a report id was in the response
         if not response or "reportId" not in response:
             print("Failed to get Report ID")
             return None
         report_id = response.get("reportId")
         print(f"Report ID: {report_id}")
+        publish("t212.report", report_id=report_id, status="Requested")
         # poll for the download to complete and get report link
-        download_link = self._poll_for_completion(report_id)
+        requested = time.monotonic()
+        download_link = await self._poll_for_completion(report_id, cancel_event)
         if download_link:
+            EXPORT_WAIT_SECONDS.observe(time.monotonic() - requested)
             print("\nDownloading .csv report...")
-            # read report into a dataframe
-            df = pd.read_csv(download_link)
-            # check report was not empty
-            if not df.empty:
-                # set filename
-                filename = f"History Report {report_id}.csv"
-                # save report
-                df.to_csv(filename, index=False)
-                print(f"Saved to {filename}")
-                return filename
-            else:
-                # warn user if report was empty
-                print(".csv report was empty.")
-                return None
+            # stream the export to disk over the pooled connection
+            csv_path = ingest.download_path(report_id)
+            with stage("t212.download") as info:
+                async with self.client.stream("GET", download_link) as download:
+                    download.raise_for_status()
+                    info["bytes"] = await ingest.astream_to_file(download.aiter_bytes(ingest.DOWNLOAD_CHUNK), csv_path)
+            # typing and the ledger writes are blocking, keep them off the event loop
+            return await asyncio.to_thread(self._save_report, csv_path, report_id)
         return None
@@ -1,48 +1,175 @@
 import time
 import os
+import threading
 import pandas as pd
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Any, List, Optional, Union
 from yahooquery import Ticker
+from utils import catalog, series_store
+from utils.events import publish
+from utils.metrics import UPSTREAM_RATE_LIMITED, UPSTREAM_REQUESTS, UPSTREAM_RETRIES, UPSTREAM_ROWS, UPSTREAM_SECONDS
+from utils.rate_limit import RateLimiter
+from utils.storage import market_data_path, load_frame, save_frame
 
 class YFinanceClient:
 
+    # known lse stocks that need the .L suffix on yahoo
+    LSE_SYMBOLS = ["CSP1", "VHYL", "XMWX", "IGL5"]
+    # how far back yahoo serves intraday bars, in days
+    INTRADAY_LOOKBACK = {"1m": 7, "2m": 60, "5m": 60, "15m": 60, "30m": 60, "60m": 730, "90m": 60, "1h": 730}
+    # yahoo calls per second when neither the caller nor YF_REQUESTS_PER_SECOND sets one,
+    # each call covers a whole batch of symbols
+    REQUESTS_PER_SECOND = 2.0
+
     # class constructor
-    def __init__(self):
-        pass
+    def __init__(self, max_workers: int = 4, requests_per_second: Optional[float] = None, batch_size: int = 20,
+                 ticker_factory: Optional[Callable[..., Any]] = None):
+        # size of the worker pool used by get_tickers
+        self.max_workers = max(1, max_workers)
+        # shared request budget, enforced across all workers
+        if requests_per_second is None:
+            requests_per_second = float(os.environ.get("YF_REQUESTS_PER_SECOND", self.REQUESTS_PER_SECOND))
+        self.limiter = RateLimiter(requests_per_second)
+        # yahoo calls made so far, read by callers that budget them
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+        # number of symbols fetched per yahooquery call
+        self.batch_size = max(1, batch_size)
+        # builds the yahooquery Ticker, swapped for a local fake by the benchmarks
+        self.ticker_factory = ticker_factory or Ticker
+
+    ##~~~~~~~~~~~~~~~~~~
+    ## HELPER FUNCTIONS
+    ##~~~~~~~~~~~~~~~~~~
+
+    # map a tickers.csv symbol to its yahoo symbol
+    def _map_symbol(self, symbol: str) -> str:
+        # add the .l for known lse stocks
+        if symbol in self.LSE_SYMBOLS and not symbol.endswith(".L"):
+            return f"{symbol}.L"
+        return symbol
 
     # yahooquery
-    def _yahooquery(self, ticker: str, interval: str, period: str) -> pd.DataFrame:
+    def _yahooquery(self, tickers: Union[str, List[str]], interval: str, period: str,
+                    start: Optional[datetime] = None) -> pd.DataFrame:
+        status = "error"
         try:
-            # set the ticker using yahooquery
-            t = Ticker(ticker)
-            # create dataframe with ticker data
-            df = t.history(period=period, interval=interval)
-            # return an empty dataframe if an empty dictionary returned
-            if isinstance(df, dict) or df.empty:
+            # wait for a slot in the shared request budget, one per call
+            self.limiter.acquire()
+            with self._calls_lock:
+                self.calls += 1
+            # set the ticker(s) using yahooquery, a list is fetched in one call
+            t = self.ticker_factory(tickers)
+            # create dataframe with ticker data, a start time overrides the period
+            with UPSTREAM_SECONDS.time(service="yahoo", endpoint="history"):
+                if start is not None:
+                    df = t.history(start=start, interval=interval)
+                else:
+                    df = t.history(period=period, interval=interval)
+            # failed symbols come back as error strings, keep only the frames
+            if isinstance(df, dict):
+                if any("429" in v for v in df.values() if isinstance(v, str)):
+                    UPSTREAM_RATE_LIMITED.inc(service="yahoo", endpoint="history")
+                frames = {k: v for k, v in df.items() if isinstance(v, pd.DataFrame) and not v.empty}
+                if not frames:
+                    status = "empty"
+                    return pd.DataFrame()
+                df = pd.concat(frames, names=["symbol", "date"], sort=False)
+            # return an empty dataframe if nothing came back
+            if df.empty:
+                status = "empty"
                 return pd.DataFrame()
-            df.reset_index(inplace=True)
+            status = "ok"
+            UPSTREAM_ROWS.inc(len(df), service="yahoo")
+            df = df.reset_index()
             # return the ticker data as dataframe
             return df
         except Exception as e:
-            print(f"\nError fetching {ticker}: {e}")
+            print(f"\nError fetching {tickers}: {e}")
+            publish("error", source="yfinance", symbols=tickers, message=str(e))
             # return empty dataframe on error
             return pd.DataFrame()
+        finally:
+            UPSTREAM_REQUESTS.inc(service="yahoo", endpoint="history", status=status)
 
-    # get the ticker symbols from the csv
-    def get_tickers(self, filename: str = "tickers.csv", col_index: int = 2):
-        # read list of tickers
+    # timestamp of the newest stored bar, or None if nothing is stored
+    def _last_timestamp(self, symbol: str, interval: str) -> Optional[datetime]:
+        filename = market_data_path(symbol, interval)
+        # a legacy CSV is converted first, so the refresh extends its history
+        if not os.path.exists(filename) and self._migrate_legacy(symbol, interval) is None:
+            return None
+        try:
+            # only the Date column is loaded from the store
+            dates = load_frame(filename, columns=["Date"])["Date"]
+            if dates.empty:
+                return None
+            return dates.max().to_pydatetime()
+        except Exception as e:
+            print(f"Could not read last timestamp from {filename}: {e}")
+            return None
+
+    # convert a symbol's legacy csv to the columnar store, if it has one
+    def _migrate_legacy(self, symbol: str, interval: str) -> Optional[str]:
+        from utils.migrate_storage import migrate_market_file
+        return migrate_market_file(symbol, interval)
+
+    # work out where an incremental fetch should start from
+    def _fetch_start(self, last: datetime, interval: str) -> datetime:
+        # refetch the newest stored bar since it may have been incomplete
+        start = last
+        # yahoo refuses intraday requests older than its lookback window
+        lookback = self.INTRADAY_LOOKBACK.get(interval)
+        if lookback:
+            earliest = datetime.now(timezone.utc) - timedelta(days=lookback - 1)
+            start = max(start, earliest)
+        return start
+
+    # type and save one symbol's bars to disk
+    def _save_market_data(self, df: pd.DataFrame, symbol: str, interval: str, append: bool = False) -> str:
+        from utils.data_transform import normalize_yfinance_data
+
+        # Convert to typed columns for storage
+        df = normalize_yfinance_data(df)
+        # set filename
+        filename = market_data_path(symbol, interval)
+        new_rows = len(df)
+        fresh = df
+        before = None
+        if append and not os.path.exists(filename):
+            # merge with the legacy csv rather than starting a file that hides it
+            self._migrate_legacy(symbol, interval)
+        if append and os.path.exists(filename):
+            # merge with the stored bars, the fresh copy of a bar wins on the boundary
+            existing = load_frame(filename)
+            before = len(existing)
+            df = pd.concat([existing, df], ignore_index=True)
+            df = df.drop_duplicates(subset="Date", keep="last").sort_values("Date", kind="stable")
+            new_rows = len(df) - before
+        # Save to Disk and record the new coverage in the catalog
+        save_frame(df, filename)
+        catalog.record(filename, df)
+        # publish to the memory-mapped store the API serves bar ranges from,
+        # appending only the fresh bars when the store already has the rest,
+        # a series that missed a publish is rewritten whole
+        try:
+            if before is not None:
+                series_store.append_series(symbol, interval, fresh, base_rows=before, full=df)
+            else:
+                series_store.write_series(symbol, interval, df)
+        except Exception as e:
+            # the parquet file is saved, the API serves it until a publish succeeds
+            print(f"Could not publish {symbol} to the series store: {e}")
+            publish("error", source="series_store", symbols=[symbol], message=str(e))
+        print(f"Success! Saved {len(df)} rows ({new_rows} new) to {filename}")
+        publish("rows.written", symbol=symbol, file=filename, rows=len(df), new_rows=new_rows)
+        return filename
+
+    # read the ticker symbols from the csv
+    def _read_tickers(self, filename: str, col_index: int) -> List[str]:
         try:
             data = pd.read_csv(filename, header=0, usecols=[col_index])
-            # loop through each and call download function
-            for row in data.itertuples(index=False, name=None):
-                value = str(row[0])
-                try:
-                    # download ticker data
-                    self.download_data(value)
-                    # sleep to avoid multiple calls in short succession
-                    time.sleep(1)
-                except Exception as e:
-                    # warn the user if there was an error
-                    print(f"\nError processing ticker {value}: {e}")
+            return [str(row[0]) for row in data.itertuples(index=False, name=None)]
         except FileNotFoundError:
             print(f"Error: {filename} not found.")
             raise ValueError(f"{filename} not found.")
@@ -53,33 +180,123 @@ class YFinanceClient:
             print(f"Error reading csv: {e}")
             raise e
 
-    # function to get historic market data
-    def download_data(self, symbol: str, interval: str = "15m", period: str = "1mo") -> None:
-        from utils.data_transform import transform_yfinance_data
+    # download a chunk of tickers inside the worker pool
+    def _fetch_chunk(self, symbols: List[str], cancel_event: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
+        # skip chunks that had not started when the scrape was cancelled
+        if cancel_event is not None and cancel_event.is_set():
+            return [{"symbol": symbol, "status": "cancelled", "file": None, "elapsed": 0.0} for symbol in symbols]
+        start = time.monotonic()
+        try:
+            files = self.download_batch(symbols)
+            error = None
+        except Exception as e:
+            # warn the user if there was an error
+            print(f"\nError processing tickers {symbols}: {e}")
+            publish("error", source="yfinance", symbols=symbols, message=str(e))
+            files, error = {}, str(e)
+        elapsed = round(time.monotonic() - start, 3)
+        results = []
+        for symbol in symbols:
+            filename = files.get(symbol)
+            result = {"symbol": symbol, "status": "success" if filename else "failed",
+                      "file": filename, "elapsed": elapsed}
+            if error:
+                result["error"] = error
+            results.append(result)
+            publish("ticker.finished", **result)
+        return results
 
+    ##~~~~~~~~~~~~~~~~~~
+    ## CLASS FUNCTIONS
+    ##~~~~~~~~~~~~~~~~~~
+
+    # get the ticker symbols from the csv and download them concurrently
+    def get_tickers(self, filename: str = "tickers.csv", col_index: int = 2,
+                    cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        symbols = self._read_tickers(filename, col_index)
+        start = time.monotonic()
+        results: List[Dict[str, Any]] = []
+        # group the symbols so each yahoo call covers a whole chunk
+        chunks = [symbols[i:i + self.batch_size] for i in range(0, len(symbols), self.batch_size)]
+        # fetch chunks in a bounded pool, the limiter spaces out the yahoo calls
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(self._fetch_chunk, chunk, cancel_event) for chunk in chunks]
+            for future in as_completed(futures):
+                results.extend(future.result())
+        elapsed = round(time.monotonic() - start, 3)
+        succeeded = sum(1 for r in results if r["status"] == "success")
+        cancelled = sum(1 for r in results if r["status"] == "cancelled")
+        print(f"\nFetched {succeeded} of {len(symbols)} tickers in {elapsed}s")
+        publish("scrape.finished", source="yfinance", succeeded=succeeded, total=len(symbols), elapsed=elapsed)
+        return {
+            "results": results,
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded - cancelled,
+            "cancelled": cancelled,
+            "elapsed": elapsed,
+        }
+
+    # function to get historic market data for several symbols in one call
+    def download_batch(self, symbols: List[str], interval: str = "15m", period: str = "1mo",
+                       incremental: bool = True) -> Dict[str, Optional[str]]:
+        # map each requested symbol to its yahoo symbol
+        mapping = {symbol: self._map_symbol(symbol) for symbol in symbols}
+        for symbol in symbols:
+            publish("ticker.started", symbol=symbol, interval=interval)
+        yahoo_symbols = list(dict.fromkeys(mapping.values()))
+        # split the chunk into symbols with stored bars and symbols needing a full fetch
+        starts: Dict[str, datetime] = {}
+        if incremental:
+            for yahoo_symbol in yahoo_symbols:
+                last = self._last_timestamp(yahoo_symbol, interval)
+                if last is not None:
+                    starts[yahoo_symbol] = self._fetch_start(last, interval)
+        full = [s for s in yahoo_symbols if s not in starts]
+        delta = [s for s in yahoo_symbols if s in starts]
+        saved: Dict[str, Optional[str]] = {}
+        if full:
+            saved.update(self._download_group(full, interval, period, None))
+        if delta:
+            # one call covers the group from the oldest missing bar onwards
+            saved.update(self._download_group(delta, interval, period, min(starts[s] for s in delta)))
+        return {symbol: saved.get(mapping[symbol]) for symbol in symbols}
+
+    # fetch one group of yahoo symbols in a single call and save each symbol
+    def _download_group(self, yahoo_symbols: List[str], interval: str, period: str,
+                        start: Optional[datetime]) -> Dict[str, Optional[str]]:
+        window = f"since {start:%Y-%m-%d %H:%M}" if start else period
+        print(f"\nFetching {interval} data for {len(yahoo_symbols)} symbols ({window})...")
+        # run the yahoo query for the whole group
+        df = self._yahooquery(yahoo_symbols, interval, period, start)
+        if df.empty and len(yahoo_symbols) > 1:
+            # the whole group failed, fall back to one call per symbol
+            print("Batch returned no data, retrying symbols individually...")
+            UPSTREAM_RETRIES.inc(len(yahoo_symbols), service="yahoo", endpoint="history", reason="batch_fallback")
+            return {s: self._download_group([s], interval, period, start)[s] for s in yahoo_symbols}
+        saved: Dict[str, Optional[str]] = {}
+        if not df.empty:
+            # split the multi-symbol frame and save each symbol on its own
+            for yahoo_symbol, group in df.groupby("symbol", sort=False):
+                try:
+                    saved[yahoo_symbol] = self._save_market_data(group, yahoo_symbol, interval, append=start is not None)
+                except Exception as e:
+                    # a bad symbol should not cost the rest of the group
+                    print(f"An error occurred saving {yahoo_symbol}: {e}")
+                    publish("error", source="yfinance", symbols=[yahoo_symbol], message=str(e))
+        for yahoo_symbol in yahoo_symbols:
+            if yahoo_symbol not in saved:
+                # warn the user if no data returned
+                print(f"Error: No data found for {yahoo_symbol}")
+                saved[yahoo_symbol] = None
+        return saved
+
+    # function to get historic market data
+    def download_data(self, symbol: str, interval: str = "15m", period: str = "1mo",
+                      incremental: bool = True) -> Optional[str]:
         print(f"\nFetching {interval} data for {symbol}...")
-        # add the .l for known lse stocks
-        if symbol in ["CSP1", "VHYL", "XMWX", "IGL5"] and not symbol.endswith(".L"):
-            symbol = f"{symbol}.L"
         try:
-            # run the yahoo query
-            df = self._yahooquery(symbol, interval, period)
-            if not df.empty:
-                # Transform data for user-friendly display
-                df = transform_yfinance_data(df)
-
-                # Save to Disk
-                folder = "market_data"
-                # create folder if dosent exist
-                os.makedirs(folder, exist_ok=True)
-                # set filename
-                filename = f"{folder}/{symbol}_{interval}.csv"
-                # save the report
-                df.to_csv(filename, index=False)
-                print(f"Success! Saved {len(df)} rows to {filename}")
-            else:
-                # warn the user if no data returned
-                print(f"Error: No data found for {symbol}")
+            return self.download_batch([symbol], interval, period, incremental)[symbol]
         except Exception as e:
             # warn the user if an error occurred
             print(f"An error occurred: {e}")
+        return None
@@ -1,48 +1,39 @@
 import React, { useState, useEffect } from 'react';
-import axios from 'axios';
 import { Sidebar } from './components/Sidebar';
 import { TopBar } from './components/TopBar';
 import { MainContent } from './components/MainContent';
+import { runJob } from './lib/jobs';
+import { onConnectionChange } from './lib/events';
 
 function App() {
   const [activeView, setActiveView] = useState('overview');
   const [status, setStatus] = useState('disconnected'); // 'connected' | 'disconnected' (Backend health)
   const [balance, setBalance] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
+  const [notice, setNotice] = useState(null); // { type: 'success' | 'error', text }
 
-  const BACKEND_URL = 'http://127.0.0.1:8000';
-
-  // Poll backend health
+  // Backend health comes from the event stream opening and dropping
   useEffect(() => {
-    const checkBackendStatus = async () => {
-      try {
-        await axios.get(`${BACKEND_URL}/`);
-        setStatus('connected');
-      } catch (error) {
-        setStatus('disconnected');
-      }
-    };
-
-    // Check immediately
-    checkBackendStatus();
-
-    // Check every 5 seconds
-    const interval = setInterval(checkBackendStatus, 5000);
-    return () => clearInterval(interval);
+    return onConnectionChange(connected => setStatus(connected ? 'connected' : 'disconnected'));
   }, []);
 
+  // Clear notices after 5 seconds
+  useEffect(() => {
+    if (!notice) return;
+    const timeout = setTimeout(() => setNotice(null), 5000);
+    return () => clearTimeout(timeout);
+  }, [notice]);
+
   // Handle Get Trading212 Info
   const handleGetTrading212Info = async () => {
     setIsLoading(true);
     try {
-      const response = await axios.post(`${BACKEND_URL}/scrape/t212`);
-      if (response.data.status === 'success') {
-        const cash = response.data.cash;
-        // cash example: {'free': 100, 'total': 1000, ...}
-        let val = cash?.total ?? 0;
-        setBalance(val);
-        alert("Trading212 data synced successfully!");
-      }
+      const result = await runJob('/scrape/t212');
+      const cash = result.cash;
+      // cash example: {'free': 100, 'total': 1000, ...}
+      let val = cash?.total ?? 0;
+      setBalance(val);
+      setNotice({ type: 'success', text: "Trading212 data synced successfully!" });
     } catch (error) {
       console.error("Trading212 Sync failed", error);
       const detail = error.response?.data?.detail || error.message;
@@ -52,7 +43,7 @@ function App() {
           setActiveView('settings'); // Placeholder for redirect
         }
       } else {
-        alert("Failed to get Trading212 Info: " + detail);
+        setNotice({ type: 'error', text: "Failed to get Trading212 Info: " + detail });
       }
     } finally {
       setIsLoading(false);
@@ -63,8 +54,8 @@ function App() {
   const handleGetStockInfo = async () => {
     setIsLoading(true);
     try {
-      await axios.post(`${BACKEND_URL}/scrape/yfinance`);
-      alert("Stock info updated successfully!");
+      await runJob('/scrape/yfinance');
+      setNotice({ type: 'success', text: "Stock info updated successfully!" });
     } catch (error) {
       console.error("Stock Sync failed", error);
       const detail = error.response?.data?.detail || error.message;
@@ -74,7 +65,7 @@ function App() {
           setActiveView('settings'); // Placeholder for redirect
         }
       } else {
-        alert("Failed to get Stock Info: " + detail);
+        setNotice({ type: 'error', text: "Failed to get Stock Info: " + detail });
       }
     } finally {
       setIsLoading(false);
@@ -102,6 +93,13 @@ function App() {
           isLoading={isLoading}
         />
 
+        {/* Sync Notices */}
+        {notice && (
+          <div className={`mx-4 mt-4 px-4 py-2 rounded-md text-sm font-medium ${notice.type === 'error' ? 'bg-[#da3633]/20 text-[#da3633]' : 'bg-[#2ea043]/20 text-[#2ea043]'}`}>
+            {notice.text}
+          </div>
+        )}
+
         {/* Content Area */}
         <MainContent activeView={activeView} />
 
@@ -2,10 +2,14 @@ import React, { useEffect, useState } from 'react';
 import axios from 'axios';
 import { Loader2, FileSpreadsheet, ChevronRight, ChevronLeft } from 'lucide-react';
 
+// Rows requested per page from /data/content
+const PAGE_SIZE = 100;
+
 export function DataView({ type, refreshTrigger }) {
     const [fileList, setFileList] = useState([]);
     const [selectedFile, setSelectedFile] = useState(null);
     const [fileContent, setFileContent] = useState(null);
+    const [offset, setOffset] = useState(0);
     const [loading, setLoading] = useState(false);
     const [contentLoading, setContentLoading] = useState(false);
 
@@ -27,7 +31,12 @@ export function DataView({ type, refreshTrigger }) {
         fetchFiles();
     }, [type, refreshTrigger]);
 
-    // Fetch file content when selected
+    // Start from the first page whenever a different file is selected
+    useEffect(() => {
+        setOffset(0);
+    }, [selectedFile]);
+
+    // Fetch the current page of file content when selected
     useEffect(() => {
         if (!selectedFile) {
             setFileContent(null);
@@ -37,7 +46,10 @@ export function DataView({ type, refreshTrigger }) {
         const fetchContent = async () => {
             setContentLoading(true);
             try {
-                const res = await axios.get(`http://127.0.0.1:8000/data/content?path=${encodeURIComponent(selectedFile)}`);
+                // Columnar layout: one array per column, no repeated keys per row
+                const res = await axios.get('http://127.0.0.1:8000/data/content', {
+                    params: { path: selectedFile, offset, limit: PAGE_SIZE, format: 'columns' }
+                });
                 setFileContent(res.data);
             } catch (err) {
                 console.error(err);
@@ -46,7 +58,9 @@ export function DataView({ type, refreshTrigger }) {
             }
         }
         fetchContent();
-    }, [selectedFile]);
+    }, [selectedFile, offset]);
+
+    const pageEnd = fileContent ? offset + fileContent.count : 0;
 
     return (
         <div className="bg-card text-card-foreground rounded-lg border shadow-sm flex flex-col h-[600px] overflow-hidden">
@@ -99,23 +113,35 @@ export function DataView({ type, refreshTrigger }) {
                                         </tr>
                                     </thead>
                                     <tbody className="divide-y divide-border/50">
-                                        {fileContent.data.slice(0, 100).map((row, i) => (
-                                            <tr key={i} className="hover:bg-muted/50">
+                                        {Array.from({ length: fileContent.count }, (_, i) => (
+                                            <tr key={offset + i} className="hover:bg-muted/50">
                                                 {fileContent.columns.map(col => (
-                                                    <td key={col} className="px-3 py-2 whitespace-nowrap">{String(row[col])}</td>
+                                                    <td key={col} className="px-3 py-2 whitespace-nowrap">{String(fileContent.data[col][i])}</td>
                                                 ))}
                                             </tr>
                                         ))}
-                                        {fileContent.data.length > 100 && (
-                                            <tr>
-                                                <td colSpan={fileContent.columns.length} className="px-3 py-2 text-center text-muted-foreground italic">
-                                                    ... {fileContent.data.length - 100} more rows ...
-                                                </td>
-                                            </tr>
-                                        )}
                                     </tbody>
                                 </table>
                             </div>
+                            <div className="flex items-center justify-between pt-3 text-xs text-muted-foreground">
+                                <button
+                                    onClick={() => setOffset(Math.max(0, offset - PAGE_SIZE))}
+                                    disabled={offset === 0}
+                                    className="flex items-center gap-1 px-2 py-1 rounded hover:bg-muted disabled:opacity-50 disabled:cursor-not-allowed"
+                                >
+                                    <ChevronLeft className="w-4 h-4" /> Prev
+                                </button>
+                                <span>
+                                    {fileContent.total === 0 ? 'No rows' : `Rows ${offset + 1}-${pageEnd} of ${fileContent.total}`}
+                                </span>
+                                <button
+                                    onClick={() => setOffset(offset + PAGE_SIZE)}
+                                    disabled={pageEnd >= fileContent.total}
+                                    className="flex items-center gap-1 px-2 py-1 rounded hover:bg-muted disabled:opacity-50 disabled:cursor-not-allowed"
+                                >
+                                    Next <ChevronRight className="w-4 h-4" />
+                                </button>
+                            </div>
                         </div>
                     ) : (
                         <div className="flex flex-col items-center justify-center h-full text-muted-foreground">
@@ -62,7 +62,9 @@ function TickerView({ ticker }) {
                 const match = files.find(f => f.includes(ticker));
 
                 if (match) {
-                    const contentRes = await axios.get(`http://127.0.0.1:8000/data/content?path=${encodeURIComponent(match)}`);
+                    const contentRes = await axios.get('http://127.0.0.1:8000/data/content', {
+                        params: { path: match, limit: 50 }
+                    });
                     setData(contentRes.data);
                 } else {
                     setError("No data found. Ensure you are connected/scraped.");
@@ -1,19 +1,49 @@
-import React, { useState } from 'react';
-import axios from 'axios';
+import React, { useEffect, useState } from 'react';
 import { Loader2, RefreshCw, BarChart, FileText } from 'lucide-react';
 import { cn } from '../lib/utils';
+import { runJob } from '../lib/jobs';
+import { subscribe } from '../lib/events';
+
+// Turn a progress event into a one-line status message
+function describeEvent(type, data) {
+    switch (type) {
+        case 'ticker.started': return `Fetching ${data.symbol}...`;
+        case 'ticker.finished': return `${data.symbol}: ${data.status}`;
+        case 'rows.written': return `Saved ${data.new_rows} new rows to ${data.file}`;
+        case 't212.report': return `Report ${data.report_id}: ${data.status}${data.attempt ? ` (attempt ${data.attempt})` : ''}`;
+        case 't212.rate_limited': return `Rate limited on ${data.endpoint}, retrying in ${data.retry_in.toFixed(1)}s`;
+        case 'scheduler.cycle': return data.scheduled ? `Scheduled refresh of ${data.scheduled} stale symbols${data.deferred ? ` (${data.deferred} deferred)` : ''}` : null;
+        case 'error': return `Error: ${data.message}`;
+        default: return null;
+    }
+}
 
 export function ScrapeControls({ onScrapeComplete }) {
     const [loading, setLoading] = useState({ t212: false, yfinance: false });
     const [status, setStatus] = useState(null);
+    const [progress, setProgress] = useState(null);
+
+    const isBusy = loading.t212 || loading.yfinance;
+
+    // Show live progress while a scrape is running
+    useEffect(() => {
+        if (!isBusy) {
+            setProgress(null);
+            return;
+        }
+        return subscribe((type, data) => {
+            const message = describeEvent(type, data);
+            if (message) setProgress(message);
+        });
+    }, [isBusy]);
 
     const handleScrape = async (type) => {
         setLoading(prev => ({ ...prev, [type]: true }));
         setStatus(`Scraping ${type === 't212' ? 'Trading212' : 'Yahoo Finance'}...`);
 
         try {
-            const response = await axios.post(`http://127.0.0.1:8000/scrape/${type}`);
-            setStatus(`Success: ${response.data.status || 'Completed'}`);
+            await runJob(`/scrape/${type}`);
+            setStatus('Success: Completed');
             if (onScrapeComplete) onScrapeComplete();
         } catch (error) {
             console.error(error);
@@ -35,7 +65,7 @@ export function ScrapeControls({ onScrapeComplete }) {
             <div className="flex flex-col sm:flex-row gap-4 mb-4">
                 <button
                     onClick={() => handleScrape('t212')}
-                    disabled={loading.t212 || loading.yfinance}
+                    disabled={isBusy}
                     className={cn(
                         "flex-1 flex items-center justify-center gap-2 py-3 px-4 rounded-md font-medium transition-all duration-200",
                         "bg-primary text-primary-foreground hover:bg-primary/90",
@@ -48,7 +78,7 @@ export function ScrapeControls({ onScrapeComplete }) {
 
                 <button
                     onClick={() => handleScrape('yfinance')}
-                    disabled={loading.t212 || loading.yfinance}
+                    disabled={isBusy}
                     className={cn(
                         "flex-1 flex items-center justify-center gap-2 py-3 px-4 rounded-md font-medium transition-all duration-200",
                         "bg-secondary text-secondary-foreground hover:bg-secondary/80",
@@ -70,6 +100,12 @@ export function ScrapeControls({ onScrapeComplete }) {
                     {status}
                 </div>
             )}
+
+            {progress && (
+                <div className="mt-2 text-xs text-muted-foreground truncate" title={progress}>
+                    {progress}
+                </div>
+            )}
         </div>
     );
 }
@@ -0,0 +1,51 @@
+const BACKEND_URL = 'http://127.0.0.1:8000';
+
+// Event types pushed by the backend /events stream
+const EVENT_TYPES = [
+    'status',
+    'job.started',
+    'job.finished',
+    'ticker.started',
+    'ticker.finished',
+    'rows.written',
+    't212.report',
+    't212.cash',
+    't212.rate_limited',
+    'scrape.finished',
+    'scheduler.cycle',
+    'error',
+];
+
+let source = null;
+const listeners = new Set();
+const connectionListeners = new Set();
+
+const notifyConnection = (connected) => connectionListeners.forEach(fn => fn(connected));
+
+// Open the shared EventSource on first use, the browser reconnects it automatically
+function ensureSource() {
+    if (source) return;
+    source = new EventSource(`${BACKEND_URL}/events`);
+    EVENT_TYPES.forEach(type => {
+        source.addEventListener(type, (e) => {
+            const data = JSON.parse(e.data);
+            if (type === 'status') notifyConnection(data.status === 'ok');
+            listeners.forEach(fn => fn(type, data));
+        });
+    });
+    source.onerror = () => notifyConnection(false);
+}
+
+// Listen to every progress event, returns an unsubscribe function
+export function subscribe(fn) {
+    ensureSource();
+    listeners.add(fn);
+    return () => listeners.delete(fn);
+}
+
+// Listen for the backend going up or down, returns an unsubscribe function
+export function onConnectionChange(fn) {
+    ensureSource();
+    connectionListeners.add(fn);
+    return () => connectionListeners.delete(fn);
+}
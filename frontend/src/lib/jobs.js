@@ -0,0 +1,40 @@
+import axios from 'axios';
+import { subscribe } from './events';
+
+const BACKEND_URL = 'http://127.0.0.1:8000';
+
+const isRunning = (job) => job.status === 'queued' || job.status === 'running';
+
+// Start a background job (or attach to the one already running) and wait for it to finish.
+// Completion arrives over the event stream, so there is no polling.
+// Resolves with the job's result, rejects with the job's error if it failed or was cancelled.
+export async function runJob(endpoint) {
+    const response = await axios.post(`${BACKEND_URL}${endpoint}`);
+    const started = response.data.job;
+
+    const job = !isRunning(started) ? started : await new Promise((resolve, reject) => {
+        const unsubscribe = subscribe((type, data) => {
+            if (type === 'job.finished' && data.job.id === started.id) {
+                unsubscribe();
+                resolve(data.job);
+            }
+        });
+        // the job may have finished before the listener was attached
+        axios.get(`${BACKEND_URL}/jobs/${started.id}`)
+            .then(res => {
+                if (!isRunning(res.data)) {
+                    unsubscribe();
+                    resolve(res.data);
+                }
+            })
+            .catch(err => {
+                unsubscribe();
+                reject(err);
+            });
+    });
+
+    if (job.status !== 'succeeded') {
+        throw new Error(job.error || `Job ${job.status}`);
+    }
+    return job.result;
+}
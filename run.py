@@ -2,7 +2,7 @@
 ##                                                                                                                    ##
 ## Name: Run.py                                                                                                       ##
 ## Author: Andrew Stirling                                                                                            ##
-## Version: 1.01                                                                                                      ##
+## Version: 1.02                                                                                                      ##
 ## Description: Install python dependancies and                                                                       ##
 ##              import main.py to start program                                                                       ##
 ##                                                                                                                    ##
@@ -11,8 +11,23 @@
 import sys
 import subprocess
 import os
+import hashlib
 
-def install_dependencies():
+# records the requirements last installed into this interpreter
+STAMP_FILE = ".requirements.stamp"
+
+def requirements_hash(req_file):
+
+    # hash the requirements together with the interpreter they were installed into,
+    # so a new venv or python version installs again
+    digest = hashlib.sha256()
+    with open(req_file, "rb") as file:
+        digest.update(file.read())
+    digest.update(sys.executable.encode())
+    digest.update(sys.version.encode())
+    return digest.hexdigest()
+
+def install_dependencies(force=False):
 
     # get requirements from text file
     req_file = "requirements.txt"
@@ -22,6 +37,14 @@ def install_dependencies():
         print("No requirements.txt found. Skipping install.")
         sys.exit(1)
 
+    # skip pip when these requirements were already installed
+    req_hash = requirements_hash(req_file)
+    if not force and os.path.exists(STAMP_FILE):
+        with open(STAMP_FILE, "r", encoding="utf-8") as file:
+            if file.read().strip() == req_hash:
+                print("\nDependencies unchanged, skipping install.")
+                return
+
     # install dependancies
     print("\nChecking dependencies...")
     try:
@@ -32,6 +55,10 @@ def install_dependencies():
         print(f"\nError installing dependencies: {e}")
         sys.exit(1)
 
+    # remember what was installed for the next launch
+    with open(STAMP_FILE, "w", encoding="utf-8") as file:
+        file.write(req_hash)
+
 
 ##################
 # MAIN EXECUTION #
@@ -39,8 +66,8 @@ def install_dependencies():
 
 if __name__ == "__main__":
 
-    # install python dependancies
-    install_dependencies()
+    # install python dependancies, --reinstall runs pip even if nothing changed
+    install_dependencies(force="--reinstall" in sys.argv)
 
     # import main python script
     try:
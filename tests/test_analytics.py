@@ -0,0 +1,75 @@
+"""
+PortfolioAnalytics over a synthetic ledger: the time-weighted return
+through full exits, and refreshes after rows are replaced in place.
+"""
+import pandas as pd
+import pytest
+from utils import catalog, ledger
+from utils.analytics import PortfolioAnalytics
+
+
+@pytest.fixture(autouse=True)
+def stores(tmp_path, monkeypatch):
+    # a fresh ledger and catalog per test, with no market data to mark against
+    monkeypatch.chdir(tmp_path)
+    ledger.init_ledger(str(tmp_path / "ledger.db"))
+    catalog.init_catalog(str(tmp_path / "catalog.db"))
+
+
+def _trade(row_id: str, action: str, time: str, shares: float, price: float) -> dict:
+    return {"ID": row_id, "Action": action, "Time": time, "Ticker": "VUSA", "No. of shares": shares,
+            "Price / share": price, "Exchange rate": 1.0, "Total": shares * price}
+
+
+def _day(daily: pd.DataFrame, date: str) -> pd.Series:
+    return daily.loc[daily["Date"] == pd.Timestamp(date, tz="UTC")].iloc[0]
+
+
+@pytest.mark.parametrize("exit_price, expected", [(9.0, -0.1), (11.0, 0.1)])
+def test_full_exit_return(exit_price, expected):
+    ledger.upsert_report(pd.DataFrame([
+        _trade("1", "Market buy", "2024-01-02 10:00:00", 10, 10.0),
+        _trade("2", "Market sell", "2024-01-04 10:00:00", 10, exit_price),
+    ]))
+    daily = PortfolioAnalytics().performance()
+    # the sale proceeds leave at the end of the day, the prior mark is the base
+    assert _day(daily, "2024-01-04")["return"] == pytest.approx(expected)
+    assert _day(daily, "2024-01-04")["value"] == 0
+    # flat afterwards, the return neither collapses to -100% nor resets
+    assert daily["twr"].iloc[-1] == pytest.approx(expected)
+
+
+def test_exit_then_reentry_keeps_compounding():
+    ledger.upsert_report(pd.DataFrame([
+        _trade("1", "Market buy", "2024-01-02 10:00:00", 10, 10.0),
+        _trade("2", "Market sell", "2024-01-03 10:00:00", 10, 11.0),
+        _trade("3", "Market buy", "2024-01-05 10:00:00", 5, 20.0),
+        _trade("4", "Market sell", "2024-01-08 10:00:00", 5, 22.0),
+    ]))
+    daily = PortfolioAnalytics().performance()
+    assert daily["twr"].iloc[-1] == pytest.approx(1.1 * 1.1 - 1)
+
+
+def test_refresh_sees_a_row_replaced_in_place():
+    ledger.upsert_report(pd.DataFrame([_trade("1", "Market buy", "2024-01-02 10:00:00", 10, 10.0)]))
+    analytics = PortfolioAnalytics()
+    assert analytics.positions()["shares"].iloc[0] == 10
+    # the same ID comes back corrected, the row count does not change
+    ledger.upsert_report(pd.DataFrame([_trade("1", "Market buy", "2024-01-02 10:00:00", 12, 10.0)]))
+    positions = analytics.positions()
+    assert positions["shares"].iloc[0] == 12
+    assert positions["cost_basis"].iloc[0] == pytest.approx(120.0)
+    assert analytics.stats()["full_runs"] == 2
+
+
+def test_refresh_replays_only_new_rows():
+    ledger.upsert_report(pd.DataFrame([_trade("1", "Market buy", "2024-01-02 10:00:00", 10, 10.0)]))
+    analytics = PortfolioAnalytics()
+    analytics.positions()
+    # an unchanged overlap plus one new row, as a sync re-requesting a day sends
+    ledger.upsert_report(pd.DataFrame([
+        _trade("1", "Market buy", "2024-01-02 10:00:00", 10, 10.0),
+        _trade("2", "Market buy", "2024-01-03 10:00:00", 5, 12.0),
+    ]))
+    assert analytics.positions()["shares"].iloc[0] == 15
+    assert analytics.stats() == {"full_runs": 1, "incremental_runs": 1, "transactions": 2}
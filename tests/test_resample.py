@@ -0,0 +1,41 @@
+"""
+Picking the stored bars to resample from, by interval and by symbol.
+"""
+import pandas as pd
+import pytest
+from utils import catalog
+from utils.resample import pick_source, stored_intervals
+from utils.storage import market_data_path, save_frame
+
+
+@pytest.fixture(autouse=True)
+def stores(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    catalog.init_catalog(str(tmp_path / "catalog.db"))
+
+
+def _store(symbol: str, interval: str, freq: str) -> str:
+    path = market_data_path(symbol, interval)
+    df = pd.DataFrame({"Date": pd.date_range("2024-01-01", periods=10, freq=freq, tz="UTC"),
+                       "Open": 1.0, "High": 1.0, "Low": 1.0, "Close": 1.0, "Volume": 1.0})
+    save_frame(df, path)
+    catalog.record(path, df)
+    return path
+
+
+def test_coarsest_fitting_interval_is_picked():
+    _store("VUSA", "15m", "15min")
+    hourly = _store("VUSA", "1h", "1h")
+    assert list(stored_intervals("VUSA")) == ["15m", "1h"]
+    assert pick_source("VUSA", "1d") == ("1h", hourly)
+    assert pick_source("VUSA", "1m") is None
+
+
+def test_symbol_finds_its_exchange_suffixed_bars():
+    # Yahoo stores London listings as CSP1.L, the API is asked for CSP1
+    daily = _store("CSP1.L", "1d", "1D")
+    assert pick_source("CSP1", "1d") == ("1d", daily)
+    assert pick_source("CSP1.L", "1wk") == ("1d", daily)
+    # an exact symbol wins over a suffixed one
+    exact = _store("CSP1", "1d", "1D")
+    assert pick_source("CSP1", "1d") == ("1d", exact)
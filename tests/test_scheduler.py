@@ -0,0 +1,48 @@
+"""
+RefreshScheduler's request budget: the yahoo calls a refresh makes beyond
+what was reserved for it are charged to the next cycles.
+"""
+import threading
+import pytest
+from benchmarks.fake_yahoo import FakeYahoo
+from clients.yfinance import YFinanceClient
+from utils import catalog
+from utils.jobs import JobManager
+from utils.scheduler import RefreshScheduler
+
+SYMBOLS = ["AAA", "BBB", "CCC"]
+
+
+@pytest.fixture(autouse=True)
+def stores(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    catalog.init_catalog(str(tmp_path / "catalog.db"))
+
+
+def _scheduler(yahoo: FakeYahoo) -> RefreshScheduler:
+    def factory() -> YFinanceClient:
+        return YFinanceClient(requests_per_second=1000, ticker_factory=yahoo)
+
+    # a slow refill, so the bucket barely moves while the test runs
+    return RefreshScheduler(JobManager(max_workers=1), client_factory=factory, budget=36, burst=10)
+
+
+def _refresh(scheduler: RefreshScheduler) -> float:
+    # one batch with a single call reserved, as run_once reserves it
+    reserved = scheduler._cost([{"behind": None} for _ in SYMBOLS])
+    assert scheduler.limiter.try_acquire(reserved)
+    scheduler._refresh([("15m", SYMBOLS, reserved)], threading.Event())
+    return scheduler.limiter.available()
+
+
+def test_batch_within_its_reservation_is_not_charged_again():
+    scheduler = _scheduler(FakeYahoo(bars=50))
+    assert _refresh(scheduler) == pytest.approx(9, abs=0.1)
+
+
+def test_per_symbol_fallback_is_charged():
+    # every call is throttled, the empty batch is retried one symbol at a time
+    yahoo = FakeYahoo(error_rate=1.0, bars=50)
+    scheduler = _scheduler(yahoo)
+    assert _refresh(scheduler) == pytest.approx(10 - yahoo.counters["calls"], abs=0.1)
+    assert yahoo.counters["calls"] == 1 + len(SYMBOLS)
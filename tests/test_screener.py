@@ -0,0 +1,72 @@
+"""
+Screener indicators: the Wilder RSI and ATR folded in incrementally as bars
+are appended match a full recompute.
+"""
+import pandas as pd
+import pytest
+from benchmarks.bench_screener import _bars
+from utils import catalog
+from utils.screener import Screener, compute_symbol
+from utils.storage import market_data_path, save_frame
+
+
+@pytest.fixture(autouse=True)
+def stores(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    catalog.init_catalog(str(tmp_path / "catalog.db"))
+
+
+def _store(df: pd.DataFrame) -> str:
+    path = market_data_path("SCR00000", "15m")
+    save_frame(df, path)
+    catalog.record(path, df)
+    return path
+
+
+def _assert_matches_full(path: str, row: dict) -> None:
+    full = compute_symbol(path)
+    assert full["mode"] == "full"
+    for column in ("rsi_14", "atr_14", "atr_pct", "close", "sma_50"):
+        assert row[column] == pytest.approx(full["row"][column], rel=1e-9)
+
+
+def test_appended_bars_fold_in_like_a_full_recompute():
+    bars = _bars(0, 300)
+    path = _store(bars)
+    state = compute_symbol(path)
+    for appended in (1, 5, 120):
+        # new bars after the stored ones, the settled bars are untouched
+        more = _bars(1, appended)
+        more["Date"] = bars["Date"].iloc[-1] + pd.Timedelta(minutes=15) * pd.RangeIndex(1, appended + 1)
+        bars = pd.concat([bars, more], ignore_index=True)
+        _store(bars)
+        state = compute_symbol(path, state)
+        assert state["mode"] == "incremental"
+        _assert_matches_full(path, state["row"])
+
+
+def test_rewritten_forming_bar_folds_in_like_a_full_recompute():
+    bars = _bars(0, 300)
+    path = _store(bars)
+    state = compute_symbol(path)
+    # the next scrape overwrites the last bar, which was still forming
+    bars.loc[bars.index[-1], ["High", "Close"]] += 2.5
+    _store(bars)
+    state = compute_symbol(path, state)
+    assert state["mode"] == "incremental"
+    _assert_matches_full(path, state["row"])
+
+
+def test_screen_after_an_append_matches_a_fresh_screener():
+    bars = _bars(0, 300)
+    path = _store(bars)
+    screener = Screener(max_workers=1)
+    screener.screen()
+    more = _bars(1, 10)
+    more["Date"] = bars["Date"].iloc[-1] + pd.Timedelta(minutes=15) * pd.RangeIndex(1, 11)
+    _store(pd.concat([bars, more], ignore_index=True))
+    incremental, _ = screener.screen()
+    assert screener.counters["incremental"] == 1
+    fresh, _ = Screener(max_workers=1).screen()
+    for column in ("rsi_14", "atr_14"):
+        assert incremental[column].iloc[0] == pytest.approx(fresh[column].iloc[0], rel=1e-9)
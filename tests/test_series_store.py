@@ -0,0 +1,129 @@
+"""
+The memory-mapped series store: versioned publishes behind CURRENT, appends
+merging the overlap, the writer lock, and a series staying in step with its
+parquet file, which is what the API checks before serving it.
+"""
+import os
+import subprocess
+import sys
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.fake_yahoo import FakeYahoo
+from clients.yfinance import YFinanceClient
+from utils import catalog, series_store
+
+
+@pytest.fixture(autouse=True)
+def stores(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    catalog.init_catalog(str(tmp_path / "catalog.db"))
+    # the mapped versions are cached by relative folder, which every test reuses
+    monkeypatch.setattr(series_store, "_open", {})
+
+
+def _bars(start: int, stop: int, close: float = 0.0) -> pd.DataFrame:
+    # bar i closes at i + close, so a test can tell which copy of a bar was kept
+    index = np.arange(start, stop)
+    return pd.DataFrame({
+        "Date": pd.Timestamp("2024-01-01", tz="UTC") + pd.Timedelta(minutes=15) * index,
+        "Close": index + close,
+        "Volume": index * 10,
+        "Symbol": "AAA",
+    })
+
+
+def _current(symbol: str = "AAA", interval: str = "15m") -> str:
+    with open(os.path.join(series_store.series_dir(symbol, interval), series_store.CURRENT)) as file:
+        return file.read()
+
+
+def test_publish_switches_current_to_the_next_version():
+    assert series_store.open_series("AAA", "15m") is None
+    assert series_store.write_series("AAA", "15m", _bars(0, 10)) == "v00000001"
+    first = series_store.open_series("AAA", "15m")
+    assert series_store.write_series("AAA", "15m", _bars(0, 20)) == "v00000002"
+    assert _current() == "v00000002"
+    # a reader holding the old version keeps its bars
+    assert first.rows == 10 and first.frame()["Close"].iloc[-1] == 9
+    assert series_store.open_series("AAA", "15m").rows == 20
+    series_store.write_series("AAA", "15m", _bars(0, 30))
+    # only the current version and the one before it are kept
+    folder = series_store.series_dir("AAA", "15m")
+    assert sorted(n for n in os.listdir(folder) if n.startswith("v")) == ["v00000002", "v00000003"]
+
+
+def test_written_bars_are_sorted_and_sliced_by_date():
+    series_store.write_series("AAA", "15m", _bars(0, 3000).sample(frac=1, random_state=0))
+    series = series_store.open_series("AAA", "15m")
+    assert np.all(np.diff(series.columns["Date"]) > 0)
+    df = _bars(0, 3000)
+    lo, hi = series.locate(df["Date"].iloc[1500], df["Date"].iloc[2500])
+    assert (lo, hi) == (1500, 2501)
+    frame = series.frame(df["Date"].iloc[1500], df["Date"].iloc[2500])
+    assert frame["Close"].tolist() == list(range(1500, 2501))
+    assert frame["Symbol"].unique().tolist() == ["AAA"]
+
+
+def test_append_merges_the_overlap_with_the_fresh_bars_winning():
+    series_store.write_series("AAA", "15m", _bars(0, 10))
+    series_store.append_series("AAA", "15m", _bars(8, 15, close=0.5))
+    series = series_store.open_series("AAA", "15m")
+    assert series.version == "v00000002"
+    assert series.rows == 15
+    closes = series.frame()["Close"].tolist()
+    assert closes[:8] == list(range(8))
+    assert closes[8:] == [i + 0.5 for i in range(8, 15)]
+
+
+def test_append_rewrites_a_series_that_missed_a_publish():
+    series_store.write_series("AAA", "15m", _bars(0, 10))
+    # the parquet file already held 12 rows, the series never got bars 10 and 11
+    series_store.append_series("AAA", "15m", _bars(12, 14), base_rows=12, full=_bars(0, 14))
+    assert series_store.open_series("AAA", "15m").frame()["Close"].tolist() == list(range(14))
+
+
+@pytest.mark.skipif(series_store.fcntl is None, reason="flock is POSIX only")
+def test_writers_in_another_process_wait_for_the_lock():
+    folder = series_store.series_dir("AAA", "15m")
+    probe = ("import fcntl, sys\n"
+             "with open(sys.argv[1], 'a+b') as f:\n"
+             "    try:\n"
+             "        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)\n"
+             "    except BlockingIOError:\n"
+             "        sys.exit(3)\n")
+    lock = os.path.join(folder, series_store.LOCK)
+    with series_store._locked(folder):
+        assert subprocess.run([sys.executable, "-c", probe, lock]).returncode == 3
+        # a writer thread in this process waits as well
+        writer = threading.Thread(target=series_store.write_series, args=("AAA", "15m", _bars(0, 5)))
+        writer.start()
+        writer.join(0.2)
+        assert writer.is_alive()
+    writer.join()
+    assert series_store.open_series("AAA", "15m").rows == 5
+    assert subprocess.run([sys.executable, "-c", probe, lock]).returncode == 0
+
+
+def test_series_recovers_from_a_failed_publish(monkeypatch):
+    client = YFinanceClient()
+    bars = FakeYahoo(bars=300).history(["AAA"], "1mo", "15m", None).reset_index()
+
+    def in_step() -> bool:
+        dataset = catalog.find_dataset("AAA", "15m")
+        return series_store.open_series("AAA", "15m").rows == dataset["rows"]
+
+    client._save_market_data(bars.iloc[:200], "AAA", "15m")
+    assert in_step()
+    with monkeypatch.context() as patched:
+        def fail(*args, **kwargs):
+            raise OSError("disk full")
+        patched.setattr(series_store, "_publish", fail)
+        # the parquet file is saved, the series falls behind it
+        client._save_market_data(bars.iloc[190:250], "AAA", "15m", append=True)
+    assert not in_step()
+    # the next scrape brings the series back in step, not just its fresh bars
+    client._save_market_data(bars.iloc[240:], "AAA", "15m", append=True)
+    assert in_step()
+    assert series_store.open_series("AAA", "15m").rows == 300
@@ -0,0 +1,122 @@
+"""
+Trading212Client._make_request against the local mock server: retries of
+server errors on the shared session, 429 handling by the governor, and
+cancels and deadlines while the governor holds a call.
+"""
+import asyncio
+import threading
+import time
+import pytest
+import requests
+from benchmarks.mock_t212 import MockT212Server
+from clients.trading212 import AsyncTrading212Client, Trading212Client
+
+CREDENTIALS = ("test-key", "test-secret")
+CASH = {"free": 1250.5, "total": 10250.75, "invested": 9000.25}
+
+
+class FastRetryClient(Trading212Client):
+    # the mock answers straight away, so the retries need not back off
+    BACKOFF_FACTOR = 0.0
+
+
+class FastAsyncClient(AsyncTrading212Client):
+    BACKOFF_FACTOR = 0.0
+    POLL_INITIAL_DELAY = 0.1
+
+
+@pytest.fixture
+def server():
+    # every test gets its own port, so its own shared session and governor
+    with MockT212Server(rate_limit=100, rate_period=60.0) as server:
+        yield server
+
+
+def _client(server: MockT212Server) -> Trading212Client:
+    return FastRetryClient(base_url=server.base_url, credentials=CREDENTIALS)
+
+
+def test_get_is_retried_on_server_errors(server):
+    server.server_errors = 2
+    assert _client(server)._make_request("GET", Trading212Client.ENDPOINT_CASH) == CASH
+    assert server.counters["server_errors"] == 2
+    assert server.counters["requests"] == 3
+
+
+def test_get_gives_up_after_max_retries(server):
+    server.server_errors = Trading212Client.MAX_RETRIES + 1
+    with pytest.raises(Exception, match="Status: 503"):
+        _client(server)._make_request("GET", Trading212Client.ENDPOINT_CASH)
+    assert server.counters["requests"] == Trading212Client.MAX_RETRIES + 1
+
+
+def test_post_is_not_retried_on_server_errors(server):
+    # a POST may have created an export before the error, it is not sent twice
+    server.server_errors = 1
+    with pytest.raises(Exception, match="Status: 503"):
+        _client(server)._make_request("POST", Trading212Client.ENDPOINT_HISTORY, {})
+    assert server.counters["requests"] == 1
+
+
+def test_rate_limited_request_waits_and_retries():
+    with MockT212Server(rate_limit=1, rate_period=1.0) as server:
+        client = _client(server)
+        # spend the window's budget behind the client's back, so its call gets a 429
+        requests.get(server.base_url + Trading212Client.ENDPOINT_CASH, headers=client.headers)
+        assert client._make_request("GET", Trading212Client.ENDPOINT_CASH) == CASH
+        assert server.counters["rate_limited"] == 1
+        assert server.counters["requests"] == 3
+
+
+def test_rate_limited_request_gives_up():
+    class ImpatientClient(FastRetryClient):
+        MAX_RATE_LIMITED = 0
+
+    with MockT212Server(rate_limit=1, rate_period=60.0) as server:
+        client = ImpatientClient(base_url=server.base_url, credentials=CREDENTIALS)
+        requests.get(server.base_url + Trading212Client.ENDPOINT_CASH, headers=client.headers)
+        with pytest.raises(Exception, match="Status: 429"):
+            client._make_request("GET", Trading212Client.ENDPOINT_CASH)
+        # the governor holds the next call until the window resets
+        assert client.governor.delay(f"GET {Trading212Client.ENDPOINT_CASH}") > 30
+
+
+def test_governor_spaces_calls_before_the_limit_is_hit():
+    with MockT212Server(rate_limit=1, rate_period=1.0) as server:
+        client = _client(server)
+        for _ in range(2):
+            assert client._make_request("GET", Trading212Client.ENDPOINT_CASH) == CASH
+        # the second call waited for the reset instead of drawing a 429
+        assert server.counters.get("rate_limited", 0) == 0
+
+
+def _hold(client: Trading212Client, endpoint: str, seconds: int) -> None:
+    # as if the endpoint had just answered 429 with a long Retry-After
+    client.governor.update(f"GET {endpoint}", 429, {"retry-after": str(seconds)})
+
+
+def test_async_cancel_wakes_a_rate_limited_wait(server):
+    async def run(cancel_event):
+        async with FastAsyncClient(base_url=server.base_url, credentials=CREDENTIALS) as client:
+            _hold(client, Trading212Client.ENDPOINT_CASH, 30)
+            return await client._make_request("GET", Trading212Client.ENDPOINT_CASH, cancel_event=cancel_event)
+
+    cancel_event = threading.Event()
+    threading.Timer(0.2, cancel_event.set).start()
+    started = time.monotonic()
+    assert asyncio.run(run(cancel_event)) is None
+    assert time.monotonic() - started < 2
+    assert server.counters.get("requests", 0) == 0
+
+
+def test_async_poll_gives_up_when_the_rate_limit_outlasts_the_deadline(server):
+    async def run():
+        async with FastAsyncClient(base_url=server.base_url, credentials=CREDENTIALS) as client:
+            _hold(client, Trading212Client.ENDPOINT_HISTORY, 30)
+            return await client._poll_for_completion(1, deadline=1.0)
+
+    started = time.monotonic()
+    assert asyncio.run(run()) is None
+    # the poll stops at its deadline instead of sleeping out the rate limit
+    assert time.monotonic() - started < 2
+    assert server.counters.get("requests", 0) == 0
@@ -0,0 +1,353 @@
+"""
+Portfolio analytics over the transaction ledger and the stored market data.
+
+Orders from the ledger are replayed into positions and average cost basis,
+holdings are marked to market at each day's last close from market_data,
+and the daily series carries realized/unrealized P&L, income and a
+time-weighted return. Everything is computed with grouped NumPy/pandas
+operations over whole columns, there is no per-transaction Python loop.
+"""
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from utils import catalog, ledger
+from utils.storage import load_frame
+
+# market data interval used to mark holdings to market
+PRICE_INTERVAL = "15m"
+# positions at or below this many shares count as closed
+EPSILON = 1e-9
+
+# kinds of ledger event
+BUY = "buy"
+SELL = "sell"
+DIVIDEND = "dividend"
+INTEREST = "interest"
+DEPOSIT = "deposit"
+WITHDRAWAL = "withdrawal"
+OTHER = "other"
+# an opening position carried over from a previous replay
+SEED = "seed"
+
+# columns of the daily performance series
+DAILY_COLUMNS = ["Date", "value", "cost_basis", "unrealized", "realized", "dividends", "interest",
+                 "net_flow", "return", "twr"]
+
+
+def classify_actions(actions: pd.Series) -> np.ndarray:
+    """Map Trading212 action names (Market buy, Dividend (Ordinary), ...) to event kinds."""
+    a = actions.fillna("").str.lower()
+    conditions = [
+        a.str.contains("buy"),
+        a.str.contains("sell"),
+        a.str.startswith("dividend"),
+        a.str.contains("interest"),
+        a.str.startswith("deposit"),
+        a.str.startswith("withdrawal"),
+    ]
+    return np.select(conditions, [BUY, SELL, DIVIDEND, INTEREST, DEPOSIT, WITHDRAWAL], OTHER)
+
+
+def ledger_events(df: pd.DataFrame) -> pd.DataFrame:
+    """Reduce ledger rows (export column names) to the columns the replay needs."""
+    events = pd.DataFrame({
+        "time": pd.to_datetime(df["Time"], utc=True),
+        "ticker": df["Ticker"],
+        "kind": classify_actions(df["Action"]),
+        "shares": pd.to_numeric(df["No. of shares"], errors="coerce").fillna(0.0).abs(),
+        "price": pd.to_numeric(df["Price / share"], errors="coerce"),
+        "fx": pd.to_numeric(df["Exchange rate"], errors="coerce"),
+        # amounts are in the account currency
+        "amount": pd.to_numeric(df["Total"], errors="coerce").fillna(0.0).abs(),
+    })
+    return events.sort_values("time", kind="stable").reset_index(drop=True)
+
+
+def replay_trades(events: pd.DataFrame, seed: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Replay buys and sells into running position, average cost basis and
+    realized P&L per ticker.
+
+    Cost basis follows B_t = a_t * B_(t-1) + b_t, with b_t the cost of a buy
+    and a_t the fraction of the position kept by a sell. That recurrence is
+    solved per holding period (position opened until closed again) as
+    B = P * cumsum(b / P) with P = cumprod(a). seed holds the last replayed
+    row per ticker, so new events continue from it without a full replay.
+    """
+    trades = events.loc[events["kind"].isin([BUY, SELL]) & events["ticker"].notna()]
+    if seed is not None and not seed.empty:
+        opening = seed.assign(kind=SEED, shares=seed["position"], amount=seed["cost_basis"])
+        trades = pd.concat([opening[trades.columns], trades], ignore_index=True)
+    if trades.empty:
+        return pd.DataFrame(columns=list(events.columns) + ["position", "cost_basis", "realized"])
+    trades = trades.sort_values(["ticker", "time"], kind="stable").reset_index(drop=True)
+
+    ticker = trades["ticker"]
+    sell = (trades["kind"] == SELL).to_numpy()
+    shares = trades["shares"].to_numpy(dtype=float)
+    amount = trades["amount"].to_numpy(dtype=float)
+
+    position = pd.Series(np.where(sell, -shares, shares)).groupby(ticker).cumsum().to_numpy()
+    previous = position + np.where(sell, shares, -shares)
+    closed = sell & (position <= EPSILON)
+    # fraction of the position kept, closing sells end the holding period instead
+    kept = np.ones_like(position)
+    partial = sell & ~closed & (previous > EPSILON)
+    kept[partial] = position[partial] / previous[partial]
+
+    # the closing sell belongs to the holding period it closes
+    closed_s = pd.Series(closed.astype(np.int64))
+    period = (closed_s.groupby(ticker).cumsum() - closed_s).to_numpy()
+    keys = [ticker.to_numpy(), period]
+    growth = pd.Series(kept).groupby(keys).cumprod().to_numpy()
+    bought = np.where(sell, 0.0, amount)
+    basis = growth * pd.Series(bought / growth).groupby(keys).cumsum().to_numpy()
+    basis[closed] = 0.0
+    position[closed] = 0.0
+
+    previous_basis = pd.Series(basis).groupby(ticker).shift(1).fillna(0.0).to_numpy()
+    realized = np.where(sell, amount - (previous_basis - basis), 0.0)
+
+    result = trades.assign(position=position, cost_basis=basis, realized=realized)
+    return result.loc[result["kind"] != SEED].reset_index(drop=True)
+
+
+def _daily_last(frame: pd.DataFrame, column: str, days: pd.DatetimeIndex) -> pd.DataFrame:
+    # last value per ticker and day, carried forward over days without events
+    if frame.empty:
+        return pd.DataFrame(index=days, dtype=float)
+    last = (frame.assign(day=frame["time"].dt.floor("D"))
+                 .groupby(["day", "ticker"])[column].last()
+                 .unstack("ticker"))
+    return last.reindex(last.index.union(days)).ffill().reindex(days)
+
+
+def _daily_sum(frame: pd.DataFrame, days: pd.DatetimeIndex) -> pd.Series:
+    # total amount per day
+    if frame.empty:
+        return pd.Series(0.0, index=days)
+    return frame.groupby(frame["time"].dt.floor("D"))["amount"].sum().reindex(days, fill_value=0.0)
+
+
+class PortfolioAnalytics:
+    """
+    Incrementally maintained analytics for the ledger.
+
+    refresh() compares the ledger and the market data files against what was
+    last computed. New transactions are replayed on top of the cached
+    positions and only the days from the first changed day onward are
+    revalued. A full recompute only happens when older history changed or a
+    new symbol's market data appeared.
+    """
+
+    def __init__(self, load_bars: Optional[Callable[[str], pd.DataFrame]] = None,
+                 interval: str = PRICE_INTERVAL):
+        self.interval = interval
+        self._load_bars = load_bars or (lambda path: load_frame(path, columns=["Date", "Close"]))
+        self._lock = threading.Lock()
+        self._events: Optional[pd.DataFrame] = None
+        self._trades: Optional[pd.DataFrame] = None
+        self._daily: Optional[pd.DataFrame] = None
+        # ledger checksum up to the last replayed event, and that event's time
+        self._mark: Tuple[Tuple[float, ...], Optional[datetime]] = ((0,), None)
+        self._price_files: Dict[str, Tuple[int, int]] = {}
+        self._latest: Dict[str, pd.Series] = {}
+        self.full_runs = 0
+        self.incremental_runs = 0
+
+    ##~~~~~~~~~~~~~~~~~~
+    ## HELPER FUNCTIONS
+    ##~~~~~~~~~~~~~~~~~~
+
+    def _price_signature(self) -> Dict[str, Tuple[str, Optional[str], int]]:
+        # catalogued (path, refresh time, size) of every traded ticker's bars,
+        # LSE tickers are stored under their .L yahoo symbol
+        signature = {}
+        for ticker in self._trades["ticker"].unique():
+            dataset = catalog.find_dataset(ticker, self.interval)
+            if dataset is not None:
+                signature[ticker] = (dataset["path"], dataset["refreshed"], dataset["size"])
+        return signature
+
+    def _daily_closes(self, tickers: List[str]) -> pd.DataFrame:
+        # last close per day for every ticker that has market data
+        closes = {}
+        for ticker in tickers:
+            if ticker not in self._price_files:
+                continue
+            bars = self._load_bars(self._price_files[ticker][0])
+            if bars.empty:
+                continue
+            dates = pd.DatetimeIndex(pd.to_datetime(bars["Date"], utc=True))
+            close = pd.Series(bars["Close"].to_numpy(dtype=float), index=dates)
+            closes[ticker] = close.groupby(dates.floor("D")).last()
+        return pd.DataFrame(closes)
+
+    def _full(self) -> Optional[pd.Timestamp]:
+        df, _ = ledger.query_transactions()
+        self._events = ledger_events(df) if not df.empty else None
+        self._trades = replay_trades(self._events) if self._events is not None else None
+        self._daily = None
+        self.full_runs += 1
+        return self._events["time"].iloc[0].floor("D") if self._events is not None else None
+
+    def _incremental(self) -> Optional[pd.Timestamp]:
+        # only rows newer than the last replayed event
+        after = self._mark[1]
+        df, _ = ledger.query_transactions(start=after)
+        new = ledger_events(df)
+        new = new.loc[new["time"] > after]
+        if new.empty:
+            return None
+        seed = self._trades.groupby("ticker", sort=False).tail(1)
+        self._events = pd.concat([self._events, new], ignore_index=True)
+        self._trades = pd.concat([self._trades, replay_trades(new, seed)], ignore_index=True)
+        self.incremental_runs += 1
+        return new["time"].iloc[0].floor("D")
+
+    def _revalue(self, since: pd.Timestamp) -> None:
+        # recompute the daily series from since, keeping the cached days before it
+        today = pd.Timestamp(datetime.now(timezone.utc)).floor("D")
+        first = self._events["time"].iloc[0].floor("D")
+        since = max(since, first)
+        days = pd.date_range(since, max(today, since), freq="D")
+        kept = self._daily.loc[self._daily["Date"] < since] if self._daily is not None else None
+        trades = self._trades
+        events = self._events
+
+        holdings = _daily_last(trades, "position", days).fillna(0.0)
+        tickers = holdings.columns.tolist()
+        basis = _daily_last(trades, "cost_basis", days).reindex(columns=tickers).fillna(0.0)
+        fx = _daily_last(events.loc[events["fx"] > 0], "fx", days).reindex(columns=tickers).fillna(1.0)
+        # mark at the day's close, or the last trade price before any bars exist
+        closes = self._daily_closes(tickers)
+        closes = closes.reindex(closes.index.union(days)).ffill().reindex(days) if not closes.empty else closes
+        prices = closes.reindex(index=days, columns=tickers).combine_first(_daily_last(trades, "price", days))
+        prices = prices.reindex(columns=tickers)
+        values = (holdings * prices / fx).fillna(0.0)
+        self._latest = {"position": holdings.iloc[-1], "price": prices.iloc[-1], "fx": fx.iloc[-1], "value": values.iloc[-1]}
+
+        kinds = events["kind"]
+        in_range = events["time"] >= since
+        buys = _daily_sum(events.loc[in_range & (kinds == BUY)], days)
+        sells = _daily_sum(events.loc[in_range & (kinds == SELL)], days)
+        dividends = _daily_sum(events.loc[in_range & (kinds == DIVIDEND)], days)
+        interest = _daily_sum(events.loc[in_range & (kinds == INTEREST)], days)
+        realized = trades.loc[trades["time"] >= since].groupby(trades["time"].dt.floor("D"))["realized"].sum()
+        realized = realized.reindex(days, fill_value=0.0)
+
+        value = values.sum(axis=1)
+        net_flow = buys - sells
+        # the value carried into the first recomputed day
+        if kept is not None and not kept.empty:
+            last = kept.iloc[-1]
+            opening, offsets = last["value"], last
+        else:
+            opening, offsets = 0.0, None
+        previous = value.shift(1).fillna(opening)
+        # daily return with buys invested at the start of the day and sale
+        # proceeds taken out at its end, so a full exit still has a base
+        denominator = previous + buys
+        daily_return = ((value + sells + dividends - previous - buys)
+                        / denominator.where(denominator > EPSILON)).fillna(0.0)
+        growth = (1.0 + daily_return).cumprod()
+
+        block = pd.DataFrame({
+            "Date": days,
+            "value": value.to_numpy(),
+            "cost_basis": basis.sum(axis=1).to_numpy(),
+            "realized": realized.cumsum().to_numpy(),
+            "dividends": dividends.cumsum().to_numpy(),
+            "interest": interest.cumsum().to_numpy(),
+            "net_flow": net_flow.to_numpy(),
+            "return": daily_return.to_numpy(),
+            "twr": growth.to_numpy(),
+        })
+        if offsets is not None:
+            for column in ("realized", "dividends", "interest"):
+                block[column] += offsets[column]
+            block["twr"] = (1.0 + offsets["twr"]) * block["twr"]
+        block["twr"] -= 1.0
+        block["unrealized"] = block["value"] - block["cost_basis"]
+        block = block[DAILY_COLUMNS]
+        self._daily = pd.concat([kept, block], ignore_index=True) if kept is not None and not kept.empty else block
+
+    ##~~~~~~~~~~~~~~~~~~
+    ## CLASS FUNCTIONS
+    ##~~~~~~~~~~~~~~~~~~
+
+    def refresh(self) -> None:
+        """Bring the analytics up to date with the ledger and market data."""
+        with self._lock:
+            last = ledger.last_event_time()
+            since = None
+            if self._events is None or ledger.checksum(self._mark[1]) != self._mark[0]:
+                # first run, or rows were added or replaced inside the replayed history
+                since = self._full()
+            elif last != self._mark[1]:
+                since = self._incremental()
+            self._mark = (ledger.checksum(last), last)
+            if self._events is None:
+                return
+
+            signature = self._price_signature()
+            if self._daily is None or signature.keys() != self._price_files.keys():
+                # a symbol gained market data, its whole history needs marking
+                since = self._events["time"].iloc[0].floor("D")
+            elif signature != self._price_files or since is not None:
+                # new bars land on the latest days, revalue from the last cached day
+                last_day = self._daily["Date"].iloc[-1]
+                since = min(since, last_day) if since is not None else last_day
+            elif self._daily["Date"].iloc[-1] < pd.Timestamp(datetime.now(timezone.utc)).floor("D"):
+                # nothing changed, but the series still has to roll on to today
+                since = self._daily["Date"].iloc[-1]
+            else:
+                return
+            self._price_files = signature
+            self._revalue(since)
+
+    def positions(self) -> pd.DataFrame:
+        """Current holdings per ticker with cost basis, market value and P&L."""
+        self.refresh()
+        with self._lock:
+            if self._trades is None or self._trades.empty:
+                return pd.DataFrame(columns=["ticker", "shares", "average_cost", "cost_basis", "price",
+                                             "value", "unrealized", "realized", "dividends"])
+            last = self._trades.groupby("ticker").tail(1).set_index("ticker")
+            realized = self._trades.groupby("ticker")["realized"].sum()
+            events = self._events
+            dividends = events.loc[events["kind"] == DIVIDEND].groupby("ticker")["amount"].sum()
+            df = pd.DataFrame({
+                "shares": last["position"],
+                "cost_basis": last["cost_basis"],
+                "price": self._latest["price"],
+                "value": self._latest["value"],
+                "realized": realized,
+                "dividends": dividends,
+            }).reindex(last.index)
+            df["average_cost"] = (df["cost_basis"] / df["shares"].where(df["shares"] > EPSILON))
+            df["unrealized"] = df["value"] - df["cost_basis"]
+            df[["realized", "dividends"]] = df[["realized", "dividends"]].fillna(0.0)
+            df = df.reset_index().rename(columns={"index": "ticker"})
+            return df[["ticker", "shares", "average_cost", "cost_basis", "price", "value",
+                       "unrealized", "realized", "dividends"]]
+
+    def performance(self, start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """Daily value, P&L, income and time-weighted return between start and end."""
+        self.refresh()
+        with self._lock:
+            if self._daily is None:
+                return pd.DataFrame(columns=DAILY_COLUMNS)
+            df = self._daily
+            if start is not None:
+                df = df.loc[df["Date"] >= start]
+            if end is not None:
+                df = df.loc[df["Date"] <= end]
+            return df.reset_index(drop=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """How often the analytics were fully or incrementally recomputed."""
+        return {"full_runs": self.full_runs, "incremental_runs": self.incremental_runs,
+                "transactions": int(self._mark[0][0])}
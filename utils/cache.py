@@ -0,0 +1,91 @@
+import os
+import threading
+import pandas as pd
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class FrameCache:
+    """
+    In-process LRU cache of parsed DataFrames keyed by file path.
+    Entries are invalidated when the file's mtime or size changes, and the
+    least recently used entries are evicted once the cached frames exceed
+    max_bytes of memory.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[Tuple[int, int], pd.DataFrame, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(path: str) -> Tuple[int, int]:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, path: str, loader: Callable[[], pd.DataFrame], variant: Hashable = None) -> pd.DataFrame:
+        """
+        Return the cached frame for path, calling loader on a miss.
+        variant distinguishes several cached views derived from the same file.
+        Callers must treat the returned frame as read-only.
+        """
+        key = (path, variant)
+        signature = self._signature(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[1]
+            self.misses += 1
+
+        # load outside the lock so slow reads don't block other files
+        df = loader()
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            self._remove(key)
+            # frames bigger than the whole budget are served but not kept
+            if size <= self.max_bytes:
+                self._entries[key] = (signature, df, size)
+                self._bytes += size
+                self._evict()
+        return df
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop every entry for path, or the whole cache when path is None."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            path = os.path.normpath(path)
+            for key in [k for k in self._entries if os.path.normpath(k[0]) == path]:
+                self._remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current memory use."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _remove(self, key: Tuple[str, Hashable]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _evict(self) -> None:
+        # drop least recently used entries until back under budget
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
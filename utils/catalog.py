@@ -0,0 +1,222 @@
+"""
+Catalog of every stored dataset: market data files and history reports.
+
+Writers record a file when they save it, with its symbol, interval, row
+count, first/last timestamp, size and refresh time, so listings and
+coverage queries are answered from one indexed SQLite table instead of
+globbing and opening files. sync_catalog() reconciles the table with the
+disk once per process, picking up files written before the catalog existed.
+"""
+import os
+import re
+import threading
+import time
+import pandas as pd
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from peewee import BigIntegerField, CharField, Model, SqliteDatabase, TimestampField
+from utils.storage import MARKET_DATA_DIR, list_market_files, list_report_files, load_frame
+
+# SQLite file holding the catalog
+CATALOG_PATH = "catalog.db"
+MARKET = "market"
+REPORT = "report"
+
+# market_data/{symbol}_{interval}.ext
+_MARKET_NAME = re.compile(r"^(?P<symbol>.+)_(?P<interval>[^_]+)$")
+
+db = SqliteDatabase(None, pragmas={"journal_mode": "wal", "synchronous": "normal"})
+_init_lock = threading.Lock()
+# path the tables were created in, set only once they exist
+_ready: Optional[str] = None
+_synced = False
+
+
+class Dataset(Model):
+    path = CharField(primary_key=True)
+    kind = CharField(index=True)
+    symbol = CharField(null=True, index=True)
+    interval = CharField(null=True)
+    rows = BigIntegerField(default=0)
+    first = TimestampField(resolution=1000, utc=True, null=True, default=None, index=True)
+    last = TimestampField(resolution=1000, utc=True, null=True, default=None, index=True)
+    size = BigIntegerField(default=0)
+    mtime_ns = BigIntegerField(default=0)
+    refreshed = TimestampField(resolution=1000, utc=True, null=True, default=None)
+
+    class Meta:
+        database = db
+        table_name = "datasets"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "kind": self.kind,
+            "symbol": self.symbol,
+            "interval": self.interval,
+            "rows": self.rows,
+            "first": _iso(self.first),
+            "last": _iso(self.last),
+            "size": self.size,
+            "refreshed": _iso(self.refreshed),
+        }
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() + "Z" if value is not None else None
+
+
+def init_catalog(path: str = CATALOG_PATH) -> SqliteDatabase:
+    """Open the catalog database, creating the table on first use."""
+    global _ready
+    with _init_lock:
+        if _ready != path:
+            if not db.is_closed():
+                db.close()
+            db.init(path)
+            db.create_tables([Dataset])
+            _ready = path
+    return db
+
+
+def _ensure_catalog() -> None:
+    # db.database is set before the tables exist, so other threads wait on _ready
+    if _ready is None:
+        init_catalog()
+
+
+def parse_path(path: str) -> Tuple[str, Optional[str], Optional[str]]:
+    """(kind, symbol, interval) of a stored file, from its name."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    folder = os.path.basename(os.path.dirname(os.path.normpath(path)))
+    if folder == MARKET_DATA_DIR:
+        match = _MARKET_NAME.match(stem)
+        if match:
+            return MARKET, match.group("symbol"), match.group("interval")
+        return MARKET, stem, None
+    return REPORT, None, None
+
+
+def _coverage(df: pd.DataFrame) -> Tuple[Optional[float], Optional[float]]:
+    # first and last timestamp as unix seconds, from Date or Time
+    column = next((c for c in ("Date", "Time") if c in df.columns), None)
+    if column is None or df.empty:
+        return None, None
+    dates = pd.to_datetime(df[column], utc=True, errors="coerce").dropna()
+    if dates.empty:
+        return None, None
+    return dates.min().timestamp(), dates.max().timestamp()
+
+
+def record(path: str, df: pd.DataFrame, refreshed: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Record a file that was just written from df, returns its catalog entry.
+    refreshed defaults to now, the unix time the data was fetched.
+    """
+    first, last = _coverage(df)
+    return record_summary(path, len(df), first, last, refreshed)
+
+
+def record_summary(path: str, rows: int, first: Optional[float], last: Optional[float],
+                   refreshed: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Record a file from its row count and first/last unix timestamps, for
+    writers that streamed it and never held the whole frame.
+    """
+    _ensure_catalog()
+    kind, symbol, interval = parse_path(path)
+    stat = os.stat(path)
+    row = {
+        "path": os.path.normpath(path),
+        "kind": kind,
+        "symbol": symbol,
+        "interval": interval,
+        "rows": rows,
+        "first": first,
+        "last": last,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "refreshed": refreshed if refreshed is not None else time.time(),
+    }
+    Dataset.insert(row).on_conflict_replace().execute()
+    return Dataset.get_by_id(row["path"]).to_dict()
+
+
+def _date_columns(path: str) -> pd.DataFrame:
+    # read just the timestamp column of a file the catalog has not seen
+    kind, _, _ = parse_path(path)
+    column = "Date" if kind == MARKET else "Time"
+    try:
+        return load_frame(path, columns=[column])
+    except (ValueError, KeyError):
+        return load_frame(path)
+
+
+def sync_catalog(force: bool = False) -> int:
+    """
+    Reconcile the catalog with the files on disk: add new or changed files
+    and drop deleted ones. Runs once per process unless forced, returns the
+    number of entries added or updated.
+    """
+    global _synced
+    _ensure_catalog()
+    if _synced and not force:
+        return 0
+    files = {os.path.normpath(p): p for p in list_market_files() + list_report_files()}
+    known = {d.path: d.mtime_ns for d in Dataset.select(Dataset.path, Dataset.mtime_ns)}
+    updated = 0
+    for path, original in files.items():
+        stat = os.stat(original)
+        if known.get(path) == stat.st_mtime_ns:
+            continue
+        try:
+            # the file's own modification time is the best guess at its refresh
+            record(original, _date_columns(original), refreshed=stat.st_mtime)
+            updated += 1
+        except Exception as e:
+            print(f"Error cataloguing {original}: {e}")
+    gone = [p for p in known if p not in files]
+    if gone:
+        Dataset.delete().where(Dataset.path.in_(gone)).execute()
+    _synced = True
+    return updated
+
+
+def list_datasets(kind: Optional[str] = None, symbol: Optional[str] = None,
+                  interval: Optional[str] = None, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Catalogued datasets, most recently refreshed first. symbol matches the
+    stored symbol or its exchange-suffixed form (CSP1 finds CSP1.L); start/end
+    keep only datasets whose coverage overlaps that range.
+    """
+    sync_catalog()
+    query = Dataset.select()
+    if kind:
+        query = query.where(Dataset.kind == kind)
+    if symbol:
+        query = query.where((Dataset.symbol == symbol) | Dataset.symbol.startswith(symbol + "."))
+    if interval:
+        query = query.where(Dataset.interval == interval)
+    if start is not None:
+        query = query.where(Dataset.last >= start)
+    if end is not None:
+        query = query.where(Dataset.first <= end)
+    return [d.to_dict() for d in query.order_by(Dataset.refreshed.desc())]
+
+
+def find_dataset(symbol: str, interval: str) -> Optional[Dict[str, Any]]:
+    """The market dataset for a symbol and interval, if one is stored."""
+    matches = list_datasets(kind=MARKET, symbol=symbol, interval=interval)
+    exact = [d for d in matches if d["symbol"] == symbol]
+    return (exact or matches or [None])[0]
+
+
+def stale_datasets(interval: str, older_than: datetime) -> List[Dict[str, Any]]:
+    """Market datasets of interval whose newest bar is older than older_than, stalest first."""
+    sync_catalog()
+    query = (Dataset.select()
+             .where((Dataset.kind == MARKET) & (Dataset.interval == interval))
+             .where(Dataset.last.is_null() | (Dataset.last < older_than))
+             .order_by(Dataset.last.asc(nulls="first")))
+    return [d.to_dict() for d in query]
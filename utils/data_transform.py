@@ -1,8 +1,92 @@
+import numpy as np
 import pandas as pd
+from utils.metrics import staged
 
-def transform_yfinance_data(df: pd.DataFrame) -> pd.DataFrame:
+# Standard column names, keyed by the lowercase headers yahooquery returns
+RENAME_MAP = {
+    'date': 'Date',
+    'open': 'Open',
+    'high': 'High',
+    'low': 'Low',
+    'close': 'Close',
+    'volume': 'Volume',
+    'symbol': 'Symbol',
+    'adj close': 'Adj Close'
+}
+
+# Price columns rounded for display
+OHLC_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+@staged("transform.normalize_yfinance")
+def normalize_yfinance_data(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Transforms the Yahoo Finance DataFrame to be more user-friendly.
+    Canonical stage: converts a Yahoo Finance DataFrame to typed columns.
+    This is the form used for storage and computation.
+    1. Standardizes column names to Title Case
+    2. Parses Date to a UTC datetime
+    3. Parses Volume to a number, stripping any thousand separators
+    """
+    if df.empty:
+        return df
+
+    df = df.rename(columns=RENAME_MAP)
+
+    if 'Date' in df.columns:
+        df['Date'] = pd.to_datetime(df['Date'], utc=True)
+
+    if 'Volume' in df.columns and not pd.api.types.is_numeric_dtype(df['Volume']):
+        df['Volume'] = pd.to_numeric(df['Volume'].astype(str).str.replace(',', '', regex=False), errors='coerce')
+
+    return df
+
+def format_thousands(values: pd.Series) -> np.ndarray:
+    """
+    Formats numbers as whole numbers with thousand separators, '1,234,567'.
+    Digits are written into a character buffer one position at a time across
+    the whole column, so there are no per-row Python calls. Missing values
+    become ''.
+    """
+    numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+    if len(numbers) == 0:
+        return np.array([], dtype=object)
+    missing = ~np.isfinite(numbers)
+    ints = np.rint(np.where(missing, 0, numbers)).astype(np.int64)
+    negative = ints < 0
+    remaining = np.abs(ints)
+
+    # one row of UCS4 characters per output position, filled right to left
+    width = 26
+    chars = np.full((width, len(ints)), ord(' '), dtype=np.uint32)
+    row = width - 1
+    position = 0
+    while True:
+        # zero still gets its single digit, other numbers stop when exhausted
+        active = (remaining > 0) | (position == 0)
+        if not active.any():
+            break
+        if position and position % 3 == 0:
+            chars[row] = np.where(active, ord(','), ord(' '))
+            row -= 1
+        remaining, digit = np.divmod(remaining, 10)
+        chars[row] = np.where(active, ord('0') + digit, ord(' '))
+        row -= 1
+        position += 1
+
+    # reinterpret each column of characters as one fixed-width string
+    used = width - row - 1
+    columns = np.ascontiguousarray(chars[row + 1:].T)
+    out = np.strings.lstrip(columns.view(f'<U{used}').ravel())
+    if negative.any():
+        out = np.where(negative, np.strings.add('-', out), out)
+
+    out = out.astype(object)
+    out[missing] = ''
+    return out
+
+@staged("transform.format_yfinance")
+def format_yfinance_data(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Display stage: formats canonical data for the user, vectorized throughout.
     1. Formats Date from '2026-01-14 08:00:00+00:00' to '2026-01-14 08:00'
     2. Formats Open, High, Low, Close to 2 decimal places
     3. Formats Volume with thousand separators
@@ -13,47 +97,48 @@ def transform_yfinance_data(df: pd.DataFrame) -> pd.DataFrame:
     # Copy to avoid SettingWithCopyWarning
     df = df.copy()
 
-    # 0. Standardize column names to Title Case
-    # This handles cases where yahooquery or files have lowercase headers (date vs Date)
-    rename_map = {
-        'date': 'Date',
-        'open': 'Open',
-        'high': 'High',
-        'low': 'Low',
-        'close': 'Close',
-        'volume': 'Volume',
-        'symbol': 'Symbol',
-        'adj close': 'Adj Close'
-    }
-    df.rename(columns=rename_map, inplace=True)
-
     # 1. Format Date
-    if 'Date' in df.columns:
-        # Convert to datetime objects first to handle various input formats safely
-        df['Date'] = pd.to_datetime(df['Date'], utc=True)
-        # Format to string 'YYYY-MM-DD HH:MM'
-        df['Date'] = df['Date'].dt.strftime('%Y-%m-%d %H:%M')
+    if 'Date' in df.columns and isinstance(df['Date'].dtype, pd.DatetimeTZDtype):
+        # datetime_as_string works on the raw UTC values, 'YYYY-MM-DDTHH:MM'
+        values = df['Date'].dt.tz_convert('UTC').dt.tz_localize(None).to_numpy()
+        text = np.datetime_as_string(values, unit='m')
+        # swap the 'T' separator for a space in place, character 10 of every row
+        text.view(np.uint32).reshape(len(text), -1)[:, 10] = ord(' ')
+        text = text.astype(object)
+        text[pd.isna(values)] = None
+        df['Date'] = text
 
     # 2. Format OHLC to 2 decimal places
-    ohlc_cols = ['Open', 'High', 'Low', 'Close']
-    for col in ohlc_cols:
-        if col in df.columns:
-            # Round to 2 decimals
+    for col in OHLC_COLUMNS:
+        if col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
             df[col] = df[col].round(2)
 
     # 3. Format Volume with thousand separators
-    if 'Volume' in df.columns:
-        # Ensure it's numeric before formatting
-        # If it's cached as string "1,000", handle that
-        if df['Volume'].dtype == object:
-             # Try to clean it up just in case (remove commas)
-             try:
-                 df['Volume'] = df['Volume'].astype(str).str.replace(',', '').astype(float)
-             except Exception:
-                 pass # Leave as is if conversion fails
-
-        # Apply formatting to numerics
-        if pd.api.types.is_numeric_dtype(df['Volume']):
-            df['Volume'] = df['Volume'].apply(lambda x: "{:,.0f}".format(x) if pd.notnull(x) else "")
+    if 'Volume' in df.columns and pd.api.types.is_numeric_dtype(df['Volume']):
+        df['Volume'] = format_thousands(df['Volume'])
+
+    return df
+
+def transform_yfinance_data(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Transforms the Yahoo Finance DataFrame to be more user-friendly.
+    Runs the canonical stage followed by the display stage, for callers
+    holding raw or legacy string-typed data.
+    """
+    return format_yfinance_data(normalize_yfinance_data(df))
+
+@staged("transform.normalize_report")
+def normalize_report_data(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts a Trading212 history report to typed columns for storage.
+    Parses the Time column to a UTC datetime, other columns keep the
+    types pandas inferred when the export was read.
+    """
+    if df.empty:
+        return df
+
+    df = df.copy()
+    if 'Time' in df.columns:
+        df['Time'] = pd.to_datetime(df['Time'], utc=True, errors='coerce')
 
     return df
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+class EventBus:
+    """
+    Fan-out of structured progress events from worker threads to async
+    subscribers, such as the /events stream. Publishing never blocks: a
+    subscriber whose queue is full simply misses events.
+    """
+
+    def __init__(self, history: int = 100, queue_size: int = 1000):
+        self._subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self._queue_size = queue_size
+        self._lock = threading.Lock()
+        self._sequence = 0
+
+    def publish(self, event_type: str, **data: Any) -> Dict[str, Any]:
+        """Send an event to every subscriber, callable from any thread."""
+        with self._lock:
+            self._sequence += 1
+            event = {"id": self._sequence, "type": event_type, "time": time.time(), **data}
+            self._recent.append(event)
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:
+                # the subscriber's loop has closed, it will unsubscribe itself
+                pass
+        return event
+
+    def subscribe(self, since: Optional[int] = None) -> asyncio.Queue:
+        """
+        Register a queue on the running event loop.
+        Events newer than since are replayed first, so a client that
+        reconnects does not miss progress.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size)
+        with self._lock:
+            self._subscribers.append((asyncio.get_running_loop(), queue))
+            if since is not None:
+                for event in self._recent:
+                    if event["id"] > since:
+                        self._offer(queue, event)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s[1] is not queue]
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: Dict[str, Any]) -> None:
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+
+# Shared bus for the whole process
+bus = EventBus()
+
+
+def publish(event_type: str, **data: Any) -> Dict[str, Any]:
+    """Publish a progress event on the shared bus."""
+    return bus.publish(event_type, **data)
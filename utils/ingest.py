@@ -0,0 +1,180 @@
+"""
+Streaming ingestion of Trading212 history exports.
+
+The export is written to disk as it downloads, then read back in chunks
+sized to stay under a memory ceiling. A first pass settles each column's
+type across the whole file, so every chunk is typed the same way; a second
+pass types each chunk, appends it to the report's parquet file and merges
+it into the ledger. Peak memory follows the chunk size, not the export size.
+"""
+import os
+import numpy as np
+import pandas as pd
+from typing import Any, AsyncIterable, Dict, Iterable, Optional
+from utils import catalog, ledger
+from utils.metrics import stage
+from utils.storage import report_path
+
+# memory a single ingest may use for its chunks, in bytes
+DEFAULT_MEMORY_LIMIT = 64 * 1024 * 1024
+# copies of a chunk alive at once: raw strings, typed frame, arrow table, ledger rows
+COPY_FACTOR = 6
+MIN_CHUNK_ROWS = 1_000
+SAMPLE_ROWS = 1_000
+# bytes per write while downloading
+DOWNLOAD_CHUNK = 1 << 20
+REQUIRED_COLUMNS = ("Action", "Time")
+# column kinds settled by the first pass
+DATETIME, INT, FLOAT, STRING = "datetime", "int", "float", "string"
+
+
+def download_path(report_id) -> str:
+    """Where an export is written while it downloads, outside the report globs."""
+    return f"{os.path.splitext(report_path(report_id))[0]}.csv.download"
+
+
+def stream_to_file(chunks: Iterable[bytes], path: str) -> int:
+    """Write downloaded chunks straight to path, returns the bytes written."""
+    written = 0
+    tmp_path = f"{path}.part"
+    with open(tmp_path, "wb") as file:
+        for chunk in chunks:
+            if chunk:
+                file.write(chunk)
+                written += len(chunk)
+    os.replace(tmp_path, path)
+    return written
+
+
+async def astream_to_file(chunks: AsyncIterable[bytes], path: str) -> int:
+    """stream_to_file for an async download."""
+    written = 0
+    tmp_path = f"{path}.part"
+    with open(tmp_path, "wb") as file:
+        async for chunk in chunks:
+            if chunk:
+                file.write(chunk)
+                written += len(chunk)
+    os.replace(tmp_path, path)
+    return written
+
+
+def chunk_rows_for(csv_path: str, memory_limit: int = DEFAULT_MEMORY_LIMIT) -> int:
+    """Rows per chunk that keep an ingest of csv_path under memory_limit bytes."""
+    sample = pd.read_csv(csv_path, nrows=SAMPLE_ROWS, dtype=str)
+    if sample.empty:
+        return MIN_CHUNK_ROWS
+    per_row = sample.memory_usage(deep=True).sum() / len(sample)
+    return max(MIN_CHUNK_ROWS, int(memory_limit // (per_row * COPY_FACTOR)))
+
+
+def _read_chunks(csv_path: str, chunk_rows: int) -> Iterable[pd.DataFrame]:
+    # every cell as text, typing is decided over the whole file
+    return pd.read_csv(csv_path, dtype=str, chunksize=chunk_rows)
+
+
+def infer_kinds(csv_path: str, chunk_rows: int) -> Dict[str, str]:
+    """
+    Type of every column across the whole export, the way read_csv would
+    infer it for the full file: Time as a UTC datetime, int when every value
+    is a whole number and none is missing, float when every value parses as
+    a number, string otherwise.
+    """
+    numeric: Dict[str, bool] = {}
+    integral: Dict[str, bool] = {}
+    for chunk in _read_chunks(csv_path, chunk_rows):
+        for column in chunk.columns:
+            if column == "Time" or numeric.get(column) is False:
+                continue
+            values = chunk[column]
+            parsed = pd.to_numeric(values, errors="coerce")
+            if parsed.notna().sum() != values.notna().sum():
+                numeric[column] = False
+                continue
+            numeric[column] = True
+            whole = values.notna().all() and bool(np.all(np.mod(parsed.to_numpy(), 1) == 0))
+            integral[column] = integral.get(column, True) and whole
+    kinds = {}
+    for column in numeric:
+        if not numeric[column]:
+            kinds[column] = STRING
+        else:
+            kinds[column] = INT if integral.get(column) else FLOAT
+    kinds["Time"] = DATETIME
+    return kinds
+
+
+def _type_chunk(chunk: pd.DataFrame, kinds: Dict[str, str]) -> pd.DataFrame:
+    # apply the settled column types to one chunk of text
+    typed = {}
+    for column in chunk.columns:
+        kind = kinds.get(column, STRING)
+        if kind == DATETIME:
+            typed[column] = pd.to_datetime(chunk[column], utc=True, errors="coerce")
+        elif kind == INT:
+            typed[column] = pd.to_numeric(chunk[column]).astype("int64")
+        elif kind == FLOAT:
+            typed[column] = pd.to_numeric(chunk[column], errors="coerce").astype("float64")
+        else:
+            typed[column] = chunk[column]
+    return pd.DataFrame(typed, index=chunk.index)
+
+
+def _arrow_schema(columns, kinds: Dict[str, str]):
+    import pyarrow as pa
+    types = {DATETIME: pa.timestamp("ns", tz="UTC"), INT: pa.int64(), FLOAT: pa.float64(), STRING: pa.string()}
+    return pa.schema([(column, types[kinds.get(column, STRING)]) for column in columns])
+
+
+def ingest_report(csv_path: str, report_id: int,
+                  memory_limit: int = DEFAULT_MEMORY_LIMIT) -> Optional[Dict[str, Any]]:
+    """
+    Type a downloaded export chunk by chunk into the report's parquet file
+    and the ledger. Returns the file, rows, new ledger rows, rows with an
+    unreadable Time and chunk count, or None for an empty export.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if os.path.getsize(csv_path) == 0:
+        return None
+    header = pd.read_csv(csv_path, nrows=0).columns.tolist()
+    missing = [c for c in REQUIRED_COLUMNS if c not in header]
+    if missing:
+        raise ValueError(f"Export is missing columns: {', '.join(missing)}")
+    chunk_rows = chunk_rows_for(csv_path, memory_limit)
+    kinds = infer_kinds(csv_path, chunk_rows)
+    schema = _arrow_schema(header, kinds)
+
+    filename = report_path(report_id)
+    tmp_path = f"{filename}.tmp"
+    rows = new_rows = invalid = chunks = 0
+    first = last = None
+    try:
+        with stage("ingest.report") as info, pq.ParquetWriter(tmp_path, schema) as writer:
+            for chunk in _read_chunks(csv_path, chunk_rows):
+                typed = _type_chunk(chunk, kinds)
+                writer.write_table(pa.Table.from_pandas(typed, schema=schema, preserve_index=False))
+                _, added = ledger.upsert_report(typed, report_id)
+                times = typed["Time"].dropna()
+                if not times.empty:
+                    first = min(first, times.min()) if first is not None else times.min()
+                    last = max(last, times.max()) if last is not None else times.max()
+                rows += len(typed)
+                new_rows += added
+                invalid += len(typed) - len(times)
+                chunks += 1
+            info["rows"], info["bytes"] = rows, os.path.getsize(csv_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if rows == 0:
+        os.remove(tmp_path)
+        return None
+    os.replace(tmp_path, filename)
+    catalog.record_summary(filename, rows,
+                           first.timestamp() if first is not None else None,
+                           last.timestamp() if last is not None else None)
+    return {"file": filename, "rows": rows, "new_rows": new_rows, "invalid": invalid,
+            "chunks": chunks, "chunk_rows": chunk_rows}
@@ -0,0 +1,172 @@
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from utils.events import publish
+
+# Job states, a job ends in one of the last three
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Data the scrape jobs write, jobs claiming the same resource run one at a time
+T212_DATA = "t212_data"
+MARKET_DATA = "market_data"
+# seconds between cancellation checks while a job waits for its resources
+RESOURCE_POLL = 0.5
+
+
+class Job:
+    """
+    A unit of background work. The work function receives the job's
+    cancel_event and is expected to check it between steps.
+    """
+
+    def __init__(self, name: str, resources: Sequence[str] = ()):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.resources = tuple(sorted(set(resources)))
+        self.status = QUEUED
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self.future: Optional[Future] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "resources": list(self.resources),
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobManager:
+    """
+    Runs named jobs in a bounded thread pool.
+    Submitting a job while another with the same name is still queued or
+    running returns the existing job instead of starting a second run.
+    A job also holds a lock on each resource it claims while it runs, so
+    jobs with different names that write the same data wait for each
+    other, staying queued until the resources are free.
+    """
+
+    def __init__(self, max_workers: int = 2, history: int = 50):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[str, Job] = {}
+        self._resources: Dict[str, threading.Lock] = {}
+        self._history = history
+        self._lock = threading.Lock()
+
+    def submit(self, name: str, func: Callable[[threading.Event], Any], resources: Sequence[str] = ()) -> Job:
+        """
+        Start func as a job called name, or attach to the run in progress.
+        The job runs once every resource it claims is free.
+        """
+        with self._lock:
+            active = self._active.get(name)
+            if active is not None and not active.done:
+                return active
+            job = Job(name, resources)
+            for resource in job.resources:
+                self._resources.setdefault(resource, threading.Lock())
+            self._jobs[job.id] = job
+            self._active[name] = job
+            self._prune()
+            job.future = self._executor.submit(self._run, job, func)
+            return job
+
+    def active(self, name: str) -> Optional[Job]:
+        """The queued or running job called name, if there is one."""
+        with self._lock:
+            job = self._active.get(name)
+            return job if job is not None and not job.done else None
+
+    def busy(self, resource: str) -> bool:
+        """True while a queued or running job claims resource."""
+        with self._lock:
+            return any(resource in job.resources for job in self._active.values() if not job.done)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.created, reverse=True)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Ask a job to stop, a queued job is dropped before it starts."""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return job
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELLED)
+        return job
+
+    def _claim(self, job: Job) -> List[threading.Lock]:
+        # take the job's resource locks in name order, so two jobs never wait on each other
+        held: List[threading.Lock] = []
+        for resource in job.resources:
+            lock = self._resources[resource]
+            while not lock.acquire(timeout=RESOURCE_POLL):
+                if job.cancel_event.is_set():
+                    for other in held:
+                        other.release()
+                    return []
+            held.append(lock)
+        return held
+
+    def _run(self, job: Job, func: Callable[[threading.Event], Any]) -> None:
+        held = self._claim(job)
+        if job.cancel_event.is_set():
+            # cancelled while it waited for another job's resources
+            for lock in held:
+                lock.release()
+            self._finish(job, CANCELLED)
+            return
+        job.status = RUNNING
+        job.started = time.time()
+        publish("job.started", job=job.to_dict())
+        try:
+            job.result = func(job.cancel_event)
+            self._finish(job, CANCELLED if job.cancel_event.is_set() else SUCCEEDED)
+        except Exception as e:
+            print(f"Job {job.name} failed: {e}")
+            job.error = str(e)
+            self._finish(job, FAILED)
+        finally:
+            for lock in held:
+                lock.release()
+
+    def _finish(self, job: Job, status: str) -> None:
+        with self._lock:
+            job.status = status
+            job.finished = time.time()
+            if self._active.get(job.name) is job:
+                del self._active[job.name]
+        publish("job.finished", job=job.to_dict())
+
+    def _prune(self) -> None:
+        # keep only the most recent finished jobs
+        finished = sorted((j for j in self._jobs.values() if j.done), key=lambda j: j.created)
+        for job in finished[:max(0, len(self._jobs) - self._history)]:
+            del self._jobs[job.id]
@@ -0,0 +1,69 @@
+"""
+Deferred loading for the API's heavy modules and singletons.
+
+pandas, pyarrow, yahooquery and the clients take most of the time it takes
+to import the API. LazyObject stands in for a module-level singleton and
+builds it, importing whatever it needs, the first time it is used. The API
+starts answering straight away and warm_up loads the rest on a background
+thread, so the first real request rarely pays for the imports either.
+"""
+import importlib
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional
+from utils.metrics import record_stage
+
+
+class LazyObject:
+    """
+    Proxy for the object factory() returns, built on first attribute access.
+    The proxy has no public names of its own, so every attribute is the
+    target's; use loaded() and resolve() to inspect the proxy itself.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._target: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        # only reached for names the proxy itself does not have
+        return getattr(resolve(self), name)
+
+
+def loaded(obj: LazyObject) -> bool:
+    """True once the proxied object has been built."""
+    return obj._target is not None
+
+
+def resolve(obj: LazyObject) -> Any:
+    """The proxied object, building it if this is the first use."""
+    if obj._target is None:
+        with obj._lock:
+            if obj._target is None:
+                obj._target = obj._factory()
+    return obj._target
+
+
+def warm_up(modules: Iterable[str], objects: Iterable[LazyObject] = ()) -> threading.Thread:
+    """
+    Import modules and build objects on a daemon thread, returns the thread.
+    Failures are printed and left for the first request to raise again.
+    """
+    def run():
+        start = time.perf_counter()
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                print(f"Warm-up could not import {name}: {e}")
+        for obj in objects:
+            try:
+                resolve(obj)
+            except Exception as e:
+                print(f"Warm-up could not build {obj._factory.__name__}: {e}")
+        record_stage("startup.warm_up", time.perf_counter() - start)
+
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,262 @@
+"""
+Local ledger of Trading212 transactions, merged from the history exports.
+
+Rows are upserted on the export's ID column into a SQLite table indexed by
+time and ticker, so overlapping exports never duplicate a transaction and
+"all my transactions" is one indexed query instead of a scan of every
+History Report file. Backfill the existing reports with:
+
+    python -m utils.ledger [files...]
+"""
+import argparse
+import hashlib
+import json
+import threading
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from peewee import (BigIntegerField, CharField, DoubleField, Model, SqliteDatabase, TextField,
+                    TimestampField, chunked)
+
+# SQLite file holding the ledger, next to the history reports
+LEDGER_PATH = "ledger.db"
+# window requested when the ledger is empty
+INITIAL_WINDOW = timedelta(weeks=4)
+# re-request this much before the last ingested event, to catch late rows
+SYNC_OVERLAP = timedelta(days=1)
+# rows per INSERT, kept under SQLite's bound parameter limit
+UPSERT_BATCH = 500
+
+# export column -> ledger field, any other export column goes in extra
+LEDGER_COLUMNS = {
+    "ID": "id",
+    "Action": "action",
+    "Time": "time",
+    "ISIN": "isin",
+    "Ticker": "ticker",
+    "Name": "name",
+    "No. of shares": "shares",
+    "Price / share": "price",
+    "Currency (Price / share)": "price_currency",
+    "Exchange rate": "exchange_rate",
+    "Total": "total",
+    "Currency (Total)": "total_currency",
+}
+NUMERIC_FIELDS = ("shares", "price", "exchange_rate", "total")
+
+db = SqliteDatabase(None, pragmas={"journal_mode": "wal", "synchronous": "normal"})
+_init_lock = threading.Lock()
+# path the tables were created in, set only once they exist
+_ready: Optional[str] = None
+
+
+class Transaction(Model):
+    # the export's ID, or a hash of the row for entries that have none
+    id = CharField(primary_key=True)
+    action = CharField(index=True)
+    time = TimestampField(resolution=1000, utc=True, index=True)
+    isin = CharField(null=True)
+    ticker = CharField(null=True, index=True)
+    name = CharField(null=True)
+    shares = DoubleField(null=True)
+    price = DoubleField(null=True)
+    price_currency = CharField(null=True)
+    exchange_rate = DoubleField(null=True)
+    total = DoubleField(null=True)
+    total_currency = CharField(null=True)
+    # remaining export columns as JSON, they vary between account types
+    extra = TextField(null=True)
+    # export the row last came from
+    report_id = BigIntegerField(null=True)
+
+    class Meta:
+        database = db
+        table_name = "transactions"
+
+
+def init_ledger(path: str = LEDGER_PATH) -> SqliteDatabase:
+    """Open the ledger database, creating the table on first use."""
+    global _ready
+    with _init_lock:
+        if _ready != path:
+            if not db.is_closed():
+                db.close()
+            db.init(path)
+            db.create_tables([Transaction])
+            _ready = path
+    return db
+
+
+def _ensure_ledger() -> None:
+    # db.database is set before the tables exist, so other threads wait on _ready
+    if _ready is None:
+        init_ledger()
+
+
+def _row_key(row: Dict[str, Any]) -> str:
+    # dividends and interest can come without an ID, key them on their content
+    if row.get("id"):
+        return str(row["id"])
+    content = "|".join(str(row.get(f)) for f in ("action", "time", "ticker", "total"))
+    return "auto:" + hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def _to_rows(df: pd.DataFrame, report_id: Optional[int]) -> List[Dict[str, Any]]:
+    # map a history export to ledger rows, times as UTC epoch milliseconds
+    times = pd.to_datetime(df["Time"], utc=True, errors="coerce")
+    df = df.loc[times.notna()]
+    millis = (times[times.notna()].astype("int64") // 10**6).tolist()
+    extra_cols = [c for c in df.columns if c not in LEDGER_COLUMNS]
+    core = df[[c for c in df.columns if c in LEDGER_COLUMNS and c != "Time"]].rename(columns=LEDGER_COLUMNS)
+    for field in NUMERIC_FIELDS:
+        if field in core.columns:
+            core[field] = pd.to_numeric(core[field], errors="coerce")
+    core = core.astype(object).where(pd.notnull(core), None)
+    # to_dict gives no records for a frame without columns, so pad with empties
+    extras = df[extra_cols].astype(object).where(pd.notnull(df[extra_cols]), None)
+    extras = extras.to_dict(orient="records") if extra_cols else [{}] * len(df)
+
+    rows = []
+    for record, extra, ms in zip(core.to_dict(orient="records"), extras, millis):
+        record["time"] = ms / 1000
+        record["report_id"] = report_id
+        extra = {k: v for k, v in extra.items() if v is not None}
+        record["extra"] = json.dumps(extra, default=str) if extra else None
+        record["id"] = _row_key(record)
+        rows.append(record)
+    return rows
+
+
+def upsert_report(df: pd.DataFrame, report_id: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Merge a history export into the ledger, replacing rows with the same ID.
+    Returns (rows in the export, rows that were not in the ledger before).
+    """
+    _ensure_ledger()
+    if df.empty or "Time" not in df.columns:
+        return 0, 0
+    rows = _to_rows(df, report_id)
+    # the same ID can appear twice within one export, keep the last
+    rows = list({row["id"]: row for row in rows}.values())
+    # one prepared statement for every row, building the SQL per batch with
+    # peewee costs more than the insert itself on large exports
+    fields = Transaction._meta.sorted_fields
+    columns = ", ".join(f'"{f.column_name}"' for f in fields)
+    sql = (f'INSERT OR REPLACE INTO "{Transaction._meta.table_name}" ({columns}) '
+           f'VALUES ({", ".join("?" * len(fields))})')
+    new_rows = 0
+    with db.atomic():
+        for batch in chunked(rows, UPSERT_BATCH):
+            ids = [row["id"] for row in batch]
+            existing = Transaction.select(Transaction.id).where(Transaction.id.in_(ids)).count()
+            new_rows += len(batch) - existing
+            for row in batch:
+                # stored as epoch milliseconds, as TimestampField(resolution=1000) writes it
+                row["time"] = int(round(row["time"] * 1000))
+            db.connection().executemany(sql, [tuple(row.get(f.name) for f in fields) for row in batch])
+    return len(rows), new_rows
+
+
+def last_event_time() -> Optional[datetime]:
+    """Time of the newest transaction in the ledger, as an aware UTC datetime."""
+    _ensure_ledger()
+    latest = Transaction.select(Transaction.time).order_by(Transaction.time.desc()).limit(1).scalar()
+    return latest.replace(tzinfo=timezone.utc) if latest else None
+
+
+def count_transactions(end: Optional[datetime] = None) -> int:
+    """Number of transactions in the ledger, up to and including end."""
+    _ensure_ledger()
+    query = Transaction.select()
+    if end is not None:
+        query = query.where(Transaction.time <= end)
+    return query.count()
+
+
+def checksum(end: Optional[datetime] = None) -> Tuple[float, ...]:
+    """
+    Fingerprint of the transactions up to and including end: the row count
+    and weighted sums of every field the analytics replay. Replacing a row
+    with a corrected time, action, ticker, shares, price, rate or total
+    changes it even though the count stays the same.
+    """
+    _ensure_ledger()
+    # weight each row by its time so offsetting edits to two rows still show
+    weight = "(time % 9973 + 1)"
+    sql = (f'SELECT count(*), total(time), total(shares * {weight}), total(price * {weight}), '
+           f'total(exchange_rate * {weight}), total("total" * {weight}), '
+           f'total((length(action) + coalesce(length(ticker), 0)) * {weight}) '
+           f'FROM "{Transaction._meta.table_name}"')
+    params: Tuple[Any, ...] = ()
+    if end is not None:
+        sql += " WHERE time <= ?"
+        params = (int(round(end.timestamp() * 1000)),)
+    return tuple(db.execute_sql(sql, params).fetchone())
+
+
+def sync_window(now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """
+    (from, to) window for the next history export: from the last ingested
+    event less the overlap, or the initial window when the ledger is empty.
+    """
+    now = now or datetime.now(timezone.utc)
+    latest = last_event_time()
+    start = latest - SYNC_OVERLAP if latest else now - INITIAL_WINDOW
+    return min(start, now), now
+
+
+def query_transactions(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                       ticker: Optional[str] = None, action: Optional[str] = None,
+                       offset: int = 0, limit: Optional[int] = None) -> Tuple[pd.DataFrame, int]:
+    """
+    Transactions matching the filters, oldest first, using the export's
+    column names. Returns (page, total matching rows).
+    """
+    _ensure_ledger()
+    query = Transaction.select()
+    if start is not None:
+        query = query.where(Transaction.time >= start)
+    if end is not None:
+        query = query.where(Transaction.time <= end)
+    if ticker:
+        query = query.where(Transaction.ticker == ticker)
+    if action:
+        query = query.where(Transaction.action == action)
+    total = query.count()
+    query = query.order_by(Transaction.time, Transaction.id).offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+
+    # read the raw rows in one go, the time column stays as integers
+    sql, params = query.sql()
+    df = pd.read_sql_query(sql, db.connection(), params=params)
+    df["time"] = pd.to_datetime(df["time"], unit="ms", utc=True)
+    df = df.drop(columns=["report_id"])
+    extras = pd.DataFrame([json.loads(e) if e else {} for e in df.pop("extra")], index=df.index)
+    df = df.rename(columns={v: k for k, v in LEDGER_COLUMNS.items()})
+    df = df[[c for c in LEDGER_COLUMNS if c in df.columns]]
+    return pd.concat([df, extras], axis=1), total
+
+
+def ingest_files(paths: Iterable[str]) -> int:
+    """Backfill the ledger from stored history reports, returning new rows."""
+    from utils.storage import load_frame
+    added = 0
+    for path in paths:
+        try:
+            rows, new_rows = upsert_report(load_frame(path))
+            added += new_rows
+            print(f"Ingested {path}: {rows} rows, {new_rows} new")
+        except Exception as e:
+            print(f"Error ingesting {path}: {e}")
+    return added
+
+
+if __name__ == "__main__":
+    from utils.storage import list_report_files
+    parser = argparse.ArgumentParser(description="Backfill the transaction ledger from history reports.")
+    parser.add_argument("files", nargs="*", help="reports to ingest, defaults to every History Report file")
+    args = parser.parse_args()
+    init_ledger()
+    added = ingest_files(args.files or sorted(list_report_files()))
+    print(f"\nAdded {added} transactions to {LEDGER_PATH}")
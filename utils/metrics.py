@@ -0,0 +1,214 @@
+"""
+In-process metrics for the scrape and data-serving hot paths.
+
+Counters and histograms are kept per label set in one registry and served
+in the Prometheus text format by GET /metrics. Upstream calls record their
+duration, status, retries and 429s; transform, storage and serialization
+stages record their duration with the rows and bytes they handled.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# upper bounds of the latency buckets, in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {', '.join(self.labels) or 'none'}, got {', '.join(labels) or 'none'}")
+        return tuple(str(labels[n]) for n in self.labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic total per label set."""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return super().render() + [f"{self.name}{_format_labels(self.labels, k)} {_format_value(v)}" for k, v in values]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values per label set, with cumulative buckets."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # per label set: bucket counts, sum, count
+        self._values: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the duration of the block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: Any) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[2] if entry else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((k, [list(v[0]), v[1], v[2]]) for k, v in self._values.items())
+        lines = super().render()
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                labels = _format_labels(self.labels + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Named metrics, created on first use and rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labels: Sequence[str], **kwargs) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labels, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return "\n".join(line for m in metrics for line in m.render()) + "\n"
+
+
+registry = Registry()
+
+UPSTREAM_SECONDS = registry.histogram(
+    "scraper_upstream_request_seconds", "Duration of calls to Yahoo and Trading212.", ("service", "endpoint"))
+UPSTREAM_REQUESTS = registry.counter(
+    "scraper_upstream_requests_total", "Calls to Yahoo and Trading212 by outcome.", ("service", "endpoint", "status"))
+UPSTREAM_RETRIES = registry.counter(
+    "scraper_upstream_retries_total", "Upstream calls repeated, by reason.", ("service", "endpoint", "reason"))
+UPSTREAM_RATE_LIMITED = registry.counter(
+    "scraper_upstream_rate_limited_total", "Upstream answers that were 429 Too Many Requests.", ("service", "endpoint"))
+UPSTREAM_ROWS = registry.counter(
+    "scraper_upstream_rows_total", "Rows received from upstream: bars and report lines.", ("service",))
+POLL_ITERATIONS = registry.counter(
+    "scraper_t212_poll_iterations_total", "Status checks made while waiting on history exports.")
+EXPORT_WAIT_SECONDS = registry.histogram(
+    "scraper_t212_export_wait_seconds", "Time from requesting a history export to it being ready.",
+    buckets=(1, 2.5, 5, 10, 30, 60, 120, 300))
+STAGE_SECONDS = registry.histogram(
+    "scraper_stage_seconds", "Duration of transform, storage and serialization stages.", ("stage",))
+STAGE_ROWS = registry.counter("scraper_stage_rows_total", "Rows handled by each stage.", ("stage",))
+STAGE_BYTES = registry.counter("scraper_stage_bytes_total", "Bytes read, written or encoded by each stage.", ("stage",))
+HTTP_SECONDS = registry.histogram(
+    "scraper_http_request_seconds", "API request duration until the response starts.", ("method", "route", "status"))
+
+
+def record_stage(name: str, seconds: float, rows: Optional[int] = None, nbytes: Optional[int] = None) -> None:
+    """Record one run of a stage with the rows and bytes it handled."""
+    STAGE_SECONDS.observe(seconds, stage=name)
+    if rows is not None:
+        STAGE_ROWS.inc(rows, stage=name)
+    if nbytes is not None:
+        STAGE_BYTES.inc(nbytes, stage=name)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[Dict[str, Optional[int]]]:
+    """Time the block as a stage, set "rows"/"bytes" on the yielded dict to count them."""
+    info: Dict[str, Optional[int]] = {"rows": None, "bytes": None}
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        record_stage(name, time.perf_counter() - start, info["rows"], info["bytes"])
+
+
+def staged(name: str) -> Callable:
+    """Decorator timing a function as a stage, counting the rows of the frame it returns."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name) as info:
+                result = func(*args, **kwargs)
+                info["rows"] = len(result) if hasattr(result, "__len__") else None
+                return result
+        return wrapper
+    return decorator
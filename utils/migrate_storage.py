@@ -0,0 +1,64 @@
+"""
+One-shot migration of legacy CSV files into the columnar store.
+
+Converts market_data/*.csv and History Report *.csv to typed Parquet files.
+Run from the project root with:
+
+    python -m utils.migrate_storage [--delete]
+"""
+import argparse
+import glob
+import os
+import pandas as pd
+from typing import Callable, List, Optional
+from utils import catalog
+from utils.data_transform import normalize_yfinance_data, normalize_report_data
+from utils.storage import MARKET_DATA_DIR, STORE_EXT, market_data_path, save_frame
+
+
+def _migrate_files(files: List[str], normalize: Callable[[pd.DataFrame], pd.DataFrame], delete: bool) -> int:
+    migrated = 0
+    for csv_path in files:
+        target = os.path.splitext(csv_path)[0] + STORE_EXT
+        try:
+            df = normalize(pd.read_csv(csv_path))
+            save_frame(df, target)
+            catalog.record(target, df)
+            migrated += 1
+            print(f"Migrated {csv_path} -> {target} ({len(df)} rows)")
+            if delete:
+                os.remove(csv_path)
+        except Exception as e:
+            print(f"Error migrating {csv_path}: {e}")
+    return migrated
+
+
+def migrate_market_file(symbol: str, interval: str) -> Optional[str]:
+    """
+    Convert one symbol's legacy market data CSV if it has no columnar file
+    yet, so an incremental refresh extends its history instead of hiding it.
+    Returns the columnar path, None if there was no CSV to convert.
+    """
+    target = market_data_path(symbol, interval)
+    csv_path = os.path.splitext(target)[0] + ".csv"
+    if os.path.exists(target) or not os.path.exists(csv_path):
+        return None
+    return target if _migrate_files([csv_path], normalize_yfinance_data, delete=False) else None
+
+
+def migrate(delete: bool = False) -> int:
+    """Convert every legacy CSV file, returning the number migrated."""
+    migrated = _migrate_files(glob.glob(f"{MARKET_DATA_DIR}/*.csv"), normalize_yfinance_data, delete)
+    migrated += _migrate_files(glob.glob("History Report *.csv"), normalize_report_data, delete)
+    if delete:
+        # drop the catalog entries of the removed CSV files
+        catalog.sync_catalog(force=True)
+    print(f"\nMigrated {migrated} files")
+    return migrated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate legacy CSV data to the columnar store.")
+    parser.add_argument("--delete", action="store_true", help="remove each CSV after it is migrated")
+    args = parser.parse_args()
+    migrate(delete=args.delete)
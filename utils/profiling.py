@@ -0,0 +1,104 @@
+"""
+Opt-in per-request profiling for the API.
+
+With PROFILE_REQUESTS=1 in the environment, a request sent with an
+X-Profile header runs its endpoint under cProfile. The stats are written to
+profiles/ as a .prof file (open with snakeviz or pstats) next to a .txt
+summary of the top functions, and the .prof path comes back in the
+response's X-Profile header. Endpoints are wrapped by ProfiledRoute, so
+sync endpoints are profiled on the worker thread they actually run on;
+FastAPI's own encoding of a returned dict happens after the endpoint and
+shows up in the request timing on /metrics instead.
+"""
+import cProfile
+import functools
+import inspect
+import io
+import os
+import pstats
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+from fastapi.routing import APIRoute
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_DIR = "profiles"
+# functions listed in the text summary
+SUMMARY_LINES = 40
+
+# the profile of the request being handled, set by the middleware
+_current: ContextVar[Optional[Dict[str, Any]]] = ContextVar("profile", default=None)
+
+
+def enabled() -> bool:
+    """True when the server was started with PROFILE_REQUESTS=1."""
+    return os.environ.get("PROFILE_REQUESTS", "").lower() in ("1", "true", "yes")
+
+
+def start_request(headers) -> Optional[Dict[str, Any]]:
+    """Mark the current request for profiling if it asked to be and profiling is on."""
+    if not enabled() or PROFILE_HEADER.lower() not in headers:
+        return None
+    holder: Dict[str, Any] = {}
+    _current.set(holder)
+    return holder
+
+
+def _new_profiler(holder: Dict[str, Any]) -> cProfile.Profile:
+    profiler = cProfile.Profile()
+    holder["profiler"] = profiler
+    return profiler
+
+
+def profiled(func: Callable) -> Callable:
+    """Wrap an endpoint so it runs under cProfile when its request was marked."""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            holder = _current.get()
+            if holder is None:
+                return await func(*args, **kwargs)
+            profiler = _new_profiler(holder)
+            profiler.enable()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                profiler.disable()
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        holder = _current.get()
+        if holder is None:
+            return func(*args, **kwargs)
+        profiler = _new_profiler(holder)
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose endpoint can be profiled per request."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, profiled(endpoint), **kwargs)
+
+
+def dump(holder: Dict[str, Any], route: str) -> Optional[str]:
+    """Write the request's profile to PROFILE_DIR, returns the .prof path."""
+    profiler = holder.get("profiler")
+    if profiler is None:
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**6:06d}-{name}.prof")
+    profiler.dump_stats(path)
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(SUMMARY_LINES)
+    with open(path[:-len(".prof")] + ".txt", "w", encoding="utf-8") as file:
+        file.write(summary.getvalue())
+    return path
@@ -0,0 +1,165 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket used to enforce a global request budget.
+    Callers block in acquire() until a token is available, so the politeness
+    limit holds no matter how many worker threads share the limiter.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be greater than zero")
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        # top up the bucket for the time elapsed since the last call
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: int = 1) -> float:
+        """
+        Block until the requested tokens are available.
+        Returns the number of seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                # work out how long until enough tokens have accrued
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def try_acquire(self, tokens: int = 1) -> bool:
+        """Take the tokens if they are available right now, without blocking."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def charge(self, tokens: int) -> None:
+        """
+        Take tokens that were already spent, even past an empty bucket. The
+        debt is paid off by the refill before anything else is acquired.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+
+    def available(self) -> float:
+        """Tokens in the bucket right now."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class RateLimitGovernor:
+    """
+    Per-endpoint scheduler driven by the server's rate-limit headers.
+    After each response it records when the next call to that endpoint may
+    go out: straight away while x-ratelimit-remaining is above zero, at
+    x-ratelimit-reset once the budget is spent, or after Retry-After on a
+    429. Endpoints that have not answered yet fall back to a minimum interval.
+    """
+
+    # growth of the wait after repeated 429s without any timing headers
+    BACKOFF = 2.0
+    MAX_BACKOFF = 60.0
+
+    def __init__(self, min_intervals: Optional[Dict[str, float]] = None, default_interval: float = 1.0):
+        self.min_intervals = dict(min_intervals or {})
+        self.default_interval = default_interval
+        self._next_allowed: Dict[str, float] = {}
+        self._strikes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def delay(self, key: str) -> float:
+        """Seconds until the next call to key is allowed."""
+        with self._lock:
+            return max(0.0, self._next_allowed.get(key, 0.0) - time.monotonic())
+
+    def wait(self, key: str, cancel_event: Optional[threading.Event] = None) -> bool:
+        """Block until key may be called, returns True if cancelled while waiting."""
+        delay = self.delay(key)
+        if delay <= 0:
+            return False
+        if cancel_event is None:
+            time.sleep(delay)
+            return False
+        return cancel_event.wait(delay)
+
+    def update(self, key: str, status_code: int, headers: Mapping[str, str]) -> float:
+        """Record a response for key, returning the delay before the next call."""
+        now = time.monotonic()
+        remaining = _header_float(headers, "x-ratelimit-remaining")
+        reset_in = _reset_delay(headers)
+        retry_after = _retry_after(headers)
+        with self._lock:
+            if status_code == 429:
+                strikes = self._strikes.get(key, 0) + 1
+                self._strikes[key] = strikes
+                if retry_after is not None:
+                    delay = retry_after
+                elif reset_in is not None:
+                    delay = reset_in
+                else:
+                    base = self.min_intervals.get(key, self.default_interval)
+                    delay = min(self.MAX_BACKOFF, base * self.BACKOFF ** (strikes - 1))
+            else:
+                self._strikes.pop(key, None)
+                if remaining is not None and remaining > 0:
+                    # budget left in this window, the next call can go now
+                    delay = 0.0
+                elif remaining is not None and reset_in is not None:
+                    delay = reset_in
+                else:
+                    delay = self.min_intervals.get(key, self.default_interval)
+            self._next_allowed[key] = now + delay
+            return delay
+
+
+def _header_float(headers: Mapping[str, str], name: str) -> Optional[float]:
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _reset_delay(headers: Mapping[str, str]) -> Optional[float]:
+    # x-ratelimit-reset is the unix time at which the window resets
+    reset = _header_float(headers, "x-ratelimit-reset")
+    if reset is None:
+        return None
+    return max(0.0, reset - time.time())
+
+
+def _retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    # Retry-After is either a number of seconds or an HTTP date
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,158 @@
+"""
+OHLCV resampling and point-count downsampling for charting.
+
+Coarser bars (1h, 1d, 1wk, ...) are derived from the finest stored bars of a
+symbol instead of being fetched from Yahoo again. Downsampling caps the
+number of points returned for a visible range, either by merging runs of
+bars into OHLCV buckets, keeping each bucket's min/max close, or with
+Largest-Triangle-Three-Buckets on the close.
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple
+from utils import catalog
+
+# bar length of every interval name Yahoo and this module use
+INTERVALS: Dict[str, pd.Timedelta] = {
+    "1m": pd.Timedelta(minutes=1),
+    "2m": pd.Timedelta(minutes=2),
+    "5m": pd.Timedelta(minutes=5),
+    "15m": pd.Timedelta(minutes=15),
+    "30m": pd.Timedelta(minutes=30),
+    "60m": pd.Timedelta(hours=1),
+    "90m": pd.Timedelta(minutes=90),
+    "1h": pd.Timedelta(hours=1),
+    "4h": pd.Timedelta(hours=4),
+    "1d": pd.Timedelta(days=1),
+    "5d": pd.Timedelta(days=5),
+    "1wk": pd.Timedelta(weeks=1),
+    "1mo": pd.Timedelta(days=31),
+}
+# pandas resample rules, bins are closed and labelled on their start
+RULES = {"1wk": "W-MON", "1mo": "MS"}
+# how each column is aggregated into a coarser bar
+OHLCV_AGG = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum",
+             "Adj Close": "last", "Symbol": "first"}
+DOWNSAMPLE_METHODS = ("ohlc", "minmax", "lttb")
+
+
+def interval_length(interval: str) -> pd.Timedelta:
+    """Bar length of an interval name, ValueError for unknown names."""
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown interval {interval}, expected one of: {', '.join(INTERVALS)}")
+    return INTERVALS[interval]
+
+
+def stored_intervals(symbol: str) -> Dict[str, str]:
+    """
+    Stored bar files of a symbol keyed by interval, finest first. The symbol
+    resolves like catalog.find_dataset, so CSP1 finds the CSP1.L bars.
+    """
+    found: Dict[str, str] = {}
+    for d in catalog.list_datasets(kind=catalog.MARKET, symbol=symbol):
+        if d["interval"] not in INTERVALS:
+            continue
+        # an exact symbol match wins over a suffixed one
+        if d["interval"] not in found or d["symbol"] == symbol:
+            found[d["interval"]] = d["path"]
+    return {i: found[i] for i in sorted(found, key=lambda i: INTERVALS[i])}
+
+
+def _divides(source: str, target: str) -> bool:
+    # calendar bins (days and longer) are made of whole intraday bars
+    src, dst = INTERVALS[source], INTERVALS[target]
+    if src > dst:
+        return False
+    if dst >= pd.Timedelta(days=1):
+        return src <= pd.Timedelta(days=1) or target in RULES
+    return dst % src == pd.Timedelta(0)
+
+
+def pick_source(symbol: str, interval: str) -> Optional[Tuple[str, str]]:
+    """
+    (interval, path) of the stored bars to build interval bars from: the
+    coarsest stored interval that fits evenly into it, so the least data is
+    read. None if no stored file fits.
+    """
+    interval_length(interval)
+    candidates = [(i, path) for i, path in stored_intervals(symbol).items() if _divides(i, interval)]
+    return candidates[-1] if candidates else None
+
+
+def resample_ohlcv(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """
+    Aggregate typed bars (UTC Date column) into interval bars: first open,
+    highest high, lowest low, last close and summed volume. Bins without
+    any source bar are dropped rather than filled.
+    """
+    rule = RULES.get(interval, interval_length(interval))
+    if df.empty:
+        return df
+    agg = {c: f for c, f in OHLCV_AGG.items() if c in df.columns}
+    bars = (df.set_index(pd.DatetimeIndex(df["Date"]))
+              .resample(rule, label="left", closed="left")
+              .agg(agg))
+    bars = bars.loc[bars["Close"].notna()] if "Close" in bars.columns else bars.dropna(how="all")
+    bars.index.name = "Date"
+    return bars.reset_index()
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """
+    Positions kept by Largest-Triangle-Three-Buckets: the first and last
+    point, plus the point of each bucket forming the largest triangle with
+    the previous pick and the next bucket's average.
+    """
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    x = x.astype(float)
+    y = y.astype(float)
+    # bucket i covers edges[i]:edges[i + 1], the first and last points stand alone
+    edges = (np.arange(points - 1) * ((n - 2) / (points - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    keep = np.empty(points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def check_method(method: str) -> None:
+    """ValueError for an unknown downsampling method."""
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown method {method}, expected one of: {', '.join(DOWNSAMPLE_METHODS)}")
+
+
+def downsample(df: pd.DataFrame, points: int, method: str = "ohlc") -> pd.DataFrame:
+    """
+    Cap a bar frame at about points rows.
+    ohlc merges runs of consecutive bars into OHLCV buckets, minmax keeps the
+    bars with each bucket's lowest and highest close, lttb keeps the bars
+    picked by LTTB on the close.
+    """
+    check_method(method)
+    n = len(df)
+    if points <= 0 or n <= points:
+        return df
+    df = df.reset_index(drop=True)
+    if method == "lttb":
+        x = pd.DatetimeIndex(df["Date"]).asi8
+        return df.iloc[lttb_indices(x, df["Close"].to_numpy(), points)].reset_index(drop=True)
+    if method == "minmax":
+        # two rows per bucket, the low and the high
+        bucket = np.arange(n) * max(1, points // 2) // n
+        close = df["Close"]
+        keep = np.union1d(close.groupby(bucket).idxmin().to_numpy(), close.groupby(bucket).idxmax().to_numpy())
+        return df.iloc[keep].reset_index(drop=True)
+    bucket = np.arange(n) * points // n
+    agg = {c: f for c, f in OHLCV_AGG.items() if c in df.columns}
+    agg["Date"] = "first"
+    return df.groupby(bucket).agg(agg)[[c for c in df.columns if c in agg]].reset_index(drop=True)
@@ -0,0 +1,325 @@
+"""
+Background refresh of market data, driven by trading hours and staleness.
+
+Each cycle works out which tickers.csv symbols are due. While a symbol's
+exchange is open it is due once a new bar has started after its newest
+stored bar, at most once per bar length. While the exchange is shut it is
+due only if it has not been fetched since the last session settled, so
+nights and weekends cost no Yahoo calls. Due symbols are ranked open
+markets first, then by how many bars behind they are, and fetched in
+batches while the global request budget lasts; the rest wait for the next
+cycle. Runs inside the API (AUTO_REFRESH=1 or POST /scheduler/start) or on
+its own with:
+
+    python -m utils.scheduler [--interval 15m] [--tick 60]
+"""
+import argparse
+import math
+import threading
+import time
+import pandas as pd
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+from utils import catalog
+from utils.events import publish
+from utils.jobs import MARKET_DATA, Job, JobManager
+from utils.rate_limit import RateLimiter
+from utils.resample import interval_length
+
+
+class Session(NamedTuple):
+    timezone: str
+    open: dtime
+    close: dtime
+
+
+# regular trading hours, Monday to Friday; exchange holidays are not modelled
+EXCHANGES = {
+    "LSE": Session("Europe/London", dtime(8, 0), dtime(16, 30)),
+    "US": Session("America/New_York", dtime(9, 30), dtime(16, 0)),
+}
+# wait this long after a close before fetching the session's final bars
+SETTLE = timedelta(minutes=20)
+# seconds between cycles
+DEFAULT_TICK = 60.0
+# yahoo calls allowed per hour, and the most a single cycle can spend at once
+DEFAULT_BUDGET = 120
+DEFAULT_BURST = 10
+# a name of its own, since a refresh covers only the due symbols; it claims the
+# market data like the manual scrape, so the two never run side by side
+JOB_NAME = "scheduled_refresh"
+
+
+def exchange_for(yahoo_symbol: str) -> str:
+    """Exchange whose hours apply to a Yahoo symbol: LSE for .L, else US."""
+    return "LSE" if yahoo_symbol.upper().endswith(".L") else "US"
+
+
+def _session_bounds(exchange: str, day: date) -> Tuple[datetime, datetime]:
+    # open and close of one local trading day, as aware datetimes
+    session = EXCHANGES[exchange]
+    tz = ZoneInfo(session.timezone)
+    return datetime.combine(day, session.open, tzinfo=tz), datetime.combine(day, session.close, tzinfo=tz)
+
+
+def _local_day(exchange: str, now: datetime) -> date:
+    return now.astimezone(ZoneInfo(EXCHANGES[exchange].timezone)).date()
+
+
+def market_open(exchange: str, now: datetime) -> bool:
+    """True during the exchange's regular session."""
+    day = _local_day(exchange, now)
+    if day.weekday() >= 5:
+        return False
+    start, end = _session_bounds(exchange, day)
+    return start <= now < end
+
+
+def last_close(exchange: str, now: datetime) -> datetime:
+    """Close of the most recent session that had ended by now, in UTC."""
+    day = _local_day(exchange, now)
+    while True:
+        if day.weekday() < 5:
+            _, end = _session_bounds(exchange, day)
+            if end <= now:
+                return end.astimezone(timezone.utc)
+        day -= timedelta(days=1)
+
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    # catalog timestamps are ISO strings in UTC
+    return pd.Timestamp(value).tz_convert("UTC").to_pydatetime() if value else None
+
+
+def assess(yahoo_symbol: str, interval: str, dataset: Optional[Dict[str, Any]],
+           now: datetime) -> Dict[str, Any]:
+    """
+    Freshness of one stored dataset: whether its market is open, how many
+    bars behind it is (None when nothing is stored) and whether it is due.
+    """
+    exchange = exchange_for(yahoo_symbol)
+    length = interval_length(interval).to_pytimedelta()
+    is_open = market_open(exchange, now)
+    close = last_close(exchange, now)
+    last = _parse(dataset.get("last")) if dataset else None
+    refreshed = _parse(dataset.get("refreshed")) if dataset else None
+    behind = None
+    if last is None:
+        due = True
+    else:
+        # bars that have started since the newest stored bar
+        target = now if is_open else close
+        behind = max(0, math.ceil((target - last) / length) - 1)
+        if is_open:
+            due = behind > 0 and (refreshed is None or now - refreshed >= length)
+        else:
+            # one fetch after the session settles picks up its final bars
+            settled = close + SETTLE
+            due = now >= settled and (refreshed is None or refreshed < settled)
+    return {
+        "yahoo_symbol": yahoo_symbol,
+        "interval": interval,
+        "exchange": exchange,
+        "open": is_open,
+        "last": dataset.get("last") if dataset else None,
+        "refreshed": dataset.get("refreshed") if dataset else None,
+        "behind": behind,
+        "due": due,
+    }
+
+
+def _priority(entry: Dict[str, Any]) -> Tuple[bool, float]:
+    # open markets first, then the most bars behind, missing data counting as infinite
+    behind = math.inf if entry["behind"] is None else entry["behind"]
+    return not entry["open"], -behind
+
+
+class RefreshScheduler:
+    """
+    Keeps the stored bars of every tickers.csv symbol fresh in the background.
+    Each cycle plans the due symbols, spends the request budget on them in
+    priority order and runs the fetch as a job, so progress is reported on
+    the event stream and the job list like a manual scrape.
+    """
+
+    def __init__(self, jobs: JobManager, client_factory: Optional[Callable[[], Any]] = None,
+                 intervals: Sequence[str] = ("15m",), period: str = "1mo",
+                 tickers_file: str = "tickers.csv", col_index: int = 2,
+                 tick: float = DEFAULT_TICK, budget: int = DEFAULT_BUDGET, burst: int = DEFAULT_BURST,
+                 on_written: Optional[Callable[..., None]] = None):
+        for interval in intervals:
+            interval_length(interval)
+        if client_factory is None:
+            from clients.yfinance import YFinanceClient
+            client_factory = YFinanceClient
+        self.jobs = jobs
+        self.client_factory = client_factory
+        self.intervals = list(intervals)
+        self.period = period
+        self.tickers_file = tickers_file
+        self.col_index = col_index
+        self.tick = tick
+        self.budget = budget
+        # one token per yahoo call, refilled evenly over the hour
+        self.limiter = RateLimiter(budget / 3600, burst=burst)
+        self.on_written = on_written
+        self.last_cycle: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _symbols(self) -> List[Tuple[str, str]]:
+        # (tickers.csv symbol, yahoo symbol) pairs
+        client = self.client_factory()
+        symbols = client._read_tickers(self.tickers_file, self.col_index)
+        return [(symbol, client._map_symbol(symbol)) for symbol in dict.fromkeys(symbols)]
+
+    def plan(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Every symbol and interval with its freshness, highest priority first."""
+        now = now or datetime.now(timezone.utc)
+        symbols = self._symbols()
+        entries = []
+        for interval in self.intervals:
+            stored = {d["symbol"]: d for d in catalog.list_datasets(kind=catalog.MARKET, interval=interval)}
+            for symbol, yahoo_symbol in symbols:
+                entry = assess(yahoo_symbol, interval, stored.get(yahoo_symbol), now)
+                entries.append({"symbol": symbol, **entry})
+        return sorted(entries, key=_priority)
+
+    def _batches(self, entries: List[Dict[str, Any]]) -> List[Tuple[str, List[Dict[str, Any]]]]:
+        # group due entries into download batches, each led by its most urgent symbol
+        batch_size = getattr(self.client_factory(), "batch_size", 20)
+        batches = []
+        for interval in self.intervals:
+            due = [e for e in entries if e["due"] and e["interval"] == interval]
+            batches.extend((interval, due[i:i + batch_size]) for i in range(0, len(due), batch_size))
+        return sorted(batches, key=lambda b: _priority(b[1][0]))
+
+    def _cost(self, batch: List[Dict[str, Any]]) -> int:
+        # a batch mixing new and stored symbols is fetched in two yahoo calls, calls
+        # past this estimate (a failed batch retried per symbol) are charged afterwards
+        missing = sum(1 for e in batch if e["behind"] is None)
+        return 2 if 0 < missing < len(batch) else 1
+
+    def run_once(self, now: Optional[datetime] = None) -> Optional[Job]:
+        """
+        Plan one cycle and start the refresh job for what the budget allows.
+        Returns the job, or None when nothing was due, the budget is spent
+        or a scrape is already running or waiting to.
+        """
+        now = now or datetime.now(timezone.utc)
+        if self.jobs.busy(MARKET_DATA):
+            self.last_cycle = {"time": now.timestamp(), "skipped": "scrape already running"}
+            return None
+        entries = self.plan(now)
+        scheduled, deferred = [], []
+        for interval, batch in self._batches(entries):
+            # once the budget runs out the rest waits, keeping its place next cycle
+            cost = self._cost(batch)
+            if not deferred and self.limiter.try_acquire(cost):
+                scheduled.append((interval, batch, cost))
+            else:
+                deferred.extend(batch)
+        self.last_cycle = {
+            "time": now.timestamp(),
+            "symbols": len(entries),
+            "due": sum(len(b) for _, b, _ in scheduled) + len(deferred),
+            "scheduled": sum(len(b) for _, b, _ in scheduled),
+            "deferred": len(deferred),
+            "open": sorted({e["exchange"] for e in entries if e["open"]}),
+        }
+        publish("scheduler.cycle", **self.last_cycle)
+        if not scheduled:
+            return None
+        batches = [(interval, [e["symbol"] for e in batch], cost) for interval, batch, cost in scheduled]
+        return self.jobs.submit(JOB_NAME, lambda cancel_event: self._refresh(batches, cancel_event),
+                                resources=(MARKET_DATA,))
+
+    def _refresh(self, batches: List[Tuple[str, List[str], int]], cancel_event: threading.Event) -> Dict[str, Any]:
+        # the job body: one download_batch call per planned batch
+        client = self.client_factory()
+        start = time.monotonic()
+        results: List[Dict[str, Any]] = []
+        for interval, symbols, cost in batches:
+            if cancel_event.is_set():
+                break
+            calls = getattr(client, "calls", None)
+            try:
+                files = client.download_batch(symbols, interval=interval, period=self.period)
+            except Exception as e:
+                print(f"\nError refreshing {symbols}: {e}")
+                publish("error", source="scheduler", symbols=symbols, message=str(e))
+                files = {}
+            if calls is not None:
+                # calls beyond what was reserved come out of the next cycles' budget
+                extra = client.calls - calls - cost
+                if extra > 0:
+                    self.limiter.charge(extra)
+            if self.on_written is not None:
+                self.on_written(*files.values())
+            for symbol in symbols:
+                result = {"symbol": symbol, "interval": interval, "file": files.get(symbol),
+                          "status": "success" if files.get(symbol) else "failed"}
+                results.append(result)
+                publish("ticker.finished", **result)
+        elapsed = round(time.monotonic() - start, 3)
+        succeeded = sum(1 for r in results if r["status"] == "success")
+        print(f"\nScheduled refresh: {succeeded} of {len(results)} symbols in {elapsed}s")
+        publish("scrape.finished", source="scheduler", succeeded=succeeded, total=len(results), elapsed=elapsed)
+        return {"message": "Scheduled refresh completed", "results": results,
+                "succeeded": succeeded, "elapsed": elapsed}
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Scheduler cycle failed: {e}")
+                publish("error", source="scheduler", message=str(e))
+            self._stop.wait(self.tick)
+
+    def start(self) -> bool:
+        """Start cycling on a daemon thread, False if already running."""
+        if self.running:
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 5.0) -> bool:
+        """Stop cycling after the current cycle, a refresh job in flight finishes."""
+        if not self.running:
+            return False
+        self._stop.set()
+        self._thread.join(timeout)
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "intervals": self.intervals,
+            "tick": self.tick,
+            "budget": {"per_hour": self.budget, "burst": self.limiter.capacity,
+                       "available": round(self.limiter.available(), 2)},
+            "last_cycle": self.last_cycle,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep market data fresh in the background.")
+    parser.add_argument("--interval", action="append", help="bar interval to keep fresh, repeatable (default 15m)")
+    parser.add_argument("--tick", type=float, default=DEFAULT_TICK, help="seconds between cycles")
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET, help="yahoo calls allowed per hour")
+    args = parser.parse_args()
+    scheduler = RefreshScheduler(JobManager(max_workers=1), intervals=args.interval or ["15m"],
+                                 tick=args.tick, budget=args.budget)
+    print(f"Refreshing {', '.join(scheduler.intervals)} bars every {args.tick:g}s, Ctrl+C to stop")
+    try:
+        scheduler._loop()
+    except KeyboardInterrupt:
+        print("\nScheduler stopped")
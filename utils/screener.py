@@ -0,0 +1,352 @@
+"""
+Technical indicators and screening across every stored ticker.
+
+For each symbol's latest bar the screener computes returns, moving
+averages, Wilder RSI and ATR, volatility of log returns and a volume
+z-score. Rolling figures only need the last SMA_SLOW bars. RSI and ATR are
+recursive, so their Wilder averages are carried per symbol as of the
+second-to-last bar (the last bar is still forming while the market is open
+and is overwritten by the next scrape). When a file changes, only the bars
+after that point are folded in; a full recompute happens only when older
+bars changed. Symbols are computed in batches on a process pool, and a
+file whose catalog entry has not changed is not read at all.
+"""
+import multiprocessing
+import os
+import re
+import threading
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from utils import catalog
+from utils.metrics import stage
+from utils.storage import STORE_EXT, load_frame
+
+DEFAULT_INTERVAL = "15m"
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+SMA_FAST = 20
+SMA_SLOW = 50
+# bars in the return, volatility and volume z-score windows
+WINDOW = 20
+# symbols per task sent to a worker process
+BATCH_SIZE = 50
+# fewer symbols than this to compute are done in-process, a pool is not worth it
+PARALLEL_MIN = 64
+
+INDICATORS = ("close", "return_1", "return_20", "sma_20", "sma_50", "close_sma_50", "rsi_14",
+              "atr_14", "atr_pct", "volatility_20", "volume_z_20")
+COLUMNS = ("symbol", "date") + INDICATORS
+SORT_ORDERS = ("asc", "desc")
+
+# one filter: column, comparison, number, e.g. rsi_14<30
+_FILTER = re.compile(r"^\s*(?P<column>[A-Za-z0-9_]+)\s*(?P<op><=|>=|!=|=|<|>)\s*(?P<value>[-+0-9.eE]+)\s*$")
+_OPS = {
+    "<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+    "=": np.equal, "!=": np.not_equal,
+}
+
+
+def parse_filters(text: Optional[str]) -> List[Tuple[str, str, float]]:
+    """Comma-separated filters such as "rsi_14<30,volume_z_20>=2"."""
+    filters = []
+    for part in (text or "").split(","):
+        if not part.strip():
+            continue
+        match = _FILTER.match(part)
+        if match is None:
+            raise ValueError(f"Bad filter {part.strip()!r}, expected e.g. rsi_14<30")
+        column = match["column"]
+        if column not in INDICATORS:
+            raise ValueError(f"Unknown indicator {column}, expected one of: {', '.join(INDICATORS)}")
+        try:
+            value = float(match["value"])
+        except ValueError:
+            raise ValueError(f"Bad number in filter {part.strip()!r}")
+        filters.append((column, match["op"], value))
+    return filters
+
+
+def _wilder(values: np.ndarray, period: int, average: float, count: int) -> Tuple[float, int]:
+    """
+    Fold values into a Wilder average that has seen count values so far. The
+    first period values seed it with their plain mean, as Wilder did.
+    """
+    if count < period and len(values):
+        seed = values[:period - count]
+        average = (average * count + float(seed.sum())) / (count + len(seed))
+        count += len(seed)
+        values = values[len(seed):]
+    if len(values):
+        alpha = 1.0 / period
+        # closed form of average = average + alpha * (x - average) over every value
+        weights = alpha * (1.0 - alpha) ** np.arange(len(values) - 1, -1, -1)
+        average = (1.0 - alpha) ** len(values) * average + float(weights @ values)
+        count += len(values)
+    return average, count
+
+
+def _fresh_state() -> Dict[str, Any]:
+    return {"settled": 0, "anchor": None, "gain": (0.0, 0), "loss": (0.0, 0), "atr": (0.0, 0)}
+
+
+def _advance(state: Dict[str, Any], close: np.ndarray, high: np.ndarray, low: np.ndarray,
+             start: int, stop: int) -> Dict[str, Any]:
+    # fold bars [start, stop) into the Wilder averages, each bar needs the close before it
+    start = max(start, 1)
+    if stop <= start:
+        return state
+    prev = close[start - 1:stop - 1]
+    change = close[start:stop] - prev
+    true_range = np.maximum(high[start:stop] - low[start:stop],
+                            np.maximum(np.abs(high[start:stop] - prev), np.abs(low[start:stop] - prev)))
+    return {
+        **state,
+        "gain": _wilder(np.clip(change, 0.0, None), RSI_PERIOD, *state["gain"]),
+        "loss": _wilder(np.clip(-change, 0.0, None), RSI_PERIOD, *state["loss"]),
+        "atr": _wilder(true_range, ATR_PERIOD, *state["atr"]),
+    }
+
+
+def _ratio(numerator: float, denominator: float) -> float:
+    return float(numerator / denominator) if denominator else np.nan
+
+
+def _latest(state: Dict[str, Any], dates: np.ndarray, close: np.ndarray,
+            volume: np.ndarray) -> Dict[str, Any]:
+    # indicator values at the last bar, state already includes it
+    n = len(close)
+    last = close[-1]
+    (gain, gains), (loss, _), (atr, atrs) = state["gain"], state["loss"], state["atr"]
+    if gains < RSI_PERIOD:
+        rsi = np.nan
+    else:
+        rsi = 100.0 if loss == 0 else 100.0 - 100.0 / (1.0 + gain / loss)
+    atr = atr if atrs >= ATR_PERIOD else np.nan
+    sma_fast = close[-SMA_FAST:].mean() if n >= SMA_FAST else np.nan
+    sma_slow = close[-SMA_SLOW:].mean() if n >= SMA_SLOW else np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # a close at or below zero has no log return
+        returns = np.diff(np.log(close[-(WINDOW + 1):])) if n > WINDOW else None
+    # the last bar's volume against the WINDOW bars before it
+    previous = volume[-(WINDOW + 1):-1]
+    spread = previous.std(ddof=1) if n > WINDOW else 0.0
+    return {
+        "date": pd.Timestamp(dates[-1], tz="UTC").isoformat(),
+        "close": float(last),
+        "return_1": _ratio(last, close[-2]) - 1 if n > 1 else np.nan,
+        "return_20": _ratio(last, close[-(WINDOW + 1)]) - 1 if n > WINDOW else np.nan,
+        "sma_20": float(sma_fast),
+        "sma_50": float(sma_slow),
+        "close_sma_50": _ratio(last, sma_slow) - 1,
+        "rsi_14": float(rsi),
+        "atr_14": float(atr),
+        "atr_pct": _ratio(atr, last),
+        "volatility_20": float(returns.std(ddof=1)) if returns is not None else np.nan,
+        "volume_z_20": _ratio(volume[-1] - previous.mean(), spread) if n > WINDOW else np.nan,
+    }
+
+
+def _load_bars(path: str) -> Dict[str, np.ndarray]:
+    # bars as arrays, dates as UTC nanoseconds, rows without a close dropped
+    df = load_frame(path, columns=["Date", "High", "Low", "Close", "Volume"])
+    if not path.endswith(STORE_EXT):
+        # legacy CSV holds display strings
+        from utils.data_transform import normalize_yfinance_data
+        df = normalize_yfinance_data(df)
+    dates = df["Date"]
+    if not isinstance(dates.dtype, pd.DatetimeTZDtype):
+        dates = pd.to_datetime(dates, utc=True)
+    bars = {"Date": pd.DatetimeIndex(dates).as_unit("ns").asi8}
+    for column in ("High", "Low", "Close", "Volume"):
+        bars[column] = df[column].to_numpy(dtype=float)
+    keep = ~np.isnan(bars["Close"])
+    if not keep.all():
+        bars = {column: values[keep] for column, values in bars.items()}
+    return bars
+
+
+def _anchor(dates: np.ndarray, close: np.ndarray, index: int) -> Tuple[int, float, float]:
+    # identifies the settled bars: the last one's date and close, and the sum of every close
+    return int(dates[index]), float(close[index]), float(close[:index + 1].sum())
+
+
+def compute_symbol(path: str, state: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Indicators at the latest bar of a market data file. state is what the
+    previous call returned for the same file; when the bars it had settled
+    are unchanged (same last date and close, same sum of closes) only the
+    newer bars are folded in. Returns the new state
+    with the values under "row" and "mode" saying how they were computed.
+    """
+    bars = _load_bars(path)
+    dates, close, high, low, volume = (bars[c] for c in ("Date", "Close", "High", "Low", "Volume"))
+    n = len(close)
+    if n == 0:
+        return {**_fresh_state(), "row": None, "mode": "empty"}
+
+    mode = "full"
+    if state is not None and state["anchor"] is not None and 0 < state["settled"] <= n:
+        anchor = state["settled"] - 1
+        if state["anchor"] == _anchor(dates, close, anchor):
+            mode = "incremental"
+    if mode == "full":
+        state = _fresh_state()
+    # settle every bar but the last, which may still change
+    settled = _advance(state, close, high, low, state["settled"], n - 1)
+    settled["settled"] = n - 1
+    settled["anchor"] = _anchor(dates, close, n - 2) if n > 1 else None
+    row = _latest(_advance(settled, close, high, low, n - 1, n), dates, close, volume)
+    return {**settled, "row": row, "mode": mode}
+
+
+def _compute_batch(items: List[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    # runs in a worker process, one failing file does not fail the batch
+    results = []
+    for path, state in items:
+        try:
+            results.append(compute_symbol(path, state))
+        except Exception as e:
+            results.append({"error": f"{type(e).__name__}: {e}"})
+    return results
+
+
+class Screener:
+    """
+    Latest indicators of every catalogued symbol of an interval, cached per
+    symbol and interval and brought up to date on each screen.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, batch_size: int = BATCH_SIZE,
+                 parallel_min: int = PARALLEL_MIN):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.parallel_min = parallel_min
+        # (symbol, interval) -> (catalog signature, path, state)
+        self._cache: Dict[Tuple[str, str], Tuple[Tuple, str, Dict[str, Any]]] = {}
+        self._errors: Dict[Tuple[str, str], str] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "full": 0, "incremental": 0, "errors": 0}
+        self.last_refresh: Optional[Dict[str, Any]] = None
+
+    ##~~~~~~~~~~~~~~~~~~
+    ## HELPER FUNCTIONS
+    ##~~~~~~~~~~~~~~~~~~
+
+    @staticmethod
+    def _signature(dataset: Dict[str, Any]) -> Tuple:
+        # a rewritten file always gets a new refresh time and usually a new size
+        return dataset["path"], dataset["rows"], dataset["last"], dataset["size"], dataset["refreshed"]
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # spawned workers on every platform, forking a threaded server is not safe
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _compute(self, items: List[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        if len(items) < self.parallel_min or self.max_workers == 1:
+            return _compute_batch(items)
+        # about four batches per worker keeps them busy when symbols differ in size
+        size = max(1, min(self.batch_size, -(-len(items) // (self.max_workers * 4))))
+        batches = [items[i:i + size] for i in range(0, len(items), size)]
+        return [result for batch in self._executor().map(_compute_batch, batches) for result in batch]
+
+    ##~~~~~~~~~~~~~~~~~~
+    ## CLASS FUNCTIONS
+    ##~~~~~~~~~~~~~~~~~~
+
+    def refresh(self, interval: str = DEFAULT_INTERVAL) -> Dict[str, Any]:
+        """Recompute the symbols of interval whose files changed since the last call."""
+        with self._lock:
+            start = time.perf_counter()
+            datasets = catalog.list_datasets(kind=catalog.MARKET, interval=interval)
+            current = {(d["symbol"], interval): d for d in datasets if d["symbol"]}
+            todo = []
+            for key, dataset in current.items():
+                cached = self._cache.get(key)
+                signature = self._signature(dataset)
+                if cached is not None and cached[0] == signature:
+                    continue
+                # a moved file starts over, its old state says nothing about it
+                state = cached[2] if cached is not None and cached[1] == dataset["path"] else None
+                todo.append((key, signature, dataset["path"], state))
+            hits = len(current) - len(todo)
+
+            counts = {"full": 0, "incremental": 0, "errors": 0}
+            with stage("screener.refresh") as info:
+                results = self._compute([(path, state) for _, _, path, state in todo])
+                for (key, signature, path, _), result in zip(todo, results):
+                    if "error" in result:
+                        self._cache.pop(key, None)
+                        self._errors[key] = result["error"]
+                        counts["errors"] += 1
+                        continue
+                    self._errors.pop(key, None)
+                    self._cache[key] = (signature, path, result)
+                    counts["incremental" if result["mode"] == "incremental" else "full"] += 1
+                info["rows"] = len(todo)
+            # symbols whose files are gone
+            for key in [k for k in self._cache if k[1] == interval and k not in current]:
+                del self._cache[key]
+
+            self.counters["hits"] += hits
+            for name, value in counts.items():
+                self.counters[name] += value
+            self.last_refresh = {"interval": interval, "symbols": len(current), "cached": hits,
+                                 **counts, "seconds": round(time.perf_counter() - start, 4)}
+            return self.last_refresh
+
+    def table(self, interval: str = DEFAULT_INTERVAL) -> pd.DataFrame:
+        """Latest indicators of every symbol of interval, one row per symbol."""
+        self.refresh(interval)
+        with self._lock:
+            rows = [{"symbol": key[0], **state["row"]} for key, (_, _, state) in self._cache.items()
+                    if key[1] == interval and state.get("row")]
+        df = pd.DataFrame(rows, columns=list(COLUMNS))
+        return df.sort_values("symbol", ignore_index=True)
+
+    def screen(self, interval: str = DEFAULT_INTERVAL, filters: Sequence[Tuple[str, str, float]] = (),
+               sort: Optional[str] = None, order: str = "desc", limit: Optional[int] = None,
+               symbols: Optional[Sequence[str]] = None) -> Tuple[pd.DataFrame, int]:
+        """
+        Symbols whose indicators pass every filter, ranked by sort. Rows with
+        no value for the sort indicator go last. Returns the rows (up to
+        limit) and how many matched.
+        """
+        if sort is not None and sort not in INDICATORS:
+            raise ValueError(f"Unknown indicator {sort}, expected one of: {', '.join(INDICATORS)}")
+        if order not in SORT_ORDERS:
+            raise ValueError(f"Unknown order {order}, expected one of: {', '.join(SORT_ORDERS)}")
+        df = self.table(interval)
+        mask = np.ones(len(df), dtype=bool)
+        if symbols:
+            mask &= df["symbol"].isin(symbols).to_numpy()
+        for column, op, value in filters:
+            # NaN fails every comparison but !=, which should not match it either
+            values = df[column].to_numpy(dtype=float)
+            mask &= _OPS[op](values, value) & ~np.isnan(values)
+        df = df.loc[mask]
+        if sort is not None:
+            df = df.sort_values(sort, ascending=order == "asc", na_position="last", kind="stable")
+        total = len(df)
+        if limit is not None:
+            df = df.head(limit)
+        return df.reset_index(drop=True), total
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and counters of cached, incremental and full computations."""
+        with self._lock:
+            return {"symbols": len(self._cache), "workers": self.max_workers, **self.counters,
+                    "failing": {f"{s} {i}": e for (s, i), e in self._errors.items()},
+                    "last_refresh": self.last_refresh}
+
+    def close(self) -> None:
+        """Shut the worker processes down."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
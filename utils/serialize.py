@@ -0,0 +1,57 @@
+"""
+Response encodings for DataFrames served by the data endpoints.
+
+records is the original list of row dicts. columns is one JSON array per
+column, written by pandas' C JSON encoder column by column so no Python
+object is created per cell. arrow is an Arrow IPC stream, with the response
+metadata stored in the schema.
+"""
+import json
+from typing import TYPE_CHECKING, Any, Dict, List
+from utils.metrics import stage
+
+# imported when a frame is first encoded, so the API can start without pandas
+if TYPE_CHECKING:
+    import pandas as pd
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+FORMATS = ("records", "columns", "arrow")
+
+
+def frame_records(df: "pd.DataFrame") -> List[Dict[str, Any]]:
+    """Rows of a frame as JSON-ready dicts, NaN mapped to None."""
+    import pandas as pd
+    with stage("serialize.records") as info:
+        info["rows"] = len(df)
+        return df.astype(object).where(pd.notnull(df), None).to_dict(orient="records")
+
+
+def frame_columns_json(df: "pd.DataFrame", meta: Dict[str, Any]) -> str:
+    """
+    JSON object with the meta fields, "columns" and "data" holding one array
+    per column. Timestamps are ISO 8601 strings, missing values are null.
+    """
+    with stage("serialize.columns") as info:
+        arrays = ",".join(
+            f"{json.dumps(str(column))}:{df[column].to_json(orient='values', date_format='iso')}"
+            for column in df.columns
+        )
+        head = json.dumps({"layout": "columns", **meta, "columns": [str(c) for c in df.columns]}, default=str)
+        body = f'{head[:-1]},"data":{{{arrays}}}}}'
+        info["rows"], info["bytes"] = len(df), len(body)
+    return body
+
+
+def frame_arrow(df: "pd.DataFrame", meta: Dict[str, Any]) -> bytes:
+    """Arrow IPC stream of the frame, meta is JSON in the schema metadata."""
+    import pyarrow as pa
+
+    with stage("serialize.arrow") as info:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({"meta": json.dumps(meta, default=str)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        body = sink.getvalue().to_pybytes()
+        info["rows"], info["bytes"] = len(df), len(body)
+    return body
@@ -0,0 +1,337 @@
+"""
+Memory-mapped time-series store for market data bars.
+
+Each symbol and interval is a folder of published versions, one .npy file
+per fixed-width column (Date as int64 UTC nanoseconds, the prices and
+volume as stored) plus index.npy, every INDEX_STRIDE-th timestamp, and
+meta.json. The CURRENT file names the published version.
+
+Readers map the current version's columns read-only, so every API worker
+shares the same page cache instead of holding its own parsed copy. A range
+query binary-searches the small index and then one block of the Date
+column, and returns views into the maps without copying. Writers never
+touch a published version: they write the next version in a temporary
+folder, rename it into place and then replace CURRENT, both atomically, so
+a reader sees the old series or the new one, never a torn file. Old
+versions are removed once a newer one has been published, except the one
+before it, which a reader may have just looked up. Every API worker runs
+its own scrapes, so writers of a series take a lock file in its folder,
+held from reading the stored series to publishing the next version.
+
+Parquet stays the source of truth, this store is how bars are served. Fill
+it from existing parquet files with:
+
+    python -m utils.series_store [--force]
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from utils.metrics import stage
+
+try:
+    import fcntl
+except ImportError:
+    # Windows locks a byte range of the lock file instead
+    fcntl = None
+    import msvcrt
+
+# Folder holding one sub-folder per symbol and interval
+SERIES_DIR = "series"
+CURRENT = "CURRENT"
+META = "meta.json"
+INDEX = "index.npy"
+LOCK = ".lock"
+# one index entry per this many rows
+INDEX_STRIDE = 1024
+# published versions kept, the current one and the one before it
+KEEP_VERSIONS = 2
+TIME_COLUMN = "Date"
+
+# writers in this process take turns before taking a series folder's lock file
+_write_lock = threading.Lock()
+_open_lock = threading.Lock()
+# series folder -> the version this process has mapped
+_open: Dict[str, "Series"] = {}
+
+
+def series_dir(symbol: str, interval: str) -> str:
+    """Folder of the stored series for a symbol and interval."""
+    return os.path.join(SERIES_DIR, f"{symbol}_{interval}")
+
+
+def _version_name(number: int) -> str:
+    return f"v{number:08d}"
+
+
+def _current_version(folder: str) -> Optional[str]:
+    try:
+        with open(os.path.join(folder, CURRENT), "r", encoding="utf-8") as file:
+            return file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def _locked(folder: str) -> Iterator[None]:
+    # exclusive across threads and processes, readers never take it
+    os.makedirs(folder, exist_ok=True)
+    with _write_lock, open(os.path.join(folder, LOCK), "a+b") as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        else:
+            file.seek(0)
+            while True:
+                try:
+                    # LK_LOCK gives up after ten one-second tries, keep waiting
+                    msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _to_nanoseconds(values: Any) -> np.ndarray:
+    return pd.DatetimeIndex(pd.to_datetime(values, utc=True)).as_unit("ns").asi8
+
+
+def _timestamp_ns(value: Any) -> int:
+    # one bound of a range query, naive values are taken as UTC
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts
+    return ts.as_unit("ns").value
+
+
+class Series:
+    """One published version of a series, its columns mapped read-only."""
+
+    def __init__(self, folder: str, version: str):
+        self.folder = folder
+        self.version = version
+        path = os.path.join(folder, version)
+        with open(os.path.join(path, META), "r", encoding="utf-8") as file:
+            self.meta = json.load(file)
+        self.rows: int = self.meta["rows"]
+        self.index = np.load(os.path.join(path, INDEX))
+        # an empty .npy cannot be mapped, an empty series needs no map
+        self.columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if self.rows else None)
+            for name in self.meta["numeric"]
+        }
+
+    @property
+    def first(self) -> Optional[pd.Timestamp]:
+        return pd.Timestamp(int(self.columns[TIME_COLUMN][0]), tz="UTC") if self.rows else None
+
+    @property
+    def last(self) -> Optional[pd.Timestamp]:
+        return pd.Timestamp(int(self.columns[TIME_COLUMN][-1]), tz="UTC") if self.rows else None
+
+    def _search(self, value: int, side: str) -> int:
+        # the index narrows the search to one block of the mapped Date column
+        block = int(np.searchsorted(self.index, value, side=side))
+        lo = max(block - 1, 0) * INDEX_STRIDE
+        hi = min(block * INDEX_STRIDE + 1, self.rows)
+        return lo + int(np.searchsorted(self.columns[TIME_COLUMN][lo:hi], value, side=side))
+
+    def locate(self, start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None) -> Tuple[int, int]:
+        """Row range [lo, hi) of the bars between start and end, both inclusive."""
+        lo = self._search(_timestamp_ns(start), "left") if start is not None else 0
+        hi = self._search(_timestamp_ns(end), "right") if end is not None else self.rows
+        return lo, max(lo, hi)
+
+    def slice(self, start: Optional[pd.Timestamp] = None,
+              end: Optional[pd.Timestamp] = None) -> Dict[str, np.ndarray]:
+        """Views of every numeric column between start and end, nothing is copied."""
+        lo, hi = self.locate(start, end)
+        return {name: values[lo:hi] for name, values in self.columns.items()}
+
+    def frame(self, start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """
+        The bars between start and end as a DataFrame over the mapped
+        columns, in the column order they were written with. Date and the
+        numeric columns are views, constant text columns are repeated.
+        """
+        views = self.slice(start, end)
+        rows = len(views[TIME_COLUMN])
+        data = {}
+        for name in self.meta["columns"]:
+            if name == TIME_COLUMN:
+                data[name] = pd.DatetimeIndex(views[name], dtype="datetime64[ns, UTC]", copy=False)
+            elif name in views:
+                data[name] = views[name]
+            else:
+                data[name] = np.full(rows, self.meta["constants"][name], dtype=object)
+        return pd.DataFrame(data, copy=False)
+
+
+def open_series(symbol: str, interval: str) -> Optional[Series]:
+    """The published series of a symbol and interval, None if none is stored."""
+    folder = series_dir(symbol, interval)
+    version = _current_version(folder)
+    if version is None:
+        return None
+    with _open_lock:
+        series = _open.get(folder)
+        if series is None or series.version != version:
+            series = _open[folder] = Series(folder, version)
+        return series
+
+
+def exists(symbol: str, interval: str) -> bool:
+    """True if a series has been published for the symbol and interval."""
+    return _current_version(series_dir(symbol, interval)) is not None
+
+
+def _split_columns(df: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    # fixed-width columns go to files, text that is the same on every row goes to meta
+    numeric, constants = {}, {}
+    for name in df.columns:
+        values = df[name]
+        if name == TIME_COLUMN:
+            numeric[name] = _to_nanoseconds(values)
+        elif pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            array = values.to_numpy()
+            if array.dtype == object:
+                # nullable integers and the like, NA becomes NaN
+                array = values.to_numpy(dtype=float, na_value=np.nan)
+            numeric[name] = array
+        elif values.nunique(dropna=False) <= 1:
+            constants[name] = None if values.empty or pd.isna(values.iloc[0]) else str(values.iloc[0])
+        else:
+            raise ValueError(f"Column {name} is neither numeric nor constant, it cannot be stored")
+    return numeric, constants
+
+
+def _publish(folder: str, numeric: Dict[str, np.ndarray], columns: List[str],
+             constants: Dict[str, Any]) -> str:
+    # write the next version beside the published ones, then switch CURRENT to
+    # it, under the folder's lock so no other writer picks the same version
+    current = _current_version(folder)
+    version = _version_name(int(current[1:]) + 1 if current else 1)
+    tmp_path = os.path.join(folder, f"{version}.tmp")
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+    dates = numeric[TIME_COLUMN]
+    with stage("series.write") as info:
+        for name, values in numeric.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(values))
+        np.save(os.path.join(tmp_path, INDEX), dates[::INDEX_STRIDE].copy())
+        meta = {"rows": len(dates), "columns": columns, "numeric": list(numeric), "constants": constants,
+                "index_stride": INDEX_STRIDE}
+        with open(os.path.join(tmp_path, META), "w", encoding="utf-8") as file:
+            json.dump(meta, file)
+        os.replace(tmp_path, os.path.join(folder, version))
+        pointer = os.path.join(folder, f"{CURRENT}.tmp")
+        with open(pointer, "w", encoding="utf-8") as file:
+            file.write(version)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(pointer, os.path.join(folder, CURRENT))
+        info["rows"] = len(dates)
+        info["bytes"] = sum(values.nbytes for values in numeric.values())
+    _prune(folder, version)
+    return version
+
+
+def _prune(folder: str, current: str) -> None:
+    versions = sorted(name for name in os.listdir(folder) if name.startswith("v") and not name.endswith(".tmp"))
+    for name in versions:
+        if name >= current or name in versions[-KEEP_VERSIONS:]:
+            continue
+        # Windows will not delete a file another process still has mapped, try again next publish
+        shutil.rmtree(os.path.join(folder, name), ignore_errors=True)
+
+
+def write_series(symbol: str, interval: str, df: pd.DataFrame) -> str:
+    """Publish df, sorted by Date, as the whole series. Returns the version."""
+    folder = series_dir(symbol, interval)
+    with _locked(folder):
+        return _write(folder, df)
+
+
+def _write(folder: str, df: pd.DataFrame) -> str:
+    numeric, constants = _split_columns(df)
+    order = np.argsort(numeric[TIME_COLUMN], kind="stable")
+    if not np.all(order[1:] > order[:-1]):
+        numeric = {name: values[order] for name, values in numeric.items()}
+    return _publish(folder, numeric, df.columns.tolist(), constants)
+
+
+def append_series(symbol: str, interval: str, df: pd.DataFrame, base_rows: Optional[int] = None,
+                  full: Optional[pd.DataFrame] = None) -> str:
+    """
+    Publish the stored series with df's bars merged in. Stored bars from
+    df's first date on are merged with df, a fresh copy of a bar winning,
+    and the bars before it are copied from the map unchanged. base_rows is
+    the row count the series should have before the merge, as the parquet
+    file had. A series with a different count missed an earlier publish,
+    so full, the whole merged series, is written in its place. Returns the
+    version.
+    """
+    with _locked(series_dir(symbol, interval)):
+        return _append(symbol, interval, df, base_rows, full)
+
+
+def _append(symbol: str, interval: str, df: pd.DataFrame, base_rows: Optional[int] = None,
+            full: Optional[pd.DataFrame] = None) -> str:
+    series = open_series(symbol, interval)
+    if series is None or series.rows == 0 or (base_rows is not None and series.rows != base_rows):
+        return _write(series_dir(symbol, interval), full if full is not None else df)
+    fresh, constants = _split_columns(df)
+    if fresh.keys() != series.columns.keys():
+        # the columns changed, the whole series has to be rewritten
+        return _write(series.folder, pd.concat([series.frame(), df], ignore_index=True)
+                      .drop_duplicates(subset=TIME_COLUMN, keep="last"))
+    if len(fresh[TIME_COLUMN]) == 0:
+        return series.version
+    cut = series._search(int(fresh[TIME_COLUMN].min()), "left")
+    # the overlap is small, merge it the way the parquet writer does
+    tail = pd.DataFrame({name: values[cut:] for name, values in series.columns.items()})
+    tail = pd.concat([tail, pd.DataFrame(fresh)], ignore_index=True)
+    tail = tail.drop_duplicates(subset=TIME_COLUMN, keep="last").sort_values(TIME_COLUMN, kind="stable")
+    numeric = {name: np.concatenate([series.columns[name][:cut], tail[name].to_numpy()])
+               for name in series.columns}
+    constants = {**series.meta["constants"], **constants}
+    return _publish(series.folder, numeric, series.meta["columns"], constants)
+
+
+def backfill(force: bool = False) -> int:
+    """Publish a series for every parquet market file that has none, returns how many."""
+    from utils import catalog
+    from utils.storage import STORE_EXT, load_frame
+
+    written = 0
+    for dataset in catalog.list_datasets(kind=catalog.MARKET):
+        symbol, interval, path = dataset["symbol"], dataset["interval"], dataset["path"]
+        if not symbol or not path.endswith(STORE_EXT):
+            continue
+        series = open_series(symbol, interval)
+        if series is not None and series.rows == dataset["rows"] and not force:
+            continue
+        try:
+            write_series(symbol, interval, load_frame(path))
+            written += 1
+        except Exception as e:
+            print(f"Error storing {path}: {e}")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill the memory-mapped series store from the parquet market data.")
+    parser.add_argument("--force", action="store_true", help="rewrite series that look up to date")
+    args = parser.parse_args()
+    print(f"Published {backfill(args.force)} series to {SERIES_DIR}/")
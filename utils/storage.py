@@ -0,0 +1,73 @@
+import glob
+import os
+import pandas as pd
+from typing import List, Optional
+from utils.metrics import stage
+
+# Folder holding the per-symbol market data files
+MARKET_DATA_DIR = "market_data"
+# Extension used by the columnar store
+STORE_EXT = ".parquet"
+
+
+def market_data_path(symbol: str, interval: str) -> str:
+    """Path of the stored bars for a symbol and interval."""
+    return f"{MARKET_DATA_DIR}/{symbol}_{interval}{STORE_EXT}"
+
+
+def report_path(report_id) -> str:
+    """Path of a stored Trading212 history report."""
+    return f"History Report {report_id}{STORE_EXT}"
+
+
+def _with_legacy(pattern: str) -> List[str]:
+    # columnar files, plus any legacy CSV that has not been migrated yet
+    files = glob.glob(pattern + STORE_EXT)
+    migrated = set(files)
+    for csv_path in glob.glob(pattern + ".csv"):
+        if os.path.splitext(csv_path)[0] + STORE_EXT not in migrated:
+            files.append(csv_path)
+    return files
+
+
+def list_market_files() -> List[str]:
+    """All market data files, columnar and legacy CSV."""
+    return _with_legacy(f"{MARKET_DATA_DIR}/*")
+
+
+def list_report_files() -> List[str]:
+    """All history report files, columnar and legacy CSV."""
+    return _with_legacy("History Report *")
+
+
+def save_frame(df: pd.DataFrame, path: str) -> str:
+    """
+    Write a typed frame to the columnar store.
+    The file is written next to the target and renamed into place, so
+    readers never see a partly written file.
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with stage("storage.write") as info:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        info["rows"], info["bytes"] = len(df), os.path.getsize(path)
+    return path
+
+
+def load_frame(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read a stored frame, loading only the requested columns.
+    Parquet files are memory-mapped, legacy CSV files are parsed as before.
+    """
+    with stage("storage.read" if path.endswith(STORE_EXT) else "storage.read_csv") as info:
+        if path.endswith(STORE_EXT):
+            df = pd.read_parquet(path, columns=columns, memory_map=True)
+        else:
+            df = pd.read_csv(path, usecols=columns)
+        # a column subset reads only part of the file, so bytes count whole reads
+        info["rows"] = len(df)
+        info["bytes"] = os.path.getsize(path) if columns is None else None
+    return df